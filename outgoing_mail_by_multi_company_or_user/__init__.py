@@ -1,2 +1,3 @@
 # Part of Odoo. See COPYRIGHT & LICENSE files for full copyright and licensing details.
+from . import controllers
 from . import models
@@ -0,0 +1,211 @@
+# Part of Odoo. See COPYRIGHT & LICENSE files for full copyright and licensing details.
+"""
+Outgoing mail throughput benchmark.
+
+Starts a local aiosmtpd sink, configures one outgoing server per company
+(``smtp_by_company``) or per user (``smtp_by_user``) pointing at it, posts
+messages through ``message_post`` and ``mail.mail.create`` and drains the
+queue with ``mail.mail.process_email_queue``.
+
+Reported per routing mode:
+
+* messages posted per second and SQL queries per message while posting,
+* queue drain rate (mails per second handed to the SMTP sink),
+* p50 / p99 end-to-end latency, from mail creation to reception by the sink.
+
+The benchmark commits its data: ALWAYS run it against a throwaway database
+with this module installed.
+
+Install:
+    pip install aiosmtpd
+
+Run:
+    python bench_mail_throughput.py -c /etc/odoo.conf -d bench_db \\
+        --companies 5 --messages 500 --mode company --mode user
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+import odoo
+from odoo import api, SUPERUSER_ID
+from odoo.modules.registry import Registry
+
+ICP_PREFIX = 'send_mail_company_wish_ext.'
+
+
+class SinkHandler(object):
+    """ Accept every message and remember when each Message-Id arrived. """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.received = {}
+
+    async def handle_DATA(self, server, session, envelope):
+        now = time.time()
+        for line in envelope.content.decode('utf-8', 'replace').splitlines():
+            if line.lower().startswith('message-id:'):
+                with self.lock:
+                    self.received[line.split(':', 1)[1].strip()] = now
+                break
+        return '250 OK'
+
+
+def accept_any_login(server, session, envelope, mechanism, auth_data):
+    return AuthResult(success=True)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))]
+
+
+def setup_routing(env, mode, companies, port, tag):
+    """ Create ``companies`` companies, one user and one sink server each. """
+    ICP = env['ir.config_parameter'].sudo()
+    ICP.set_param(ICP_PREFIX + 'smtp_by_company', mode == 'company' or '')
+    ICP.set_param(ICP_PREFIX + 'smtp_by_user', mode == 'user' or '')
+    setups = []
+    for index in range(companies):
+        company = env['res.company'].create({'name': 'Bench %s %s %s' % (tag, mode, index)})
+        user = env['res.users'].with_context(no_reset_password=True).create({
+            'name': 'Bench User %s %s %s' % (tag, mode, index),
+            'login': 'bench_%s_%s_%s' % (tag, mode, index),
+            'email': 'bench_%s_%s_%s@example.com' % (tag, mode, index),
+            'company_id': company.id,
+            'company_ids': [(6, 0, [company.id])],
+        })
+        env['ir.mail_server'].create({
+            'name': 'Bench Sink %s %s %s' % (tag, mode, index),
+            'smtp_host': '127.0.0.1',
+            'smtp_port': port,
+            'smtp_encryption': 'none',
+            'smtp_user': 'sender_%s_%s@example.com' % (mode, index),
+            'smtp_pass': 'bench',
+            'company_ids': [(6, 0, [company.id])] if mode == 'company' else [],
+            'user_ids': [(6, 0, [user.id])] if mode == 'user' else [],
+            'is_smtp_by_company': mode == 'company',
+            'is_smtp_by_user': mode == 'user',
+        })
+        recipient = env['res.partner'].create({
+            'name': 'Bench Recipient %s' % index,
+            'email': 'recipient_%s_%s@example.com' % (mode, index),
+        })
+        setups.append((company, user, recipient))
+    return setups
+
+
+def post_messages(env, setups, messages):
+    """ Post ``messages`` mails, alternating message_post and mail.mail.create.
+    Return (elapsed seconds, SQL queries, {message_id: creation time}). """
+    created = {}
+    queries_before = env.cr.sql_log_count
+    started = time.perf_counter()
+    for index in range(messages):
+        company, user, recipient = setups[index % len(setups)]
+        # queue the notifications instead of sending them while posting,
+        # so that every mail goes through process_email_queue
+        uenv = env(user=user.id, context=dict(
+            env.context, allowed_company_ids=[company.id], mail_notify_force_send=False))
+        if index % 2:
+            mail = uenv['mail.mail'].create({
+                'subject': 'Bench mail %s' % index,
+                'body_html': '<p>Benchmark</p>',
+                'email_to': recipient.email,
+            })
+            mails = mail
+        else:
+            message = uenv['res.partner'].browse(recipient.id).message_post(
+                body='Benchmark %s' % index,
+                partner_ids=[recipient.id],
+                message_type='comment',
+                subtype_xmlid='mail.mt_comment',
+            )
+            mails = uenv['mail.mail'].sudo().search([('mail_message_id', '=', message.id)])
+        now = time.time()
+        for mail in mails:
+            created[mail.message_id] = now
+    elapsed = time.perf_counter() - started
+    return elapsed, env.cr.sql_log_count - queries_before, created
+
+
+def run_mode(registry, mode, companies, messages, port, handler, tag):
+    with registry.cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {})
+        setups = setup_routing(env, mode, companies, port, tag)
+        post_elapsed, queries, created = post_messages(env, setups, messages)
+        cr.commit()
+
+        drain_started = time.perf_counter()
+        env['mail.mail'].process_email_queue()
+        cr.commit()
+        drain_elapsed = time.perf_counter() - drain_started
+
+    with handler.lock:
+        latencies = [handler.received[mid] - ts for mid, ts in created.items() if mid in handler.received]
+    return {
+        'mode': mode,
+        'companies': companies,
+        'messages': messages,
+        'mails': len(created),
+        'delivered': len(latencies),
+        'posted_per_second': messages / post_elapsed if post_elapsed else 0.0,
+        'queries_per_message': queries / float(messages),
+        'drain_per_second': len(latencies) / drain_elapsed if drain_elapsed else 0.0,
+        'latency_p50': statistics.median(latencies) if latencies else 0.0,
+        'latency_p99': percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-c', '--config', help="Odoo configuration file")
+    parser.add_argument('-d', '--database', required=True, help="Throwaway database to run against")
+    parser.add_argument('--companies', type=int, default=5, help="Companies/servers (or users/servers) to create")
+    parser.add_argument('--messages', type=int, default=200, help="Messages to post per mode")
+    parser.add_argument('--mode', action='append', choices=['company', 'user'],
+                        help="Routing mode(s) to benchmark (default: both)")
+    parser.add_argument('--port', type=int, default=8025, help="Port of the local SMTP sink")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args()
+
+    odoo_args = ['-d', args.database]
+    if args.config:
+        odoo_args += ['-c', args.config]
+    odoo.tools.config.parse_config(odoo_args)
+
+    handler = SinkHandler()
+    controller = Controller(
+        handler, hostname='127.0.0.1', port=args.port,
+        authenticator=accept_any_login, auth_require_tls=False)
+    controller.start()
+    try:
+        registry = Registry(args.database)
+        tag = str(int(time.time()))
+        results = [
+            run_mode(registry, mode, args.companies, args.messages, args.port, handler, tag)
+            for mode in (args.mode or ['company', 'user'])
+        ]
+    finally:
+        controller.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print("%-8s %8s %8s %10s %10s %10s %9s %9s" % (
+        'mode', 'mails', 'sent', 'posted/s', 'sql/msg', 'drain/s', 'p50 (s)', 'p99 (s)'))
+    for res in results:
+        print("%-8s %8d %8d %10.1f %10.1f %10.1f %9.3f %9.3f" % (
+            res['mode'], res['mails'], res['delivered'], res['posted_per_second'],
+            res['queries_per_message'], res['drain_per_second'], res['latency_p50'], res['latency_p99']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+# Part of Odoo. See COPYRIGHT & LICENSE files for full copyright and licensing details.
+import json
+
+from odoo import http
+from odoo.http import request
+
+from ..tools.metrics import METRICS, gauge_lines
+
+
+class MailRoutingMetrics(http.Controller):
+
+    @http.route('/mail_routing/metrics', type='http', auth='user')
+    def metrics(self, format='prometheus', **kwargs):
+        """ Routing and sending metrics of the worker serving the request, plus
+        the current queue depth per mail server. Prometheus text by default,
+        JSON with ``?format=json``. """
+        if not request.env.user.has_group('base.group_system'):
+            return request.not_found()
+
+        dbname = request.env.cr.dbname
+        queued = {
+            str(server.id if server else 'default'): count
+            for server, count in request.env['mail.mail'].sudo()._read_group(
+                [('state', '=', 'outgoing')], ['mail_server_id'], ['__count'])
+        }
+
+        if format == 'json':
+            data = METRICS.to_dict(dbname)
+            data['odoo_mail_queue_depth'] = [
+                {'labels': {'mail_server_id': server_id}, 'value': count}
+                for server_id, count in queued.items()
+            ]
+            return request.make_response(
+                json.dumps(data), headers=[('Content-Type', 'application/json')])
+
+        body = METRICS.to_prometheus(dbname) + gauge_lines(
+            'odoo_mail_queue_depth', "Outgoing mails waiting per mail server.",
+            'mail_server_id', queued, dbname)
+        return request.make_response(
+            body, headers=[('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')])
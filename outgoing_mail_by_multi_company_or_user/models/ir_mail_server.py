@@ -1,5 +1,22 @@
 # Part of Odoo. See COPYRIGHT & LICENSE files for full copyright and licensing details.
-from odoo import fields, models, api
+import threading
+import time
+from datetime import timedelta
+
+from odoo import fields, models, api, tools
+
+from ..tools.metrics import ROUTING_CACHE, ROUTING_SECONDS, SEND_FAILURES, SEND_SECONDS
+from ..tools.rate_limit import SERVER_BUCKETS
+from ..tools.server_health import SERVER_HEALTH, HEALTH_MIN_SAMPLES, HEALTH_WINDOW, health_score, is_degraded
+from ..tools.smtp_pool import SMTP_POOL
+
+DEFAULT_SMTP_POOL_IDLE_TIMEOUT = 60
+HEALTH_FIELDS = ['health_error_rate', 'health_avg_latency', 'health_degraded', 'health_updated_at']
+# Fields deciding which servers a mail can be routed to.
+ROUTING_FIELDS = {'company_ids', 'user_ids', 'is_smtp_by_company', 'is_smtp_by_user', 'active', 'sequence'}
+
+# Set by the cached routing lookup when it actually hits the database.
+_routing_lookup = threading.local()
 
 
 class ir_mail_server(models.Model):
@@ -12,6 +29,36 @@ class ir_mail_server(models.Model):
         string="Company")
     is_smtp_by_company = fields.Boolean("Is SMTP by Company", default=False)
     is_smtp_by_user = fields.Boolean("Is SMTP by User", default=False)
+    max_mails_per_minute = fields.Integer(
+        "Max Mails per Minute", default=0,
+        help="Sending rate allowed by the provider for this server. 0 means unlimited.")
+    max_mail_burst = fields.Integer(
+        "Max Mail Burst", default=10,
+        help="Number of mails that may be sent back to back before the rate limit applies.")
+    health_error_rate = fields.Float("Recent Error Rate", readonly=True, copy=False)
+    health_avg_latency = fields.Float("Recent Average Send Time (s)", readonly=True, copy=False)
+    health_degraded = fields.Boolean("Degraded", readonly=True, copy=False)
+    health_updated_at = fields.Datetime("Health Updated On", readonly=True, copy=False)
+    queue_depth = fields.Integer("Queued Mails", compute='_compute_routing_stats')
+    send_count = fields.Integer("Mails Sent (this worker)", compute='_compute_routing_stats')
+    send_failure_count = fields.Integer("Send Failures (this worker)", compute='_compute_routing_stats')
+    avg_send_time = fields.Float("Average Send Time (s)", compute='_compute_routing_stats')
+
+    def _compute_routing_stats(self):
+        queued = {
+            server.id: count
+            for server, count in self.env['mail.mail'].sudo()._read_group(
+                [('state', '=', 'outgoing'), ('mail_server_id', 'in', self.ids)],
+                ['mail_server_id'], ['__count'])
+        }
+        dbname = self.env.cr.dbname
+        for server in self:
+            labels = (dbname, str(server.id))
+            count, total = SEND_SECONDS.stats(labels)
+            server.queue_depth = queued.get(server.id, 0)
+            server.send_count = count
+            server.send_failure_count = int(SEND_FAILURES.value(labels))
+            server.avg_send_time = total / count if count else 0.0
 
     @api.model
     def default_get(self, fields):
@@ -23,3 +70,205 @@ class ir_mail_server(models.Model):
         if res_config_company.smtp_by_user:
             res.update({'is_smtp_by_user': True})
         return res
+
+    def _get_smtp_pool_idle_timeout(self):
+        """ Seconds an authenticated SMTP session may stay idle in the pool,
+        ``0`` disables pooling. """
+        ICPSudo = self.env['ir.config_parameter'].sudo()
+        return int(ICPSudo.get_param(
+            'send_mail_company_wish_ext.smtp_pool_idle_timeout',
+            DEFAULT_SMTP_POOL_IDLE_TIMEOUT) or 0)
+
+    def connect(self, host=None, port=None, user=None, password=None, encryption=None,
+                smtp_from=None, ssl_certificate=None, ssl_private_key=None, smtp_debug=False,
+                mail_server_id=None, allow_archived=False):
+        connect_kwargs = dict(
+            port=port, user=user, password=password, encryption=encryption,
+            smtp_from=smtp_from, ssl_certificate=ssl_certificate,
+            ssl_private_key=ssl_private_key, smtp_debug=smtp_debug,
+            mail_server_id=mail_server_id, allow_archived=allow_archived)
+        # Only connections to a configured server are pooled: ad-hoc hosts
+        # (e.g. "Test Connection" with unsaved values) always get a fresh one.
+        if not mail_server_id or host:
+            return super().connect(host=host, **connect_kwargs)
+
+        idle_timeout = self._get_smtp_pool_idle_timeout()
+        pooled = not smtp_debug and idle_timeout > 0
+        mail_server = self.sudo().browse(mail_server_id)
+        key = (self.env.cr.dbname, mail_server.id, smtp_from, str(mail_server.write_date))
+        if pooled:
+            SMTP_POOL.reap(idle_timeout)
+            session = SMTP_POOL.acquire(key, idle_timeout)
+            if session is not None:
+                return SMTP_POOL.wrap(key, session)
+
+        started = time.monotonic()
+        try:
+            session = super().connect(**connect_kwargs)
+        except Exception:
+            self._record_send_outcome(mail_server.id, time.monotonic() - started, False)
+            raise
+        if session is None or not pooled:
+            # session is None in test mode: no real connection was opened
+            return session
+        return SMTP_POOL.wrap(key, session)
+
+    def send_email(self, message, *args, **kwargs):
+        mail_server_id = kwargs.get('mail_server_id') or (args[0] if args else None) \
+            or getattr(kwargs.get('smtp_session'), 'mail_server_id', None)
+        started = time.monotonic()
+        try:
+            result = super().send_email(message, *args, **kwargs)
+        except Exception:
+            self._record_send_outcome(mail_server_id, time.monotonic() - started, False)
+            raise
+        self._record_send_outcome(mail_server_id, time.monotonic() - started, True)
+        return result
+
+    @api.model
+    def _record_send_outcome(self, mail_server_id, elapsed, ok):
+        dbname = self.env.cr.dbname
+        SERVER_HEALTH.record(dbname, mail_server_id, elapsed, ok)
+        labels = (dbname, str(mail_server_id or 'default'))
+        SEND_SECONDS.observe(elapsed, labels)
+        if not ok:
+            SEND_FAILURES.inc(labels)
+
+    # ------------------------------------------------------------
+    # Routing
+    # ------------------------------------------------------------
+
+    @api.model
+    def _resolve_mail_server(self, user, company_id, smtp_by_company, smtp_by_user):
+        """ Return the server a mail created by ``user`` in ``company_id``
+        must go through, ``None`` when routing does not apply (the stock
+        server selection is then kept). """
+        if smtp_by_company and smtp_by_user and user:
+            mode = 'company_user'
+        elif smtp_by_company and company_id:
+            mode = 'company'
+        elif smtp_by_user and user:
+            mode = 'user'
+        else:
+            return None
+        started = time.perf_counter()
+        _routing_lookup.miss = False
+        candidate_ids = self._get_routing_candidate_ids(mode, user.id if user else 0, company_id)
+        dbname = self.env.cr.dbname
+        ROUTING_CACHE.inc((dbname, 'miss' if _routing_lookup.miss else 'hit'))
+        server = self.sudo().browse(candidate_ids).exists()._select_healthiest()
+        ROUTING_SECONDS.observe(time.perf_counter() - started, (dbname, mode))
+        return server
+
+    @api.model
+    @tools.ormcache('mode', 'user_id', 'company_id')
+    def _get_routing_candidate_ids(self, mode, user_id, company_id):
+        """ Ids of the servers routing ``mode`` for the user/company, in
+        priority order. Cached until a mail server is created or changed. """
+        _routing_lookup.miss = True
+        if mode == 'company_user':
+            domain = [('company_ids', '=', company_id), ('user_ids', 'in', [user_id])]
+        elif mode == 'company':
+            domain = [('company_ids', '=', company_id)]
+        else:
+            domain = [('user_ids', 'in', [user_id])]
+        return tuple(self.sudo().search(domain).ids)
+
+    def _get_health_snapshot(self):
+        """ Health of the server over the rolling window: live figures of this
+        process when it has sent enough mail, the last flushed ones otherwise,
+        as long as they were flushed within the window. """
+        self.ensure_one()
+        snapshot = SERVER_HEALTH.snapshot(self.env.cr.dbname, self.id)
+        window_start = fields.Datetime.now() - timedelta(seconds=HEALTH_WINDOW)
+        if (snapshot['samples'] < HEALTH_MIN_SAMPLES and self.health_updated_at
+                and self.health_updated_at >= window_start):
+            snapshot = {
+                'samples': HEALTH_MIN_SAMPLES,
+                'error_rate': self.health_error_rate,
+                'avg_latency': self.health_avg_latency,
+            }
+        return snapshot
+
+    def _is_degraded(self):
+        return is_degraded(self._get_health_snapshot())
+
+    def _select_healthiest(self):
+        """ Pick one server among ``self`` (in priority order): the first one
+        that is not degraded, or the least degraded when all of them are. """
+        if len(self) <= 1:
+            return self
+        healthy = self.filtered(lambda server: not server._is_degraded())
+        if healthy:
+            return healthy[:1]
+        return min(self, key=lambda server: health_score(server._get_health_snapshot()))
+
+    def _get_failover_siblings(self):
+        """ Other active servers routing exactly the same companies and users. """
+        self.ensure_one()
+        return self.search([('id', '!=', self.id)]).filtered(
+            lambda server: server.company_ids == self.company_ids
+            and server.user_ids == self.user_ids)
+
+    @api.model
+    def _flush_health_snapshot(self):
+        """ Store the live health figures of this process on the servers so that
+        other workers (e.g. the ones creating mails) can route around them.
+        Stored figures older than the window are reset, so that a server no
+        longer sending mail is not reported degraded forever.
+        Plain SQL keeps write_date, and thus pooled connections, untouched. """
+        dbname = self.env.cr.dbname
+        updated = []
+        for server_id in SERVER_HEALTH.server_ids(dbname):
+            snapshot = SERVER_HEALTH.snapshot(dbname, server_id)
+            if not snapshot['samples']:
+                continue
+            self.env.cr.execute("""
+                UPDATE ir_mail_server
+                   SET health_error_rate = %s,
+                       health_avg_latency = %s,
+                       health_degraded = %s,
+                       health_updated_at = (now() AT TIME ZONE 'UTC')
+                 WHERE id = %s
+            """, (snapshot['error_rate'], snapshot['avg_latency'], is_degraded(snapshot), server_id))
+            updated.append(server_id)
+        self.env.cr.execute("""
+            UPDATE ir_mail_server
+               SET health_error_rate = 0,
+                   health_avg_latency = 0,
+                   health_degraded = false,
+                   health_updated_at = NULL
+             WHERE health_updated_at < (now() AT TIME ZONE 'UTC') - %s * interval '1 second'
+         RETURNING id
+        """, (HEALTH_WINDOW,))
+        updated.extend(row[0] for row in self.env.cr.fetchall())
+        self.browse(updated).invalidate_recordset(HEALTH_FIELDS)
+
+    def _get_send_rate_bucket(self):
+        """ Token bucket shared by every dispatcher thread sending through
+        this server, or ``None`` when the server is not rate limited. """
+        if not self or not self.max_mails_per_minute:
+            return None
+        return SERVER_BUCKETS.get(
+            (self.env.cr.dbname, self.id),
+            self.max_mails_per_minute / 60.0, self.max_mail_burst)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        servers = super().create(vals_list)
+        if any(ROUTING_FIELDS.intersection(vals) for vals in vals_list):
+            self.env.registry.clear_cache()
+        return servers
+
+    def write(self, vals):
+        SMTP_POOL.purge(self.env.cr.dbname, set(self.ids))
+        res = super().write(vals)
+        if ROUTING_FIELDS.intersection(vals):
+            self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        SMTP_POOL.purge(self.env.cr.dbname, set(self.ids))
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
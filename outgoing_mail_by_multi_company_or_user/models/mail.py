@@ -1,6 +1,20 @@
 # Part of Odoo. See COPYRIGHT & LICENSE files for full copyright and licensing details.
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from odoo import models, api
 
+from ..tools.metrics import MAILS_ROUTED
+
+_logger = logging.getLogger(__name__)
+
+# Parallel dispatch is opt-in: 0 keeps the stock serial processing.
+DEFAULT_DISPATCH_WORKERS = 0
+# Leave headroom below the default cron time limit.
+DISPATCH_TIME_BUDGET = 240
+
 
 class Mail(models.Model):
     _inherit = "mail.mail"
@@ -30,16 +44,9 @@ class Mail(models.Model):
 
             active_company_id = self.env.company and self.env.company.id or 0
 
-            if smtp_by_company and smtp_by_user and user:
-                out_mail_sever = self.env['ir.mail_server'].search(
-                    [('company_ids', '=', active_company_id), ('user_ids', 'in', [user.id])], limit=1)
-            elif smtp_by_company and active_company_id:
-                out_mail_sever = self.env['ir.mail_server'].search(
-                    [('company_ids', '=', active_company_id)], limit=1)
-            elif smtp_by_user and user:
-                out_mail_sever = self.env['ir.mail_server'].search(
-                    [('user_ids', 'in', [user.id])], limit=1)
-            else:
+            out_mail_sever = self.env['ir.mail_server']._resolve_mail_server(
+                user, active_company_id, smtp_by_company, smtp_by_user)
+            if out_mail_sever is None:
                 return super(Mail, self).create(val)
 
             if out_mail_sever:
@@ -55,10 +62,157 @@ class Mail(models.Model):
                         'email_from': email_from, 'reply_to': reply_to
                     })
                 val.update({'mail_server_id': out_mail_sever.id})
+                MAILS_ROUTED.inc((self.env.cr.dbname, str(out_mail_sever.id)))
+                _logger.debug("Mail routed to server %s (%s)", out_mail_sever.name, out_mail_sever.id)
 
             result = super(Mail, self).create(val)
             return result
 
+    # ------------------------------------------------------------
+    # Parallel queue dispatch
+    # ------------------------------------------------------------
+
+    def process_email_queue(self, *args, **kwargs):
+        """ Drain the queue of every mail server concurrently when no explicit
+        ids are given and parallel dispatch is enabled; the stock serial
+        processing is kept otherwise. """
+        ids = args[0] if args else kwargs.get('ids', kwargs.get('email_ids'))
+        workers = self._get_dispatch_workers()
+        if not ids:
+            self._reroute_from_degraded_servers()
+            # release the mails claimed by the reroute before the dispatch
+            # cursors claim their batches, like the stock queue commits
+            if not getattr(threading.current_thread(), 'testing', False):
+                self.env.cr.commit()
+        try:
+            if ids or workers <= 1:
+                return super().process_email_queue(*args, **kwargs)
+            return self._dispatch_email_queue_parallel(workers)
+        finally:
+            self.env['ir.mail_server'].sudo()._flush_health_snapshot()
+
+    @api.model
+    def _get_dispatch_workers(self):
+        ICPSudo = self.env['ir.config_parameter'].sudo()
+        return int(ICPSudo.get_param(
+            'send_mail_company_wish_ext.parallel_dispatch_workers',
+            DEFAULT_DISPATCH_WORKERS) or 0)
+
+    @api.model
+    def _get_queued_mail_server_ids(self):
+        """ Return the distinct ``mail_server_id`` (``None`` for the default
+        server) of mails ready to be sent. """
+        self.env.cr.execute("""
+            SELECT DISTINCT msg.mail_server_id
+              FROM mail_mail mm
+              JOIN mail_message msg ON msg.id = mm.mail_message_id
+             WHERE mm.state = 'outgoing'
+               AND (mm.scheduled_date IS NULL OR mm.scheduled_date <= (now() AT TIME ZONE 'UTC'))
+        """)
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _reroute_from_degraded_servers(self):
+        """ Move queued mails of degraded servers to a healthy server routing
+        the same companies and users, adapting the sender address when it is
+        the degraded server's login. """
+        MailServer = self.env['ir.mail_server'].sudo()
+        for server_id in self._get_queued_mail_server_ids():
+            server = MailServer.browse(server_id)
+            if not server or not server._is_degraded():
+                continue
+            target = server._get_failover_siblings().filtered(
+                lambda sibling: not sibling._is_degraded())[:1]
+            if not target:
+                continue
+            mail_ids = self._claim_outgoing_batch(server.id, None)
+            if not mail_ids:
+                continue
+            mails = self.sudo().browse(mail_ids)
+            mails.write({'mail_server_id': target.id})
+            if server.smtp_user and target.smtp_user and server.smtp_user != target.smtp_user:
+                old_sender = "<%s>" % server.smtp_user
+                for mail in mails.filtered(lambda m: m.email_from and old_sender in m.email_from):
+                    mail.email_from = mail.email_from.replace(old_sender, "<%s>" % target.smtp_user)
+            _logger.warning(
+                "Mail server %s is degraded, moved %s queued mail(s) to %s",
+                server.name, len(mails), target.name)
+
+    @api.model
+    def _claim_outgoing_batch(self, mail_server_id, limit):
+        """ Lock up to ``limit`` (``None``: all) outgoing mails of one server
+        for the current transaction, skipping rows already claimed by another
+        worker. """
+        server_clause = "msg.mail_server_id = %s" if mail_server_id else "msg.mail_server_id IS NULL"
+        params = [mail_server_id] if mail_server_id else []
+        self.env.cr.execute("""
+            SELECT mm.id
+              FROM mail_mail mm
+              JOIN mail_message msg ON msg.id = mm.mail_message_id
+             WHERE mm.state = 'outgoing'
+               AND (mm.scheduled_date IS NULL OR mm.scheduled_date <= (now() AT TIME ZONE 'UTC'))
+               AND %s
+          ORDER BY mm.id
+             LIMIT %%s
+               FOR UPDATE OF mm SKIP LOCKED
+        """ % server_clause, params + [limit])
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _dispatch_email_queue_parallel(self, workers):
+        server_ids = self._get_queued_mail_server_ids()
+        if not server_ids:
+            return True
+        deadline = time.monotonic() + DISPATCH_TIME_BUDGET
+        registry = self.env.registry
+        dbname, uid = self.env.cr.dbname, self.env.uid
+        with ThreadPoolExecutor(max_workers=min(workers, len(server_ids)),
+                                thread_name_prefix='mail_dispatch') as executor:
+            futures = {
+                server_id: executor.submit(
+                    self._dispatch_server_queue, registry, dbname, uid, server_id, deadline)
+                for server_id in server_ids
+            }
+        for server_id, future in futures.items():
+            try:
+                sent = future.result()
+                _logger.info("Dispatched %s mail(s) through mail server %s", sent, server_id or 'default')
+            except Exception:
+                _logger.exception("Mail dispatch failed for mail server %s", server_id or 'default')
+        return True
+
+    @api.model
+    def _dispatch_server_queue(self, registry, dbname, uid, mail_server_id, deadline):
+        """ Drain the queue of a single server, honouring its rate limit.
+
+        Each mail is claimed and sent in its own transaction: the row lock
+        taken by the claim is held until the mail is committed as sent, so
+        concurrent dispatchers can never pick it up again, and a failure or
+        a killed worker only loses the mail being sent. The rate limit is
+        waited for before a cursor is opened, so throttled servers do not
+        keep a database connection busy. """
+        current_thread = threading.current_thread()
+        current_thread.dbname = dbname
+        current_thread.uid = uid
+        with registry.cursor() as cr:
+            env = api.Environment(cr, uid, {})
+            bucket = env['ir.mail_server'].sudo().browse(mail_server_id)._get_send_rate_bucket()
+        processed = 0
+        while time.monotonic() < deadline:
+            if bucket and not bucket.take(1, deadline):
+                # out of time: the rest of the queue is sent by the next run
+                break
+            with registry.cursor() as cr:
+                env = api.Environment(cr, uid, {})
+                Mail = env['mail.mail']
+                mail_ids = Mail._claim_outgoing_batch(mail_server_id, 1)
+                if not mail_ids:
+                    break
+                Mail.browse(mail_ids).send(auto_commit=False, raise_exception=False)
+            processed += 1
+        return processed
+
+
 class MailMessage(models.Model):
     _inherit = "mail.message"
 
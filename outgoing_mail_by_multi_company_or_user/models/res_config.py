@@ -9,6 +9,14 @@ class ResConfigSettings(models.TransientModel):
 
     smtp_by_company = fields.Boolean(string="SMTP BY COMPANY", default=False)
     smtp_by_user = fields.Boolean(string="SMTP BY USER", default=False)
+    smtp_pool_idle_timeout = fields.Integer(
+        string="SMTP Connection Idle Timeout", default=60,
+        help="Seconds an authenticated SMTP connection is kept open for reuse "
+             "between mail batches. Set 0 to open a new connection for every batch.")
+    parallel_dispatch_workers = fields.Integer(
+        string="Parallel Mail Dispatch Workers", default=0,
+        help="Number of mail servers whose queue is sent concurrently by the mail "
+             "queue cron. Leave 0 (or 1) to send the whole queue serially.")
 
     # @api.onchange('smtp_by_company')
     # def onchange_smtp_config_company(self):
@@ -35,10 +43,16 @@ class ResConfigSettings(models.TransientModel):
             'send_mail_company_wish_ext.smtp_by_company')
         smtp_by_user = ICPSudo.get_param(
             'send_mail_company_wish_ext.smtp_by_user')
+        smtp_pool_idle_timeout = ICPSudo.get_param(
+            'send_mail_company_wish_ext.smtp_pool_idle_timeout', 60)
+        parallel_dispatch_workers = ICPSudo.get_param(
+            'send_mail_company_wish_ext.parallel_dispatch_workers', 0)
 
         res.update(
             smtp_by_company=smtp_by_company,
-            smtp_by_user=smtp_by_user
+            smtp_by_user=smtp_by_user,
+            smtp_pool_idle_timeout=int(smtp_pool_idle_timeout or 0),
+            parallel_dispatch_workers=int(parallel_dispatch_workers or 0),
         )
         return res
 
@@ -49,7 +63,17 @@ class ResConfigSettings(models.TransientModel):
             "send_mail_company_wish_ext.smtp_by_company", self.smtp_by_company)
         ICPSudo.set_param(
             "send_mail_company_wish_ext.smtp_by_user", self.smtp_by_user)
-        mail_server_config = self.env['ir.mail_server'].sudo().search([])
-        for mail_server in mail_server_config:
-            mail_server.is_smtp_by_company = self.smtp_by_company
-            mail_server.is_smtp_by_user = self.smtp_by_user
+        ICPSudo.set_param(
+            "send_mail_company_wish_ext.smtp_pool_idle_timeout", self.smtp_pool_idle_timeout)
+        ICPSudo.set_param(
+            "send_mail_company_wish_ext.parallel_dispatch_workers", self.parallel_dispatch_workers)
+        # a single write clears the routing cache once, and servers already
+        # configured keep their pooled connections
+        mail_server_config = self.env['ir.mail_server'].sudo().search([]).filtered(
+            lambda server: (server.is_smtp_by_company, server.is_smtp_by_user)
+            != (self.smtp_by_company, self.smtp_by_user))
+        if mail_server_config:
+            mail_server_config.write({
+                'is_smtp_by_company': self.smtp_by_company,
+                'is_smtp_by_user': self.smtp_by_user,
+            })
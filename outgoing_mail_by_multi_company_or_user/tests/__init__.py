@@ -0,0 +1,6 @@
+# Part of Odoo. See COPYRIGHT & LICENSE files for full copyright and licensing details.
+from . import test_smtp_pool
+from . import test_mail_dispatch
+from . import test_mail_failover
+from . import test_mail_routing
+from . import test_mail_routing_metrics
@@ -0,0 +1,158 @@
+# Part of Odoo. See COPYRIGHT & LICENSE files for full copyright and licensing details.
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from odoo import SUPERUSER_ID, api, sql_db
+from odoo.tests import tagged
+from odoo.tests.common import BaseCase, TransactionCase
+
+from ..tools import rate_limit
+from ..tools.rate_limit import TokenBucket
+
+
+@tagged('post_install', '-at_install')
+class TestTokenBucket(BaseCase):
+
+    def setUp(self):
+        super().setUp()
+        self.now = 1000.0
+        self.sleeps = []
+
+        def sleep(seconds):
+            self.sleeps.append(seconds)
+            self.now += seconds
+
+        clock = patch.object(rate_limit, 'time', SimpleNamespace(monotonic=lambda: self.now, sleep=sleep))
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def test_unlimited(self):
+        bucket = TokenBucket(0, 1)
+        self.assertEqual(bucket.take(500, self.now), 500)
+        self.assertFalse(self.sleeps)
+
+    def test_burst(self):
+        bucket = TokenBucket(1, 5)
+        self.assertEqual(bucket.take(3, self.now + 10), 3)
+        self.assertEqual(bucket.take(10, self.now + 10), 2, "only the banked tokens are granted")
+        self.assertFalse(self.sleeps)
+
+    def test_refill(self):
+        bucket = TokenBucket(2, 5)
+        self.assertEqual(bucket.take(5, self.now + 10), 5)
+        # empty bucket: wait for the next token (1 / rate seconds)
+        self.assertEqual(bucket.take(5, self.now + 10), 1)
+        self.assertEqual(self.sleeps, [0.5])
+        # refilling never banks more than the burst
+        self.now += 60
+        self.assertEqual(bucket.take(50, self.now + 10), 5)
+
+    def test_deadline(self):
+        bucket = TokenBucket(0.1, 1)
+        self.assertEqual(bucket.take(1, self.now), 1)
+        # the next token comes in 10s, after the deadline: do not wait for it
+        self.assertEqual(bucket.take(1, self.now + 5), 0)
+        self.assertFalse(self.sleeps)
+        self.assertEqual(bucket.take(1, self.now + 10), 1)
+        self.assertEqual(self.sleeps, [10.0])
+
+
+@tagged('post_install', '-at_install')
+class TestMailDispatch(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = cls.env['ir.mail_server'].create({
+            'name': 'Dispatch', 'smtp_host': 'smtp.example.com',
+        })
+
+    def _create_mails(self, env, server, count):
+        Mail = env['mail.mail'].sudo()
+        mails = Mail
+        for index in range(count):
+            mails |= Mail.create({
+                'subject': 'Dispatch %s' % index,
+                'body_html': '<p>Dispatch</p>',
+                'email_to': 'recipient@example.com',
+                'mail_server_id': server.id,
+            })
+        return mails
+
+    def test_claim_skips_locked_mails(self):
+        """ Two dispatchers claiming the same queue get disjoint batches. Row
+        locks only show between separate connections, so the mails are
+        committed through real cursors and removed afterwards. """
+        db = sql_db.db_connect(self.env.cr.dbname)
+        with db.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            server = env['ir.mail_server'].create({'name': 'Claim', 'smtp_host': 'smtp.example.com'})
+            mail_ids = set(self._create_mails(env, server, 4).ids)
+            server_id = server.id
+
+        def cleanup():
+            with db.cursor() as cr:
+                env = api.Environment(cr, SUPERUSER_ID, {})
+                env['mail.mail'].browse(mail_ids).unlink()
+                env['ir.mail_server'].browse(server_id).unlink()
+        self.addCleanup(cleanup)
+
+        with db.cursor() as cr_a, db.cursor() as cr_b:
+            claimed_a = api.Environment(cr_a, SUPERUSER_ID, {})['mail.mail']._claim_outgoing_batch(server_id, 3)
+            claimed_b = api.Environment(cr_b, SUPERUSER_ID, {})['mail.mail']._claim_outgoing_batch(server_id, None)
+            self.assertEqual(len(claimed_a), 3)
+            self.assertEqual(len(claimed_b), 1)
+            self.assertEqual(set(claimed_a) | set(claimed_b), mail_ids)
+            cr_a.rollback()
+            # once the first dispatcher ends its transaction, its mails can be claimed again
+            claimed_b_again = api.Environment(cr_b, SUPERUSER_ID, {})['mail.mail']._claim_outgoing_batch(server_id, None)
+            self.assertEqual(set(claimed_b_again), mail_ids)
+            cr_b.rollback()
+
+    def test_dispatch_one_mail_per_transaction(self):
+        mails = self._create_mails(self.env, self.server, 3)
+        sent = []
+
+        def send(records, auto_commit=False, raise_exception=False):
+            self.assertFalse(auto_commit, "the dispatcher commits itself, after the mail is sent")
+            sent.append(records.ids)
+            records.write({'state': 'sent'})
+
+        with patch.object(type(self.env['mail.mail']), 'send', autospec=True, side_effect=send):
+            processed = self.env['mail.mail']._dispatch_server_queue(
+                self.registry, self.env.cr.dbname, self.env.uid, self.server.id, time.monotonic() + 30)
+        self.assertEqual(processed, 3)
+        self.assertEqual(sent, [[mail_id] for mail_id in mails.ids])
+        mails.invalidate_recordset(['state'])
+        self.assertEqual(set(mails.mapped('state')), {'sent'})
+
+    def test_dispatch_waits_for_rate_limit_outside_cursor(self):
+        self.server.write({'max_mails_per_minute': 6, 'max_mail_burst': 1})
+        mails = self._create_mails(self.env, self.server, 2)
+        registry = self.registry
+        opened = []
+        real_cursor = type(registry).cursor
+
+        def cursor(reg, *args, **kwargs):
+            opened.append(True)
+            return real_cursor(reg, *args, **kwargs)
+
+        def take(bucket, count, deadline):
+            self.assertEqual(count, 1)
+            # no dispatch cursor is open while waiting: only the one reading the bucket
+            self.assertEqual(len(opened), 1 + len(sent))
+            return 1 if not sent else 0
+
+        sent = []
+        with patch.object(type(registry), 'cursor', autospec=True, side_effect=cursor), \
+                patch.object(TokenBucket, 'take', autospec=True, side_effect=take), \
+                patch.object(type(self.env['mail.mail']), 'send', autospec=True,
+                             side_effect=lambda records, **kwargs: sent.append(records.ids)):
+            processed = self.env['mail.mail']._dispatch_server_queue(
+                registry, self.env.cr.dbname, self.env.uid, self.server.id, time.monotonic() + 30)
+        # out of tokens before the deadline: the second mail waits for the next run
+        self.assertEqual(processed, 1)
+        self.assertEqual(sent, [mails[:1].ids])
+        mails.invalidate_recordset(['state'])
+        self.assertEqual(mails[1].state, 'outgoing')
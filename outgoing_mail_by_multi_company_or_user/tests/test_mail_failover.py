@@ -0,0 +1,185 @@
+# Part of Odoo. See COPYRIGHT & LICENSE files for full copyright and licensing details.
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.tests import tagged
+from odoo.tests.common import BaseCase, TransactionCase
+
+from ..models import ir_mail_server
+from ..tools import server_health
+from ..tools.server_health import (
+    HEALTH_MAX_AVG_LATENCY, HEALTH_MAX_ERROR_RATE, HEALTH_MIN_SAMPLES, HEALTH_WINDOW,
+    ServerHealthTracker, health_score, is_degraded,
+)
+
+
+@tagged('post_install', '-at_install')
+class TestServerHealth(BaseCase):
+
+    def _snapshot(self, samples, error_rate=0.0, avg_latency=0.0):
+        return {'samples': samples, 'error_rate': error_rate, 'avg_latency': avg_latency}
+
+    def test_thresholds(self):
+        self.assertEqual((HEALTH_MIN_SAMPLES, HEALTH_MAX_ERROR_RATE, HEALTH_MAX_AVG_LATENCY), (5, 0.5, 10.0))
+        self.assertFalse(is_degraded(self._snapshot(4, error_rate=1.0, avg_latency=60.0)),
+                         "too few samples to judge a server")
+        self.assertFalse(is_degraded(self._snapshot(5, error_rate=0.4, avg_latency=9.9)))
+        self.assertTrue(is_degraded(self._snapshot(5, error_rate=0.5)))
+        self.assertTrue(is_degraded(self._snapshot(5, avg_latency=10.0)))
+
+    def test_health_score(self):
+        self.assertLess(health_score(self._snapshot(5, avg_latency=2.0)),
+                        health_score(self._snapshot(5, error_rate=0.3, avg_latency=0.5)))
+        self.assertEqual(health_score(self._snapshot(5, error_rate=1.0)), HEALTH_MAX_AVG_LATENCY)
+
+    def test_tracker_window(self):
+        clock = SimpleNamespace(now=1000.0)
+        tracker = ServerHealthTracker()
+        with patch.object(server_health, 'time', SimpleNamespace(monotonic=lambda: clock.now)):
+            tracker.record('db', False, 1.0, False)
+            self.assertFalse(tracker.server_ids('db'), "the default server is not tracked")
+            tracker.record('db', 1, 3.0, False)
+            clock.now += 100
+            tracker.record('db', 1, 1.0, True)
+            tracker.record('other_db', 1, 1.0, True)
+            self.assertEqual(tracker.snapshot('db', 1), self._snapshot(2, error_rate=0.5, avg_latency=2.0))
+            clock.now += HEALTH_WINDOW - 50
+            # the first sample fell out of the window
+            self.assertEqual(tracker.snapshot('db', 1), self._snapshot(1, avg_latency=1.0))
+            self.assertEqual(tracker.snapshot('db', 2), self._snapshot(0))
+            self.assertEqual(tracker.server_ids('db'), [1])
+
+
+@tagged('post_install', '-at_install')
+class TestMailFailover(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.company = cls.env['res.company'].create({'name': 'Failover Company'})
+        MailServer = cls.env['ir.mail_server']
+        cls.primary = MailServer.create({
+            'name': 'Primary', 'sequence': 1, 'smtp_host': 'smtp.example.com',
+            'smtp_user': 'primary@example.com', 'company_ids': [(6, 0, cls.company.ids)],
+        })
+        cls.sibling = MailServer.create({
+            'name': 'Sibling', 'sequence': 2, 'smtp_host': 'smtp.example.com',
+            'smtp_user': 'sibling@example.com', 'company_ids': [(6, 0, cls.company.ids)],
+        })
+        cls.unrelated = MailServer.create({
+            'name': 'Unrelated', 'sequence': 0, 'smtp_host': 'smtp.example.com',
+            'smtp_user': 'unrelated@example.com',
+        })
+
+    def setUp(self):
+        super().setUp()
+        # a tracker of our own, so that samples neither leak into nor come
+        # from other tests of the process
+        self.health = ServerHealthTracker()
+        patcher = patch.object(ir_mail_server, 'SERVER_HEALTH', self.health)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _fail(self, server, count):
+        for _i in range(count):
+            self.health.record(self.env.cr.dbname, server.id, 1.0, False)
+
+    def _create_mail(self, server, email_from):
+        return self.env['mail.mail'].sudo().create({
+            'subject': 'Failover',
+            'body_html': '<p>Failover</p>',
+            'email_from': email_from,
+            'email_to': 'recipient@example.com',
+            'mail_server_id': server.id,
+        })
+
+    def test_failover_siblings(self):
+        self.assertEqual(self.primary._get_failover_siblings(), self.sibling)
+        self.assertEqual(self.sibling._get_failover_siblings(), self.primary)
+        self.assertFalse(self.unrelated._get_failover_siblings().filtered(
+            lambda server: server in (self.primary | self.sibling)))
+
+    def test_reroute_degraded_server(self):
+        login_mail = self._create_mail(self.primary, 'Sender <primary@example.com>')
+        other_mail = self._create_mail(self.primary, 'Sender <sender@example.com>')
+        sibling_mail = self._create_mail(self.sibling, 'Sender <sibling@example.com>')
+        self._fail(self.primary, HEALTH_MIN_SAMPLES)
+
+        self.env['mail.mail']._reroute_from_degraded_servers()
+
+        (login_mail | other_mail).invalidate_recordset()
+        self.assertEqual((login_mail | other_mail).mail_server_id, self.sibling)
+        self.assertEqual(login_mail.email_from, 'Sender <sibling@example.com>',
+                         "the sender is the degraded server's login: use the sibling's one")
+        self.assertEqual(other_mail.email_from, 'Sender <sender@example.com>')
+        self.assertEqual(sibling_mail.mail_server_id, self.sibling)
+
+    def test_no_reroute_below_min_samples(self):
+        mail = self._create_mail(self.primary, 'Sender <primary@example.com>')
+        self._fail(self.primary, HEALTH_MIN_SAMPLES - 1)
+        self.env['mail.mail']._reroute_from_degraded_servers()
+        mail.invalidate_recordset()
+        self.assertEqual(mail.mail_server_id, self.primary)
+        self.assertEqual(mail.email_from, 'Sender <primary@example.com>')
+
+    def test_no_reroute_to_degraded_sibling(self):
+        mail = self._create_mail(self.primary, 'Sender <primary@example.com>')
+        self._fail(self.primary, HEALTH_MIN_SAMPLES)
+        self._fail(self.sibling, HEALTH_MIN_SAMPLES)
+        self.env['mail.mail']._reroute_from_degraded_servers()
+        mail.invalidate_recordset()
+        self.assertEqual(mail.mail_server_id, self.primary)
+
+    def test_select_healthiest(self):
+        servers = self.primary | self.sibling
+        self.assertEqual(servers._select_healthiest(), self.primary)
+        self._fail(self.primary, HEALTH_MIN_SAMPLES)
+        self.assertEqual(servers._select_healthiest(), self.sibling)
+        # every server degraded: the least bad one still gets the mail
+        for _i in range(HEALTH_MIN_SAMPLES):
+            self.health.record(self.env.cr.dbname, self.sibling.id, 10.5, True)
+        self.assertEqual(servers._select_healthiest(), self.sibling)
+
+    def test_flush_health_snapshot(self):
+        write_date = self.primary.write_date
+        self._fail(self.primary, HEALTH_MIN_SAMPLES)
+        self.health.record(self.env.cr.dbname, self.sibling.id, 2.0, True)
+
+        self.env['ir.mail_server']._flush_health_snapshot()
+
+        self.assertRecordValues(self.primary | self.sibling, [
+            {'health_error_rate': 1.0, 'health_avg_latency': 1.0, 'health_degraded': True},
+            {'health_error_rate': 0.0, 'health_avg_latency': 2.0, 'health_degraded': False},
+        ])
+        self.assertTrue(self.primary.health_updated_at)
+        self.assertEqual(self.primary.write_date, write_date,
+                         "flushing must not touch write_date, which keys pooled connections")
+
+    def test_stored_health_used_by_other_workers(self):
+        self._fail(self.primary, HEALTH_MIN_SAMPLES)
+        self.env['ir.mail_server']._flush_health_snapshot()
+        # another worker, without samples of its own, relies on the stored figures
+        self.health = ServerHealthTracker()
+        with patch.object(ir_mail_server, 'SERVER_HEALTH', self.health):
+            self.assertTrue(self.primary._is_degraded())
+            self.assertEqual((self.primary | self.sibling)._select_healthiest(), self.sibling)
+
+    def test_flush_resets_stale_health(self):
+        stale = fields.Datetime.now() - timedelta(seconds=HEALTH_WINDOW + 60)
+        self.env.cr.execute("""
+            UPDATE ir_mail_server
+               SET health_error_rate = 1, health_avg_latency = 1,
+                   health_degraded = true, health_updated_at = %s
+             WHERE id = %s
+        """, (stale, self.primary.id))
+        self.primary.invalidate_recordset()
+        self.assertFalse(self.primary._is_degraded(), "stored figures older than the window are ignored")
+
+        self.env['ir.mail_server']._flush_health_snapshot()
+
+        self.assertRecordValues(self.primary, [{
+            'health_error_rate': 0.0, 'health_avg_latency': 0.0,
+            'health_degraded': False, 'health_updated_at': False,
+        }])
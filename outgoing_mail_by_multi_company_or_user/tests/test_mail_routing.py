@@ -0,0 +1,132 @@
+# Part of Odoo. See COPYRIGHT & LICENSE files for full copyright and licensing details.
+from odoo.addons.mail.tests.common import mail_new_test_user
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+from ..tools.metrics import ROUTING_CACHE
+
+
+@tagged('post_install', '-at_install')
+class TestMailRouting(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.company_a = cls.env['res.company'].create({'name': 'Routing Company A'})
+        cls.company_b = cls.env['res.company'].create({'name': 'Routing Company B'})
+        cls.user = mail_new_test_user(
+            cls.env, login='routing_user', name='Routing User', email='routing.user@example.com',
+            groups='base.group_user', company_id=cls.company_a.id,
+            company_ids=[(6, 0, (cls.company_a | cls.company_b).ids)])
+        cls.recipient = cls.env['res.partner'].create({
+            'name': 'Routing Recipient',
+            'email': 'recipient@example.com',
+        })
+
+        MailServer = cls.env['ir.mail_server']
+        cls.server_a = MailServer.create({
+            'name': 'Company A', 'sequence': 1, 'smtp_host': 'smtp.example.com',
+            'smtp_user': 'company.a@example.com', 'company_ids': [(6, 0, cls.company_a.ids)],
+        })
+        cls.server_b = MailServer.create({
+            'name': 'Company B', 'sequence': 1, 'smtp_host': 'smtp.example.com',
+            'smtp_user': 'company.b@example.com', 'company_ids': [(6, 0, cls.company_b.ids)],
+        })
+        cls.server_user = MailServer.create({
+            'name': 'User', 'sequence': 2, 'smtp_host': 'smtp.example.com',
+            'smtp_user': 'user@example.com', 'user_ids': [(6, 0, cls.user.ids)],
+        })
+        cls.server_company_user = MailServer.create({
+            'name': 'Company A and User', 'sequence': 3, 'smtp_host': 'smtp.example.com',
+            'smtp_user': 'company.a.user@example.com',
+            'company_ids': [(6, 0, cls.company_a.ids)], 'user_ids': [(6, 0, cls.user.ids)],
+        })
+
+    def _set_routing(self, by_company, by_user):
+        ICPSudo = self.env['ir.config_parameter'].sudo()
+        ICPSudo.set_param('send_mail_company_wish_ext.smtp_by_company', by_company)
+        ICPSudo.set_param('send_mail_company_wish_ext.smtp_by_user', by_user)
+
+    def _create_mail(self, company):
+        return self.env['mail.mail'].with_user(self.user).with_company(company).sudo().create({
+            'subject': 'Routing',
+            'body_html': '<p>Routing</p>',
+            'email_to': self.recipient.email,
+        })
+
+    def test_routing_disabled(self):
+        self._set_routing(False, False)
+        mail = self._create_mail(self.company_a)
+        self.assertFalse(mail.mail_server_id)
+
+    def test_route_by_company(self):
+        self._set_routing(True, False)
+        mail = self._create_mail(self.company_a)
+        self.assertEqual(mail.mail_server_id, self.server_a)
+        self.assertEqual(mail.email_from, 'Routing User <company.a@example.com>')
+        self.assertEqual(self._create_mail(self.company_b).mail_server_id, self.server_b)
+
+    def test_route_by_user(self):
+        self._set_routing(False, True)
+        for company in (self.company_a, self.company_b):
+            mail = self._create_mail(company)
+            self.assertEqual(mail.mail_server_id, self.server_user)
+            self.assertEqual(mail.email_from, 'Routing User <user@example.com>')
+
+    def test_route_by_company_and_user(self):
+        self._set_routing(True, True)
+        self.assertEqual(self._create_mail(self.company_a).mail_server_id, self.server_company_user)
+        # no server routes both the user and company B
+        self.assertFalse(self._create_mail(self.company_b).mail_server_id)
+
+    def test_route_follows_server_changes(self):
+        """ The cached routing lookup is dropped when a server changes. """
+        self._set_routing(True, False)
+        self.assertEqual(self._create_mail(self.company_a).mail_server_id, self.server_a)
+        self.server_a.company_ids = [(5, 0, 0)]
+        self.assertEqual(self._create_mail(self.company_a).mail_server_id, self.server_company_user)
+
+    def _routing_lookups(self):
+        dbname = self.env.cr.dbname
+        return ROUTING_CACHE.value((dbname, 'hit')), ROUTING_CACHE.value((dbname, 'miss'))
+
+    def test_route_cache_kept_on_other_changes(self):
+        """ Only changes of routing fields drop the cached routing lookup. """
+        self._set_routing(True, False)
+        self._create_mail(self.company_a)
+        hits, misses = self._routing_lookups()
+        self.server_b.write({'smtp_port': 2525, 'smtp_user': 'company.b.new@example.com'})
+        self.assertEqual(self._create_mail(self.company_a).mail_server_id, self.server_a)
+        self.assertEqual(self._routing_lookups(), (hits + 1, misses))
+
+        self.server_b.sequence = 0
+        self._create_mail(self.company_a)
+        self.assertEqual(self._routing_lookups(), (hits + 1, misses + 1))
+
+    def test_route_follows_settings(self):
+        settings = self.env['res.config.settings'].create({'smtp_by_company': True})
+        settings.execute()
+        servers = self.server_a | self.server_b | self.server_user | self.server_company_user
+        self.assertEqual(set(servers.mapped('is_smtp_by_company')), {True})
+        self.assertEqual(set(servers.mapped('is_smtp_by_user')), {False})
+        self.assertEqual(self._create_mail(self.company_b).mail_server_id, self.server_b)
+
+    def test_route_message_post(self):
+        """ Notification mails of a posted message are routed like the others,
+        in every mode. """
+        cases = [
+            ((True, False), self.server_a),
+            ((False, True), self.server_user),
+            ((True, True), self.server_company_user),
+        ]
+        for (by_company, by_user), server in cases:
+            with self.subTest(by_company=by_company, by_user=by_user):
+                self._set_routing(by_company, by_user)
+                # sudo keeps the user as author and router of the message
+                partner = self.recipient.with_user(self.user).with_company(self.company_a).with_context(
+                    mail_notify_force_send=False).sudo()
+                message = partner.message_post(
+                    body='Routing', partner_ids=self.recipient.ids,
+                    message_type='comment', subtype_xmlid='mail.mt_comment')
+                mail = self.env['mail.mail'].sudo().search([('mail_message_id', '=', message.id)])
+                self.assertEqual(mail.mail_server_id, server)
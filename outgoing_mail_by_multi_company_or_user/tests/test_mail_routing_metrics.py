@@ -0,0 +1,115 @@
+# Part of Odoo. See COPYRIGHT & LICENSE files for full copyright and licensing details.
+import json
+
+from odoo.addons.mail.tests.common import mail_new_test_user
+from odoo.tests import tagged
+from odoo.tests.common import BaseCase, HttpCase
+
+from ..tools.metrics import MetricsRegistry, format_labels, gauge_lines
+
+
+@tagged('post_install', '-at_install')
+class TestMetrics(BaseCase):
+
+    def setUp(self):
+        super().setUp()
+        self.metrics = MetricsRegistry()
+        self.counter = self.metrics.counter('test_total', "Test counter.", ('server',))
+        self.histogram = self.metrics.histogram('test_seconds', "Test histogram.", (0.1, 1.0), ('mode',))
+
+    def test_counter(self):
+        self.counter.inc(('db', '1'))
+        self.counter.inc(['db', '1'], amount=2)
+        self.assertEqual(self.counter.value(('db', '1')), 3)
+        self.assertEqual(self.counter.value(('db', '2')), 0)
+
+    def test_histogram(self):
+        for value in (0.05, 0.1, 0.5, 2.0):
+            self.histogram.observe(value, ('db', 'user'))
+        self.assertEqual(self.histogram.stats(('db', 'user')), (4, 2.65))
+        self.assertEqual(self.histogram.stats(('db', 'company')), (0, 0.0))
+        # upper bounds are inclusive, the last bucket catches the rest
+        self.assertEqual(self.histogram.samples(), [(('db', 'user'), [2, 1, 1], 2.65)])
+
+    def test_to_dict(self):
+        self.counter.inc(('db', '1'))
+        self.counter.inc(('other_db', '1'))
+        self.histogram.observe(0.5, ('db', 'user'))
+        self.assertEqual(self.metrics.to_dict('db'), {
+            'test_total': [{'labels': {'server': '1'}, 'value': 1}],
+            'test_seconds': [{
+                'labels': {'mode': 'user'}, 'count': 1, 'sum': 0.5,
+                'buckets': {'0.1': 0, '1.0': 1, '+Inf': 0},
+            }],
+        })
+        self.assertEqual(self.metrics.to_dict('empty_db'), {'test_total': [], 'test_seconds': []})
+
+    def test_to_prometheus(self):
+        self.counter.inc(('db', '1'))
+        self.counter.inc(('other_db', '1'))
+        self.histogram.observe(0.05, ('db', 'user'))
+        self.histogram.observe(5.0, ('db', 'user'))
+        self.assertEqual(self.metrics.to_prometheus('db').splitlines(), [
+            '# HELP test_total Test counter.',
+            '# TYPE test_total counter',
+            'test_total{db="db",server="1"} 1.0',
+            '# HELP test_seconds Test histogram.',
+            '# TYPE test_seconds histogram',
+            'test_seconds_bucket{db="db",mode="user",le="0.1"} 1',
+            'test_seconds_bucket{db="db",mode="user",le="1.0"} 1',
+            'test_seconds_bucket{db="db",mode="user",le="+Inf"} 2',
+            'test_seconds_sum{db="db",mode="user"} 5.05',
+            'test_seconds_count{db="db",mode="user"} 2',
+        ])
+
+    def test_labels(self):
+        self.assertEqual(format_labels(('db', 'name'), ('db', 'a"b\\c')), 'db="db",name="a\\"b\\\\c"')
+        self.assertEqual(
+            gauge_lines('queue', "Queue.", 'server', {'1': 3, 'default': 0}, 'db').splitlines(), [
+                '# HELP queue Queue.',
+                '# TYPE queue gauge',
+                'queue{db="db",server="1"} 3',
+                'queue{db="db",server="default"} 0',
+            ])
+
+
+@tagged('post_install', '-at_install')
+class TestMetricsController(HttpCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = cls.env['ir.mail_server'].create({
+            'name': 'Metrics', 'smtp_host': 'smtp.example.com',
+        })
+        for _i in range(2):
+            cls.env['mail.mail'].sudo().create({
+                'subject': 'Metrics',
+                'body_html': '<p>Metrics</p>',
+                'email_to': 'recipient@example.com',
+                'mail_server_id': cls.server.id,
+            })
+        mail_new_test_user(cls.env, login='metrics_user', groups='base.group_user')
+
+    def test_metrics_prometheus(self):
+        self.authenticate('admin', 'admin')
+        response = self.url_open('/mail_routing/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('# TYPE odoo_mail_routing_seconds histogram', response.text)
+        self.assertIn('# TYPE odoo_mail_queue_depth gauge', response.text)
+        self.assertIn('odoo_mail_queue_depth{db="%s",mail_server_id="%s"} 2' % (
+            self.env.cr.dbname, self.server.id), response.text.splitlines())
+
+    def test_metrics_json(self):
+        self.authenticate('admin', 'admin')
+        response = self.url_open('/mail_routing/metrics?format=json')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.text)
+        self.assertIn('odoo_mail_send_seconds', data)
+        self.assertIn({'labels': {'mail_server_id': str(self.server.id)}, 'value': 2},
+                      data['odoo_mail_queue_depth'])
+
+    def test_metrics_admin_only(self):
+        self.authenticate('metrics_user', 'metrics_user')
+        self.assertEqual(self.url_open('/mail_routing/metrics').status_code, 404)
@@ -0,0 +1,212 @@
+# Part of Odoo. See COPYRIGHT & LICENSE files for full copyright and licensing details.
+import smtplib
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from odoo.tests import tagged
+from odoo.tests.common import BaseCase, TransactionCase
+
+from ..tools import smtp_pool
+from ..tools.smtp_pool import MAX_IDLE_PER_KEY, SMTP_POOL, SMTPConnectionPool
+
+
+class FakeSMTP(object):
+    """ Stand-in for an authenticated ``smtplib.SMTP`` session. """
+
+    def __init__(self, noop_code=250, noop_error=None):
+        self.noop_code = noop_code
+        self.noop_error = noop_error
+        self.noop_calls = 0
+        self.quit_calls = 0
+        self.closed = False
+
+    def noop(self):
+        self.noop_calls += 1
+        if self.noop_error:
+            raise self.noop_error
+        return (self.noop_code, b'OK')
+
+    def quit(self):
+        self.quit_calls += 1
+        self.closed = True
+        return (221, b'Bye')
+
+    def close(self):
+        self.closed = True
+
+
+@tagged('post_install', '-at_install')
+class TestSMTPConnectionPool(BaseCase):
+
+    def setUp(self):
+        super().setUp()
+        self.pool = SMTPConnectionPool()
+        self.now = 1000.0
+        clock = patch.object(smtp_pool, 'time', SimpleNamespace(monotonic=lambda: self.now))
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.key = ('db', 1, 'sender@example.com', '2024-01-01 00:00:00')
+
+    def test_acquire_miss(self):
+        self.assertIsNone(self.pool.acquire(self.key, 60))
+        self.assertEqual(self.pool.stats['miss'], 1)
+
+    def test_reuse_released_session(self):
+        session = FakeSMTP()
+        self.pool.release(self.key, session)
+        self.now += 30
+        self.assertIs(self.pool.acquire(self.key, 60), session)
+        self.assertEqual(session.noop_calls, 1)
+        self.assertFalse(session.closed)
+        self.assertEqual(self.pool.stats['reuse'], 1)
+        # the session is handed out once, then the pool is empty again
+        self.assertIsNone(self.pool.acquire(self.key, 60))
+
+    def test_key_isolation(self):
+        self.pool.release(self.key, FakeSMTP())
+        db, server_id, smtp_from, write_date = self.key
+        for other in [
+            ('other_db', server_id, smtp_from, write_date),
+            (db, 2, smtp_from, write_date),
+            (db, server_id, 'other@example.com', write_date),
+            (db, server_id, smtp_from, '2024-01-02 00:00:00'),
+        ]:
+            self.assertIsNone(self.pool.acquire(other, 60), other)
+        self.assertIsNotNone(self.pool.acquire(self.key, 60))
+
+    def test_idle_expiry(self):
+        session = FakeSMTP()
+        self.pool.release(self.key, session)
+        self.now += 61
+        self.assertIsNone(self.pool.acquire(self.key, 60))
+        self.assertTrue(session.closed)
+        self.assertEqual(session.noop_calls, 0, "expired sessions are not probed")
+        self.assertEqual(self.pool.stats['expired'], 1)
+
+    def test_reap(self):
+        old, recent = FakeSMTP(), FakeSMTP()
+        other_key = self.key[:3] + ('2024-01-02 00:00:00',)
+        self.pool.release(self.key, old)
+        self.now += 50
+        self.pool.release(other_key, recent)
+        self.now += 20
+        self.pool.reap(60)
+        self.assertTrue(old.closed)
+        self.assertFalse(recent.closed)
+        self.assertIsNone(self.pool.acquire(self.key, 60))
+        self.assertIs(self.pool.acquire(other_key, 60), recent)
+
+    def test_evict_after_failed_noop(self):
+        for broken in [
+            FakeSMTP(noop_code=421),
+            FakeSMTP(noop_error=smtplib.SMTPServerDisconnected('gone')),
+            FakeSMTP(noop_error=ConnectionResetError()),
+        ]:
+            self.pool.release(self.key, broken)
+            self.assertIsNone(self.pool.acquire(self.key, 60))
+            self.assertTrue(broken.closed)
+        self.assertEqual(self.pool.stats['unhealthy'], 3)
+
+    def test_unhealthy_session_falls_back_to_older_one(self):
+        healthy, broken = FakeSMTP(), FakeSMTP(noop_code=421)
+        self.pool.release(self.key, healthy)
+        self.pool.release(self.key, broken)
+        self.assertIs(self.pool.acquire(self.key, 60), healthy)
+        self.assertTrue(broken.closed)
+
+    def test_max_idle_per_key(self):
+        sessions = [FakeSMTP() for _i in range(MAX_IDLE_PER_KEY + 1)]
+        for session in sessions:
+            self.pool.release(self.key, session)
+        self.assertTrue(sessions[-1].closed)
+        self.assertFalse(any(session.closed for session in sessions[:-1]))
+        acquired = [self.pool.acquire(self.key, 60) for _i in range(MAX_IDLE_PER_KEY + 1)]
+        self.assertEqual(acquired[:-1], sessions[:-1][::-1], "the most recent session is reused first")
+        self.assertIsNone(acquired[-1])
+
+    def test_pooled_session_quit_releases(self):
+        session = FakeSMTP()
+        for method in ('quit', 'close'):
+            pooled = self.pool.wrap(self.key, session)
+            self.assertEqual(pooled.mail_server_id, 1)
+            self.assertEqual(getattr(pooled, method)(), (221, b'pooled'))
+            # releasing twice must not put the session in the pool twice
+            getattr(pooled, method)()
+            self.assertFalse(session.closed)
+            self.assertEqual(session.quit_calls, 0)
+            self.assertIs(self.pool.acquire(self.key, 60), session)
+            self.assertIsNone(self.pool.acquire(self.key, 60))
+
+    def test_pooled_session_delegates_attributes(self):
+        session = FakeSMTP()
+        pooled = self.pool.wrap(self.key, session)
+        pooled.smtp_from = 'sender@example.com'
+        self.assertEqual(session.smtp_from, 'sender@example.com')
+        self.assertEqual(pooled.noop(), (250, b'OK'))
+
+    def test_pooled_session_discard(self):
+        session = FakeSMTP()
+        pooled = self.pool.wrap(self.key, session)
+        pooled.discard()
+        self.assertTrue(session.closed)
+        pooled.quit()
+        self.assertIsNone(self.pool.acquire(self.key, 60))
+
+    def test_purge(self):
+        server_1, server_2, other_db = FakeSMTP(), FakeSMTP(), FakeSMTP()
+        key_2 = ('db', 2) + self.key[2:]
+        key_other_db = ('other_db',) + self.key[1:]
+        self.pool.release(self.key, server_1)
+        self.pool.release(key_2, server_2)
+        self.pool.release(key_other_db, other_db)
+
+        self.pool.purge('db', {1})
+        self.assertTrue(server_1.closed)
+        self.assertFalse(server_2.closed)
+
+        self.pool.purge('db')
+        self.assertTrue(server_2.closed)
+        self.assertFalse(other_db.closed)
+        self.assertIs(self.pool.acquire(key_other_db, 60), other_db)
+
+    def test_close_session_falls_back_to_close(self):
+        session = FakeSMTP()
+        with patch.object(session, 'quit', side_effect=smtplib.SMTPServerDisconnected()):
+            SMTPConnectionPool.close_session(session)
+        self.assertTrue(session.closed)
+
+
+@tagged('post_install', '-at_install')
+class TestSMTPPoolServerChanges(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = cls.env['ir.mail_server'].create({
+            'name': 'Pooled', 'smtp_host': 'smtp.example.com',
+        })
+        cls.other_server = cls.env['ir.mail_server'].create({
+            'name': 'Other', 'smtp_host': 'smtp.example.com',
+        })
+
+    def _key(self, server):
+        return (self.env.cr.dbname, server.id, 'sender@example.com', str(server.write_date))
+
+    def _pool(self, server):
+        session = FakeSMTP()
+        SMTP_POOL.release(self._key(server), session)
+        self.addCleanup(SMTP_POOL.purge, self.env.cr.dbname, {server.id})
+        return session
+
+    def test_write_purges_server_sessions(self):
+        session, other_session = self._pool(self.server), self._pool(self.other_server)
+        self.server.write({'smtp_port': 2525})
+        self.assertTrue(session.closed)
+        self.assertFalse(other_session.closed)
+        self.assertIs(SMTP_POOL.acquire(self._key(self.other_server), 60), other_session)
+
+    def test_unlink_purges_server_sessions(self):
+        session, other_session = self._pool(self.server), self._pool(self.other_server)
+        self.server.unlink()
+        self.assertTrue(session.closed)
+        self.assertFalse(other_session.closed)
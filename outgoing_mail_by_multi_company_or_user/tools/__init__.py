@@ -0,0 +1 @@
+# Part of Odoo. See COPYRIGHT & LICENSE files for full copyright and licensing details.
@@ -0,0 +1,155 @@
+# Part of Odoo. See COPYRIGHT & LICENSE files for full copyright and licensing details.
+import bisect
+import threading
+from collections import defaultdict
+
+# Upper bounds, in seconds, of the histogram buckets.
+ROUTING_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+SEND_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Counter(object):
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+        self._values = defaultdict(float)
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[tuple(labels)] += amount
+
+    def value(self, labels=()):
+        with self._lock:
+            return self._values.get(tuple(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            return [(labels, value) for labels, value in self._values.items()]
+
+
+class Histogram(object):
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._sums = defaultdict(float)
+
+    def observe(self, value, labels=()):
+        labels = tuple(labels)
+        with self._lock:
+            counts = self._counts.setdefault(labels, [0] * (len(self.buckets) + 1))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sums[labels] += value
+
+    def stats(self, labels=()):
+        """ Return ``(count, sum)`` for one label set. """
+        labels = tuple(labels)
+        with self._lock:
+            return sum(self._counts.get(labels, ())), self._sums.get(labels, 0.0)
+
+    def samples(self):
+        with self._lock:
+            return [(labels, list(counts), self._sums[labels]) for labels, counts in self._counts.items()]
+
+
+class MetricsRegistry(object):
+    """ Process-local metrics, keyed by name; every metric carries the
+    database name as its first label. """
+
+    def __init__(self):
+        self._metrics = {}
+
+    def counter(self, name, help_text, label_names=()):
+        return self._register(Counter(name, help_text), label_names)
+
+    def histogram(self, name, help_text, buckets, label_names=()):
+        return self._register(Histogram(name, help_text, buckets), label_names)
+
+    def _register(self, metric, label_names):
+        metric.label_names = ('db',) + tuple(label_names)
+        self._metrics[metric.name] = metric
+        return metric
+
+    def _filter(self, samples, dbname):
+        return [sample for sample in samples if sample[0][0] == dbname]
+
+    def to_dict(self, dbname):
+        result = {}
+        for metric in self._metrics.values():
+            entries = []
+            if isinstance(metric, Histogram):
+                for labels, counts, total in self._filter(metric.samples(), dbname):
+                    entries.append({
+                        'labels': dict(zip(metric.label_names[1:], labels[1:])),
+                        'count': sum(counts),
+                        'sum': total,
+                        'buckets': dict(zip([str(b) for b in metric.buckets] + ['+Inf'], counts)),
+                    })
+            else:
+                for labels, value in self._filter(metric.samples(), dbname):
+                    entries.append({
+                        'labels': dict(zip(metric.label_names[1:], labels[1:])),
+                        'value': value,
+                    })
+            result[metric.name] = entries
+        return result
+
+    def to_prometheus(self, dbname):
+        lines = []
+        for metric in self._metrics.values():
+            is_histogram = isinstance(metric, Histogram)
+            lines.append('# HELP %s %s' % (metric.name, metric.help))
+            lines.append('# TYPE %s %s' % (metric.name, 'histogram' if is_histogram else 'counter'))
+            if is_histogram:
+                for labels, counts, total in self._filter(metric.samples(), dbname):
+                    label_str = format_labels(metric.label_names, labels)
+                    cumulative = 0
+                    for bound, count in zip([str(b) for b in metric.buckets] + ['+Inf'], counts):
+                        cumulative += count
+                        lines.append('%s_bucket{%s} %s' % (
+                            metric.name, format_labels(metric.label_names + ('le',), labels + (bound,)), cumulative))
+                    lines.append('%s_sum{%s} %s' % (metric.name, label_str, total))
+                    lines.append('%s_count{%s} %s' % (metric.name, label_str, cumulative))
+            else:
+                for labels, value in self._filter(metric.samples(), dbname):
+                    lines.append('%s{%s} %s' % (metric.name, format_labels(metric.label_names, labels), value))
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(names, values):
+    return ','.join(
+        '%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in zip(names, values)
+    )
+
+
+METRICS = MetricsRegistry()
+
+ROUTING_SECONDS = METRICS.histogram(
+    'odoo_mail_routing_seconds', "Time spent resolving the outgoing server of a mail.",
+    ROUTING_BUCKETS, ('mode',))
+ROUTING_CACHE = METRICS.counter(
+    'odoo_mail_routing_cache_total', "Routing lookups answered from cache (hit) or database (miss).",
+    ('result',))
+MAILS_ROUTED = METRICS.counter(
+    'odoo_mail_routed_total', "Mails created per outgoing mail server.", ('mail_server_id',))
+SEND_SECONDS = METRICS.histogram(
+    'odoo_mail_send_seconds', "Time spent handing a mail to its SMTP server.",
+    SEND_BUCKETS, ('mail_server_id',))
+SEND_FAILURES = METRICS.counter(
+    'odoo_mail_send_failures_total', "Mails or connections that failed per mail server.",
+    ('mail_server_id',))
+
+
+def gauge_lines(name, help_text, label_name, values, dbname):
+    """ Prometheus text for a gauge computed at scrape time from ``values``,
+    a ``{label_value: value}`` dict. """
+    lines = ['# HELP %s %s' % (name, help_text), '# TYPE %s gauge' % name]
+    for label_value, value in values.items():
+        lines.append('%s{%s} %s' % (name, format_labels(('db', label_name), (dbname, label_value)), value))
+    return '\n'.join(lines) + '\n'
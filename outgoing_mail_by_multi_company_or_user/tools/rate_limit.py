@@ -0,0 +1,62 @@
+# Part of Odoo. See COPYRIGHT & LICENSE files for full copyright and licensing details.
+import threading
+import time
+
+
+class TokenBucket(object):
+    """ Classic token bucket: ``rate`` tokens per second, at most ``burst``
+    tokens banked. A ``rate`` of 0 means unlimited. """
+
+    def __init__(self, rate, burst):
+        self._lock = threading.Lock()
+        self.configure(rate, burst)
+        self._tokens = float(self.burst)
+        self._stamp = time.monotonic()
+
+    def configure(self, rate, burst):
+        self.rate = float(rate or 0)
+        self.burst = max(int(burst or 1), 1)
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def take(self, count, deadline):
+        """ Block until at least one token is available and take up to
+        ``count`` of them. Return the number taken, or 0 if ``deadline``
+        (a ``time.monotonic()`` value) passes first. """
+        if not self.rate:
+            return count
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    granted = min(count, int(self._tokens))
+                    self._tokens -= granted
+                    return granted
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return 0
+            time.sleep(wait)
+
+
+class TokenBucketRegistry(object):
+    """ One bucket per (dbname, mail_server_id), shared by every sender
+    thread of the process. """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def get(self, key, rate, burst):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(rate, burst)
+            elif (bucket.rate, bucket.burst) != (float(rate or 0), max(int(burst or 1), 1)):
+                bucket.configure(rate, burst)
+            return bucket
+
+
+SERVER_BUCKETS = TokenBucketRegistry()
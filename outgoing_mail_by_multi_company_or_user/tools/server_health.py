@@ -0,0 +1,69 @@
+# Part of Odoo. See COPYRIGHT & LICENSE files for full copyright and licensing details.
+import threading
+import time
+from collections import defaultdict, deque
+
+# Rolling window over which send outcomes are aggregated, in seconds.
+HEALTH_WINDOW = 300
+# Below this many samples a server is never considered degraded.
+HEALTH_MIN_SAMPLES = 5
+HEALTH_MAX_ERROR_RATE = 0.5
+HEALTH_MAX_AVG_LATENCY = 10.0
+
+
+class ServerHealthTracker(object):
+    """ Per-process record of recent send outcomes for each mail server. """
+
+    def __init__(self, window=HEALTH_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = defaultdict(deque)
+
+    def record(self, dbname, mail_server_id, latency, ok):
+        if not mail_server_id:
+            return
+        now = time.monotonic()
+        with self._lock:
+            samples = self._samples[(dbname, mail_server_id)]
+            samples.append((now, latency, ok))
+            self._trim(samples, now)
+
+    def _trim(self, samples, now):
+        while samples and now - samples[0][0] > self.window:
+            samples.popleft()
+
+    def snapshot(self, dbname, mail_server_id):
+        """ Return ``{'samples', 'error_rate', 'avg_latency'}`` for the window. """
+        now = time.monotonic()
+        with self._lock:
+            samples = self._samples.get((dbname, mail_server_id))
+            if samples:
+                self._trim(samples, now)
+            samples = list(samples or ())
+        if not samples:
+            return {'samples': 0, 'error_rate': 0.0, 'avg_latency': 0.0}
+        errors = sum(1 for _t, _latency, ok in samples if not ok)
+        return {
+            'samples': len(samples),
+            'error_rate': errors / len(samples),
+            'avg_latency': sum(latency for _t, latency, _ok in samples) / len(samples),
+        }
+
+    def server_ids(self, dbname):
+        with self._lock:
+            return [server_id for db, server_id in self._samples if db == dbname]
+
+
+def is_degraded(snapshot):
+    if snapshot['samples'] < HEALTH_MIN_SAMPLES:
+        return False
+    return (snapshot['error_rate'] >= HEALTH_MAX_ERROR_RATE
+            or snapshot['avg_latency'] >= HEALTH_MAX_AVG_LATENCY)
+
+
+def health_score(snapshot):
+    """ Lower is healthier: each error weighs as much as a full latency budget. """
+    return snapshot['error_rate'] * HEALTH_MAX_AVG_LATENCY + snapshot['avg_latency']
+
+
+SERVER_HEALTH = ServerHealthTracker()
@@ -0,0 +1,147 @@
+# Part of Odoo. See COPYRIGHT & LICENSE files for full copyright and licensing details.
+import logging
+import smtplib
+import threading
+import time
+from collections import Counter, defaultdict
+
+_logger = logging.getLogger(__name__)
+
+# Idle sessions kept per (database, server, sender) key. Each thread sending
+# mail holds at most one session at a time, so this also bounds how many
+# parallel senders can reuse a connection without a new handshake.
+MAX_IDLE_PER_KEY = 4
+
+
+class PooledSMTPSession(object):
+    """ Wrap an authenticated ``smtplib.SMTP`` session so that ``quit()`` and
+    ``close()`` hand it back to the pool instead of tearing it down.
+
+    Every other attribute is delegated to the wrapped session, including the
+    ``smtp_from`` / ``from_filter`` attributes Odoo sets on connections.
+    """
+
+    def __init__(self, pool, key, session):
+        object.__setattr__(self, '_pool', pool)
+        object.__setattr__(self, '_key', key)
+        object.__setattr__(self, '_session', session)
+        object.__setattr__(self, '_released', False)
+
+    @property
+    def mail_server_id(self):
+        return self._key[1]
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._session, name, value)
+
+    def quit(self):
+        if not self._released:
+            object.__setattr__(self, '_released', True)
+            self._pool.release(self._key, self._session)
+        return (221, b'pooled')
+
+    close = quit
+
+    def discard(self):
+        """ Drop the underlying connection, e.g. after a protocol error. """
+        if not self._released:
+            object.__setattr__(self, '_released', True)
+            self._pool.close_session(self._session)
+
+
+class SMTPConnectionPool(object):
+    """ Process-wide pool of authenticated SMTP sessions.
+
+    Sessions are keyed by ``(dbname, mail_server_id, smtp_from, write_date)``
+    so editing a server's configuration naturally stops reusing connections
+    opened with the old settings. Idle sessions older than the configured
+    timeout are closed, and a ``NOOP`` is issued before a session is handed
+    out again so connections dropped by the server are never reused.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._idle = defaultdict(list)
+        self.stats = Counter()
+
+    def acquire(self, key, idle_timeout):
+        """ Return a healthy idle session for ``key`` or ``None``. """
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                sessions = self._idle.get(key)
+                if not sessions:
+                    self.stats['miss'] += 1
+                    return None
+                session, released_at = sessions.pop()
+            if now - released_at > idle_timeout:
+                self.stats['expired'] += 1
+                self.close_session(session)
+                continue
+            if not self._is_healthy(session):
+                self.stats['unhealthy'] += 1
+                self.close_session(session)
+                continue
+            self.stats['reuse'] += 1
+            return session
+
+    def release(self, key, session):
+        with self._lock:
+            sessions = self._idle[key]
+            if len(sessions) < MAX_IDLE_PER_KEY:
+                sessions.append((session, time.monotonic()))
+                return
+        self.close_session(session)
+
+    def wrap(self, key, session):
+        return PooledSMTPSession(self, key, session)
+
+    def purge(self, dbname, mail_server_ids=None):
+        """ Close idle sessions of ``dbname``, optionally only for some servers. """
+        with self._lock:
+            keys = [
+                key for key in self._idle
+                if key[0] == dbname and (mail_server_ids is None or key[1] in mail_server_ids)
+            ]
+            dropped = [session for key in keys for session, _released_at in self._idle.pop(key)]
+        for session in dropped:
+            self.close_session(session)
+
+    def reap(self, idle_timeout):
+        """ Close every idle session older than ``idle_timeout`` seconds. """
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            for key, sessions in list(self._idle.items()):
+                keep = [(s, t) for s, t in sessions if now - t <= idle_timeout]
+                expired.extend(s for s, t in sessions if now - t > idle_timeout)
+                if keep:
+                    self._idle[key] = keep
+                else:
+                    del self._idle[key]
+        for session in expired:
+            self.stats['expired'] += 1
+            self.close_session(session)
+
+    @staticmethod
+    def _is_healthy(session):
+        try:
+            return session.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    @staticmethod
+    def close_session(session):
+        try:
+            session.quit()
+        except (smtplib.SMTPException, OSError):
+            try:
+                session.close()
+            except Exception:
+                _logger.debug("Could not close SMTP session", exc_info=True)
+
+
+SMTP_POOL = SMTPConnectionPool()
@@ -11,14 +11,20 @@
     """,
     'depends': [
         'base',
+        'bus',
         'account',
         'sale',
         'purchase',
         'project',
+        'sale_project',
     ],
     'data': [
         'security/ir.model.access.csv',
+        'security/po_so_report_security.xml',
+        'data/ir_cron_data.xml',
         'views/po_so_template.xml',
+        'views/po_so_report_job_views.xml',
+        'views/eway_export_job_views.xml',
         'wizard/eway_report_wizard.xml',
     ],
     'installable': True,
@@ -0,0 +1,272 @@
+"""
+EWAY payment export benchmark and profiler.
+
+Seeds, for one tag and at one or more increasing scales, customers, sale
+orders with their EWAY operation, posted invoices whose lines point to
+the operation, and one to three customer payments per invoice reconciled
+with it (partial payments first). Each scale extends the dataset of the
+previous one, so ``--docs 100 --docs 1000 --docs 10000`` seeds 10000
+orders in total and measures the export after each step.
+
+The export is then run directly, the way ``/eway_report/export_excel``
+runs it for the whole period of the dataset, and timed by phase:
+
+* ``query``: payment days, payments, links and bulk prefetch,
+* ``build``: building the export rows in memory,
+* ``write``: serializing them to XLSX (or ``--format csv``/``parquet``),
+
+for a ``cold`` run (day cache dropped) and a ``warm`` one (rows read
+back from the day cache, ``query`` then covering the cache lookup). It
+also reports the SQL query count and the peak RSS of the process, a high
+water mark: compare runs of one scale each for absolute figures.
+
+``--profile FILE`` writes the cProfile statistics of the cold run of the
+largest scale, to browse with ``python -m pstats FILE`` or snakeviz, or
+to turn into a flamegraph with flameprof (``flameprof FILE > out.svg``).
+
+The run fails when an export of the seeded data returns no rows.
+
+The seeded data is committed: ALWAYS run it against a throwaway database
+with this module and the module providing ``eway.operation`` installed.
+The measured transactions are rolled back.
+
+Run:
+    python bench_eway_export.py -c /etc/odoo.conf -d bench_db --docs 100 --docs 1000 --seed 42
+    python bench_eway_export.py -c /etc/odoo.conf -d bench_db --docs 1000 --format parquet --profile eway.prof
+"""
+import argparse
+import cProfile
+import datetime
+import json
+import random
+import resource
+import sys
+import time
+
+from odoo import api, SUPERUSER_ID
+
+from generate_data import add_connection_arguments, load_registry
+
+PAYMENTS_PER_INVOICE = (1, 3)
+INVOICE_LINES = (1, 4)
+START_DATE = datetime.date(2024, 1, 1)
+DAYS = 365
+
+
+def customer_prefix(tag):
+    return 'EWAY Bench %s' % tag
+
+
+def find_orders(env, tag):
+    return env['sale.order'].search([('partner_id.name', '=like', customer_prefix(tag) + ' %')], order='id')
+
+
+def setup_master_data(env, tag):
+    customers = env['res.partner'].search([('name', '=like', customer_prefix(tag) + ' %')])
+    if not customers:
+        customers = env['res.partner'].create([
+            {'name': '%s %03d' % (customer_prefix(tag), index)} for index in range(50)
+        ])
+    product = env['product.product'].search([('default_code', '=', 'EWAY-BENCH')], limit=1)
+    if not product:
+        product = env['product.product'].create({
+            'name': 'EWAY Bench Transport',
+            'default_code': 'EWAY-BENCH',
+            'type': 'service',
+            'invoice_policy': 'order',
+        })
+    return customers, product
+
+
+def register_payment(env, invoice, amount, date):
+    payments = env['account.payment.register'].with_context(
+        active_model='account.move', active_ids=invoice.ids,
+    ).create({'amount': amount, 'payment_date': date})._create_payments()
+    payments.filtered(lambda p: p.state == 'in_process').action_validate()
+
+
+def create_document(env, seed_value, customers, product, index, tag):
+    # one generator per document: a dataset grown by steps equals the one
+    # seeded at once
+    rng = random.Random('%s-%s' % (seed_value, index))
+    date = START_DATE + datetime.timedelta(days=rng.randrange(DAYS))
+    order = env['sale.order'].create({
+        'partner_id': rng.choice(customers).id,
+        'date_order': date,
+        'order_line': [(0, 0, {
+            'product_id': product.id,
+            'product_uom_qty': 1,
+            'price_unit': rng.randint(100, 5000),
+        }) for __ in range(rng.randint(*INVOICE_LINES))],
+    })
+    order.action_confirm()
+    operation = env['eway.operation'].create({
+        'name': 'EWAY/%s/%06d' % (tag, index),
+        'sale_id': order.id,
+        'trip_start_date': date,
+        'trip_end_date': date + datetime.timedelta(days=rng.randint(0, 5)),
+        'invoice_amount': order.amount_total,
+    })
+    invoice = order._create_invoices()
+    invoice.invoice_date = date
+    invoice.invoice_line_ids.eway_operation = operation
+    invoice.action_post()
+
+    # partial payments first, the last one settling the invoice or not
+    payments = rng.randint(*PAYMENTS_PER_INVOICE)
+    for number in range(payments):
+        residual = invoice.amount_residual
+        if not residual:
+            break
+        last = number == payments - 1
+        amount = residual if last and rng.random() < 0.7 else round(residual * rng.uniform(0.2, 0.6), 2)
+        date += datetime.timedelta(days=rng.randint(1, 20))
+        register_payment(env, invoice, amount, date)
+
+
+def seed(registry, tag, docs, seed_value, commit_every=100):
+    """Extend the dataset of ``tag`` to ``docs`` sale orders"""
+    with registry.cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {'tracking_disable': True, 'mail_notrack': True})
+        if 'eway.operation' not in env:
+            sys.exit("The module providing eway.operation is not installed")
+        customers, product = setup_master_data(env, tag)
+        for index in range(len(find_orders(env, tag)), docs):
+            create_document(env, seed_value, customers, product, index, tag)
+            if (index + 1) % commit_every == 0:
+                cr.commit()
+                env.invalidate_all()
+        cr.commit()
+
+
+# ---------------------------------------------------------
+# MEASURE
+# ---------------------------------------------------------
+def peak_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class Phases(object):
+    """Wall time and SQL queries per phase, summed over the runs of a phase"""
+
+    def __init__(self, cr):
+        self.cr = cr
+        self.results = {}
+
+    def run(self, name, func, *args):
+        queries = self.cr.sql_log_count
+        started = time.perf_counter()
+        result = func(*args)
+        phase = self.results.setdefault(name, {'wall': 0.0, 'queries': 0})
+        phase['wall'] += time.perf_counter() - started
+        phase['queries'] += self.cr.sql_log_count - queries
+        return result
+
+
+def export(env, company, date_from, date_to, file_format, variant):
+    """Run the export phase by phase, return the phase results"""
+    from odoo.addons.po_so_report.models.eway_report import EWAY_COLUMN_TYPES, EWAY_HEADERS
+    from odoo.addons.po_so_report.tools import table_stream, xlsx_stream
+
+    EwayReport = env['eway.report'].sudo()
+    Days = env['eway.report.day'].sudo()
+    phases = Phases(env.cr)
+    days = phases.run('query', Days._get_payment_days, company, date_from, date_to)
+    if variant == 'cold':
+        payments = phases.run('query', EwayReport._get_payments, company, date_from, date_to)
+        data = phases.run('query', EwayReport._prefetch, payments)
+        rows = phases.run('build', lambda: list(EwayReport._iter_rows(data)))
+    else:
+        rows = phases.run('query', lambda: list(Days._iter_rows(company, days)))
+
+    def write():
+        if file_format == 'csv':
+            return table_stream.spool_csv(EWAY_HEADERS, rows)
+        if file_format == 'parquet':
+            return table_stream.spool_parquet(EWAY_HEADERS, EWAY_COLUMN_TYPES, rows)
+        return xlsx_stream.spool_workbook(
+            [("EWAY Report", EWAY_HEADERS, rows, None)], cell_style=xlsx_stream.left_aligned_style)
+
+    spool = phases.run('write', write)
+    size = spool.seek(0, 2)
+    spool.close()
+
+    results = phases.results
+    total = {
+        'wall': sum(phase['wall'] for phase in results.values()),
+        'queries': sum(phase['queries'] for phase in results.values()),
+    }
+    return dict(results, total=total, row_count=len(rows), day_count=len(days), bytes=size,
+                peak_rss_kb=peak_rss_kb())
+
+
+def measure(registry, file_format, profile=None):
+    results = {}
+    with registry.cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {})
+        company = env.company
+        date_from = START_DATE
+        date_to = START_DATE + datetime.timedelta(days=DAYS + 60)
+        for variant in ('cold', 'warm'):
+            if variant == 'cold':
+                env['eway.report.day'].sudo().search([('company_id', '=', company.id)]).unlink()
+                env.flush_all()
+                env.invalidate_all()
+            profiler = cProfile.Profile() if profile and variant == 'cold' else None
+            if profiler:
+                profiler.enable()
+            results[variant] = export(env, company, date_from, date_to, file_format, variant)
+            if profiler:
+                profiler.disable()
+                profiler.dump_stats(profile)
+            if variant == 'cold':
+                # fill the day cache for the warm run
+                env['eway.report.day'].sudo()._compute_days(
+                    company, env['eway.report.day'].sudo()._get_payment_days(company, date_from, date_to))
+                env.flush_all()
+                env.invalidate_all()
+        cr.rollback()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_connection_arguments(parser)
+    parser.add_argument('--docs', type=int, action='append',
+                        help="Sale orders to seed before measuring, repeat for increasing scales")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed")
+    parser.add_argument('--tag', help="Name tag of the dataset (default: the seed)")
+    parser.add_argument('--format', default='xlsx', choices=('xlsx', 'csv', 'parquet'), help="Output format")
+    parser.add_argument('--profile', help="Write the cProfile stats of the largest cold run to this file")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args()
+
+    registry = load_registry(args)
+    tag = args.tag or str(args.seed)
+    scales = sorted(set(args.docs or [1000]))
+    results = {}
+    for scale in scales:
+        seed(registry, tag, scale, args.seed)
+        profile = args.profile if scale == scales[-1] else None
+        results[scale] = measure(registry, args.format, profile)
+        # an empty export would time nothing: the seeding or the payment
+        # selection is broken
+        for variant, res in results[scale].items():
+            if not res['row_count']:
+                sys.exit("The %s export of %d documents returned no rows" % (variant, scale))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print("%8s %-5s %6s %8s %10s %10s %10s %10s %8s %12s" % (
+        'docs', 'run', 'days', 'rows', 'query (s)', 'build (s)', 'write (s)', 'total (s)', 'queries', 'peak RSS KiB'))
+    for scale, variants in results.items():
+        for variant, res in variants.items():
+            print("%8d %-5s %6d %8d %10.3f %10.3f %10.3f %10.3f %8d %12d" % (
+                scale, variant, res['day_count'], res['row_count'],
+                res['query']['wall'], res.get('build', {'wall': 0.0})['wall'],
+                res['write']['wall'], res['total']['wall'], res['total']['queries'], res['peak_rss_kb']))
+
+
+if __name__ == '__main__':
+    main()
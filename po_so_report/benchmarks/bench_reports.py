@@ -0,0 +1,154 @@
+"""
+PO/SO report benchmark.
+
+Builds the data of ReportSaleOrder, ReportPurchaseOrder and
+ReportPurchaseBill for every project of a synthetic dataset (see
+generate_data.py, run first or through ``--generate``) and records, per
+report and per variant:
+
+* ``cold``: project summaries and result cache dropped, i.e. everything
+  computed from the orders, invoices, bills and payments,
+* ``warm``: summaries up to date, result cache filled,
+
+the wall time, the number of SQL queries and the peak of Python memory
+allocations (tracemalloc, measured in a separate run as it slows the code
+down). Parallel computation is disabled so that every query is counted.
+
+With ``--baseline`` the results are compared to a previous ``--save``:
+a query count or wall time growing beyond the tolerance is reported as a
+regression and the script exits with status 1, so an N+1 query shows up
+on the first run. The benchmark transaction is rolled back.
+
+Run:
+    python generate_data.py -c /etc/odoo.conf -d bench_db --docs 1000 --seed 42
+    python bench_reports.py -c /etc/odoo.conf -d bench_db --tag 1000-42 --save baseline.json
+    python bench_reports.py -c /etc/odoo.conf -d bench_db --tag 1000-42 --baseline baseline.json
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+from odoo import api, SUPERUSER_ID
+
+from generate_data import add_connection_arguments, find_projects, generate, load_registry
+
+REPORTS = ('sale', 'purchase', 'bill')
+VARIANTS = ('cold', 'warm')
+
+
+def build_report(env, report_type, projects):
+    """Build the report values the way printing does"""
+    from odoo.addons.po_so_report.models.po_so_report_summary import REPORT_MODELS
+    report = env[REPORT_MODELS[report_type]]
+    if report_type == 'bill':
+        # one report per project
+        for project in projects:
+            report._get_report_values(None, {'project_ids': project.ids})
+    else:
+        report._get_report_values(None, {'project_ids': projects.ids})
+
+
+def prepare(env, report_type, projects, variant):
+    # importable once the registry set the addons path up
+    from odoo.addons.po_so_report.models.po_so_report_summary import REPORT_CACHE
+    REPORT_CACHE.clear()
+    if variant == 'cold':
+        env['po.so.report.summary'].search([
+            ('report_type', '=', report_type),
+            ('project_id', 'in', projects.ids),
+        ]).unlink()
+    else:
+        build_report(env, report_type, projects)
+    env.flush_all()
+    env.invalidate_all()
+
+
+def measure(env, report_type, projects, variant):
+    prepare(env, report_type, projects, variant)
+    queries_before = env.cr.sql_log_count
+    started = time.perf_counter()
+    build_report(env, report_type, projects)
+    env.flush_all()
+    wall = time.perf_counter() - started
+    queries = env.cr.sql_log_count - queries_before
+
+    prepare(env, report_type, projects, variant)
+    tracemalloc.start()
+    build_report(env, report_type, projects)
+    env.flush_all()
+    __, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'wall': wall, 'queries': queries, 'peak_kb': peak / 1024.0}
+
+
+def compare(results, baseline, tolerance, query_tolerance):
+    """Return the regressions of ``results`` against ``baseline``"""
+    regressions = []
+    for key, result in results.items():
+        before = baseline.get(key)
+        if not before:
+            continue
+        if result['queries'] > before['queries'] * (1 + query_tolerance) + 2:
+            regressions.append("%s: %d queries (baseline %d)" % (key, result['queries'], before['queries']))
+        if result['wall'] > before['wall'] * (1 + tolerance):
+            regressions.append("%s: %.3fs (baseline %.3fs)" % (key, result['wall'], before['wall']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_connection_arguments(parser)
+    parser.add_argument('--tag', required=True, help="Dataset tag, as printed by generate_data.py")
+    parser.add_argument('--generate', type=int, metavar='DOCS',
+                        help="Generate a dataset of DOCS orders under --tag first")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed of --generate")
+    parser.add_argument('--report', action='append', choices=REPORTS, help="Report(s) to run (default: all)")
+    parser.add_argument('--save', help="Write the results to this JSON file")
+    parser.add_argument('--baseline', help="Compare with the results saved in this JSON file")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed wall time increase (ratio)")
+    parser.add_argument('--query-tolerance', type=float, default=0.05, help="Allowed query count increase (ratio)")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args()
+
+    registry = load_registry(args)
+    if args.generate:
+        generate(registry, args.tag, args.generate, args.seed)
+
+    results = {}
+    with registry.cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {})
+        env['ir.config_parameter'].set_param('po_so_report.parallel_workers', '0')
+        projects = find_projects(env, args.tag)
+        if not projects:
+            sys.exit("No dataset tagged %r, run generate_data.py first" % args.tag)
+        for report_type in args.report or REPORTS:
+            for variant in VARIANTS:
+                results['%s/%s' % (report_type, variant)] = measure(env, report_type, projects, variant)
+        cr.rollback()
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.query_tolerance)
+
+    if args.json:
+        print(json.dumps({'projects': len(projects), 'results': results, 'regressions': regressions}, indent=2))
+    else:
+        print("%d projects" % len(projects))
+        print("%-16s %10s %10s %12s" % ('report', 'wall (s)', 'queries', 'peak (KiB)'))
+        for key, res in results.items():
+            print("%-16s %10.3f %10d %12.0f" % (key, res['wall'], res['queries'], res['peak_kb']))
+        for regression in regressions:
+            print("REGRESSION %s" % regression)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+"""
+Seeded synthetic data for the PO/SO report benchmarks.
+
+Creates, for one tag:
+
+* projects with their analytic account,
+* confirmed sale orders linked to a project, most of them invoiced, the
+  invoices posted and partly or fully paid,
+* confirmed purchase orders distributed on a project's analytic account,
+  most of them billed, the bills posted and partly or fully paid.
+
+Payments are registered through ``account.payment.register``, so invoices
+and bills get real partial reconciliations. The same seed and scale always
+produce the same documents (names, partners, amounts, dates, paid ratios).
+
+The data is committed every ``--commit-every`` documents: ALWAYS run it
+against a throwaway database with this module installed. 100k documents
+take hours; 10 and 1k are meant for day to day comparisons.
+
+Run:
+    python generate_data.py -c /etc/odoo.conf -d bench_db --docs 1000 --seed 42
+"""
+import argparse
+import datetime
+import logging
+import random
+import time
+
+import odoo
+from odoo import api, SUPERUSER_ID
+from odoo.modules.registry import Registry
+
+_logger = logging.getLogger(__name__)
+
+# Share of the documents that are sale orders, the rest being purchase orders
+SALE_SHARE = 0.5
+INVOICED_RATIO = 0.8
+PAID_RATIO = 0.6
+PARTIAL_RATIO = 0.3
+ORDER_LINES = (1, 4)
+START_DATE = datetime.date(2024, 1, 1)
+
+
+def project_prefix(tag):
+    return 'Bench %s' % tag
+
+
+def find_projects(env, tag):
+    return env['project.project'].with_context(active_test=False).search(
+        [('name', '=like', project_prefix(tag) + ' %')], order='id')
+
+
+def setup_master_data(env, rng, tag, projects_count):
+    """Projects, analytic accounts, partners and service products"""
+    plan = env['account.analytic.plan'].create({'name': 'Bench %s' % tag})
+    accounts = env['account.analytic.account'].create([
+        {'name': '%s %04d' % (project_prefix(tag), index), 'plan_id': plan.id}
+        for index in range(projects_count)
+    ])
+    projects = env['project.project'].create([
+        {'name': account.name, 'account_id': account.id}
+        for account in accounts
+    ])
+    customers = env['res.partner'].create([
+        {'name': 'Bench Customer %s %03d' % (tag, index)} for index in range(max(5, projects_count // 2))
+    ])
+    vendors = env['res.partner'].create([
+        {'name': 'Bench Vendor %s %03d' % (tag, index)} for index in range(max(5, projects_count // 2))
+    ])
+    products = env['product.product'].create([{
+        'name': 'Bench Service %s %02d' % (tag, index),
+        'type': 'service',
+        'invoice_policy': 'order',
+        'purchase_method': 'purchase',
+        'list_price': rng.randint(50, 5000),
+        'standard_price': rng.randint(20, 3000),
+    } for index in range(20)])
+    return projects, customers, vendors, products
+
+
+def order_lines(rng, products, qty_field, analytic_account=None):
+    lines = []
+    for __ in range(rng.randint(*ORDER_LINES)):
+        vals = {
+            'product_id': rng.choice(products).id,
+            qty_field: rng.randint(1, 20),
+            'price_unit': rng.randint(20, 5000),
+        }
+        if analytic_account:
+            vals['analytic_distribution'] = {str(analytic_account.id): 100}
+        lines.append((0, 0, vals))
+    return lines
+
+
+def pay(env, rng, moves, date):
+    """Register a full or partial payment on each of ``moves``"""
+    for move in moves:
+        amount = move.amount_residual
+        if rng.random() < PARTIAL_RATIO:
+            amount = round(amount * rng.uniform(0.2, 0.8), 2)
+        payments = env['account.payment.register'].with_context(
+            active_model='account.move', active_ids=move.ids,
+        ).create({'amount': amount, 'payment_date': date})._create_payments()
+        # payments waiting for a bank statement are validated right away so
+        # that the sale report, which lists paid payments, sees them
+        payments.filtered(lambda p: p.state == 'in_process').action_validate()
+
+
+def create_sale_document(env, rng, project, customers, products, date):
+    order = env['sale.order'].create({
+        'partner_id': rng.choice(customers).id,
+        'project_id': project.id,
+        'date_order': date,
+        'order_line': order_lines(rng, products, 'product_uom_qty'),
+    })
+    order.action_confirm()
+    if rng.random() < INVOICED_RATIO:
+        invoice = order._create_invoices()
+        invoice.invoice_date = date
+        invoice.action_post()
+        if rng.random() < PAID_RATIO:
+            pay(env, rng, invoice, date)
+
+
+def create_purchase_document(env, rng, project, vendors, products, date):
+    order = env['purchase.order'].create({
+        'partner_id': rng.choice(vendors).id,
+        'date_order': date,
+        'order_line': order_lines(rng, products, 'product_qty', project.account_id),
+    })
+    order.button_confirm()
+    if rng.random() < INVOICED_RATIO:
+        order.action_create_invoice()
+        bill = order.invoice_ids
+        bill.invoice_date = date
+        bill.action_post()
+        if rng.random() < PAID_RATIO:
+            pay(env, rng, bill, date)
+
+
+def generate(registry, tag, docs, seed, projects_count=None, commit_every=200):
+    """Create ``docs`` sale and purchase orders (with invoices, bills and
+    payments) for ``tag``; return the number of projects"""
+    rng = random.Random(seed)
+    projects_count = projects_count or max(1, docs // 50)
+    started = time.perf_counter()
+    with registry.cursor() as cr:
+        env = api.Environment(cr, SUPERUSER_ID, {'tracking_disable': True, 'mail_notrack': True})
+        projects, customers, vendors, products = setup_master_data(env, rng, tag, projects_count)
+        cr.commit()
+        for index in range(docs):
+            project = projects[rng.randrange(len(projects))]
+            date = START_DATE + datetime.timedelta(days=rng.randrange(365))
+            if rng.random() < SALE_SHARE:
+                create_sale_document(env, rng, project, customers, products, date)
+            else:
+                create_purchase_document(env, rng, project, vendors, products, date)
+            if (index + 1) % commit_every == 0:
+                cr.commit()
+                env.invalidate_all()
+                _logger.info("Generated %s/%s documents", index + 1, docs)
+        cr.commit()
+    _logger.info("Generated %s documents on %s projects in %.1fs",
+                 docs, projects_count, time.perf_counter() - started)
+    return projects_count
+
+
+def add_connection_arguments(parser):
+    parser.add_argument('-c', '--config', help="Odoo configuration file")
+    parser.add_argument('-d', '--database', required=True, help="Throwaway database to run against")
+
+
+def load_registry(args):
+    odoo_args = ['-d', args.database]
+    if args.config:
+        odoo_args += ['-c', args.config]
+    odoo.tools.config.parse_config(odoo_args)
+    return Registry(args.database)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_connection_arguments(parser)
+    parser.add_argument('--docs', type=int, default=1000, help="Sale and purchase orders to create")
+    parser.add_argument('--projects', type=int, help="Projects to spread them on (default: docs / 50)")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed")
+    parser.add_argument('--tag', help="Name tag of the dataset (default: docs-seed)")
+    parser.add_argument('--commit-every', type=int, default=200, help="Documents per transaction")
+    args = parser.parse_args()
+
+    registry = load_registry(args)
+    tag = args.tag or '%s-%s' % (args.docs, args.seed)
+    generate(registry, tag, args.docs, args.seed, args.projects, args.commit_every)
+    print("Dataset %r ready" % tag)
+
+
+if __name__ == '__main__':
+    main()
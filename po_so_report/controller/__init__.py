@@ -1 +1,2 @@
-from . import eway_report_action
\ No newline at end of file
+from . import eway_report_action
+from . import po_so_report_export
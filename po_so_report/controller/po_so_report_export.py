@@ -0,0 +1,23 @@
+from werkzeug.exceptions import NotFound
+
+from odoo import http
+from odoo.http import request
+
+from ..tools.xlsx_stream import XLSX_MIMETYPE
+from .eway_report_action import spool_response
+
+# Wizards whose report can be exported
+EXPORT_WIZARDS = ('po.so.wizard', 'purchase.bill.wizard')
+
+
+class PoSoReportExportController(http.Controller):
+
+    @http.route('/po_so_report/export_xlsx/<string:wizard_model>/<int:wizard_id>', type='http', auth='user')
+    def export_xlsx(self, wizard_model, wizard_id, **kwargs):
+        if wizard_model not in EXPORT_WIZARDS:
+            raise NotFound()
+        wizard = request.env[wizard_model].browse(wizard_id).exists()
+        if not wizard:
+            raise NotFound()
+        spool, filename = wizard._render_xlsx()
+        return spool_response(spool, filename, XLSX_MIMETYPE)
@@ -0,0 +1,15 @@
+from . import po_so_report_summary
+from . import po_so_report_job
+from . import ir_actions_report
+from . import sale_order
+from . import purchase_order
+from . import account_move
+from . import account_partial_reconcile
+from . import account_payment
+from . import project_project
+from . import res_partner
+from . import product_template
+from . import eway_payment_link
+from . import eway_report_day
+from . import eway_report
+from . import eway_export_job
@@ -0,0 +1,38 @@
+from odoo import models
+
+# Fields of account.move the PO/SO reports depend on
+REPORT_MOVE_FIELDS = {'state', 'name', 'invoice_origin', 'invoice_date', 'partner_id', 'move_type'}
+
+
+class AccountMove(models.Model):
+    _inherit = 'account.move'
+
+    def write(self, vals):
+        if not REPORT_MOVE_FIELDS.intersection(vals):
+            return super().write(vals)
+        Summary = self.env['po.so.report.summary']
+        Summary._mark_dirty_for_moves(self)
+        res = super().write(vals)
+        Summary._mark_dirty_for_moves(self)
+        if 'invoice_origin' in vals:
+            self.env['eway.payment.link']._refresh_links('invoice_id', self.ids)
+        else:
+            self.env['eway.report.day']._invalidate_links('invoice_id', self.ids)
+        return res
+
+    def unlink(self):
+        self.env['po.so.report.summary']._mark_dirty_for_moves(self)
+        return super().unlink()
+
+
+class AccountMoveLine(models.Model):
+    _inherit = 'account.move.line'
+
+    def write(self, vals):
+        if 'analytic_distribution' not in vals:
+            return super().write(vals)
+        Summary = self.env['po.so.report.summary']
+        Summary._mark_dirty_for_moves(self.move_id)
+        res = super().write(vals)
+        Summary._mark_dirty_for_moves(self.move_id)
+        return res
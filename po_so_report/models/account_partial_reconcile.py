@@ -0,0 +1,30 @@
+from odoo import api, models
+
+
+class AccountPartialReconcile(models.Model):
+    _inherit = 'account.partial.reconcile'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        partials = super().create(vals_list)
+        moves = (partials.debit_move_id | partials.credit_move_id).move_id
+        self.env['po.so.report.summary']._mark_dirty_for_moves(moves)
+        self.env['eway.payment.link']._refresh_links('partial_id', partials.ids)
+        # the residual of the invoices changed, also when the partial is not
+        # a payment link (e.g. a credit note): their paid days are outdated
+        self.env['eway.report.day']._invalidate_links('invoice_id', moves.ids)
+        # the state of the reconciled payments is recomputed, e.g. ``paid``
+        # once matched with a bank statement line
+        (partials.debit_move_id | partials.credit_move_id).payment_id._invalidate_report_data()
+        return partials
+
+    def unlink(self):
+        moves = (self.debit_move_id | self.credit_move_id).move_id
+        payments = (self.debit_move_id | self.credit_move_id).payment_id
+        # the links go with the partials; the rows of the other payments of
+        # the invoices show their residual, which changes too
+        self.env['eway.report.day']._invalidate_links('invoice_id', moves.ids)
+        res = super().unlink()
+        self.env['po.so.report.summary']._mark_dirty_for_moves(moves)
+        payments._invalidate_report_data()
+        return res
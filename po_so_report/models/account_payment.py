@@ -0,0 +1,40 @@
+from odoo import models
+
+# Customer payments are matched to invoices through their memo
+REPORT_PAYMENT_FIELDS = {'memo', 'state', 'amount', 'date', 'name', 'partner_type'}
+# Payment fields copied on the EWAY payment links
+LINK_PAYMENT_FIELDS = {'date', 'company_id'}
+
+
+class AccountPayment(models.Model):
+    _inherit = 'account.payment'
+
+    def write(self, vals):
+        if not REPORT_PAYMENT_FIELDS.intersection(vals) and not LINK_PAYMENT_FIELDS.intersection(vals):
+            return super().write(vals)
+        memos = set(self.mapped('memo'))
+        res = super().write(vals)
+        if LINK_PAYMENT_FIELDS.intersection(vals):
+            self.env['eway.payment.link']._refresh_links('payment_id', self.ids)
+        if REPORT_PAYMENT_FIELDS.intersection(vals):
+            self._invalidate_report_data(memos)
+        return res
+
+    def _invalidate_report_data(self, memos=()):
+        """Drop the cached EWAY days of the payments and flag the summaries
+        of the invoices they are matched to, on ``memos`` too (the memos
+        before a change).
+
+        Also called when the payments are reconciled: ``state`` is a stored
+        compute, so reaching ``paid`` through a bank reconciliation does not
+        go through write().
+        """
+        self.env['eway.report.day']._invalidate_links('payment_id', self.ids)
+        memos = set(memos) | set(self.mapped('memo'))
+        memos.discard(False)
+        if memos:
+            self.env['po.so.report.summary']._mark_dirty_for_moves(
+                self.env['account.move'].sudo().search([
+                    ('name', 'in', list(memos)),
+                    ('move_type', '=', 'out_invoice'),
+                ]))
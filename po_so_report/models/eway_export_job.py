@@ -0,0 +1,185 @@
+import logging
+
+from odoo import _, api, fields, models
+from odoo.exceptions import UserError
+from odoo.fields import Command
+
+from .eway_report import EXPORT_FORMATS
+from .po_so_report_job import JOB_STALE_AFTER
+
+_logger = logging.getLogger(__name__)
+
+# First key of the advisory lock serializing the queuing of exports, the
+# second one being the company
+EXPORT_LOCK_KEY = 0x45574159
+
+
+class EwayExportJob(models.Model):
+    """EWAY payment export queued from the export route and run by cron.
+
+    Identical requests (same company, period and format) made while an
+    export is queued or running join it: the file is built once and every
+    requester is notified.
+    """
+    _name = 'eway.export.job'
+    _description = 'EWAY Export Job'
+    _order = 'id desc'
+
+    name = fields.Char(string='Export', required=True)
+    user_ids = fields.Many2many('res.users', string='Requested By', required=True)
+    company_id = fields.Many2one('res.company', string='Company', required=True, ondelete='cascade')
+    date_from = fields.Date(string='From', required=True)
+    date_to = fields.Date(string='To', required=True)
+    file_format = fields.Selection([
+        ('xlsx', 'Excel (XLSX)'),
+        ('csv', 'CSV'),
+        ('parquet', 'Parquet'),
+    ], string='Format', default='xlsx', required=True)
+    state = fields.Selection([
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Status', default='queued', required=True, index=True)
+    attachment_id = fields.Many2one('ir.attachment', string='Export File', readonly=True)
+    error_message = fields.Text(string='Error', readonly=True)
+    date_done = fields.Datetime(string='Finished On', readonly=True)
+
+    # ---------------------------------------------------------
+    # QUEUE
+    # ---------------------------------------------------------
+    @api.model
+    def _enqueue(self, company, date_from, date_to, file_format='xlsx'):
+        """Queue an export of the period, or join the identical one queued
+        or running; return its id.
+
+        The lookup runs in a transaction of its own, committed right away:
+        in READ COMMITTED and under an advisory lock, concurrent requests
+        see each other's job, which the snapshot of the HTTP transaction
+        would hide.
+        """
+        if self.env.registry.in_test_mode():
+            return self._find_or_create(company, date_from, date_to, file_format)
+        with self.env.registry.cursor() as cr:
+            cr.execute("SET TRANSACTION ISOLATION LEVEL READ COMMITTED")
+            cr.execute("SELECT pg_advisory_xact_lock(%s, %s)", [EXPORT_LOCK_KEY, company.id])
+            return self.with_env(self.env(cr=cr))._find_or_create(company, date_from, date_to, file_format)
+
+    @api.model
+    def _find_or_create(self, company, date_from, date_to, file_format):
+        Job = self.sudo()
+        job = Job.search([
+            ('company_id', '=', company.id),
+            ('date_from', '=', date_from),
+            ('date_to', '=', date_to),
+            ('file_format', '=', file_format),
+            ('state', 'in', ('queued', 'running')),
+        ], limit=1)
+        if job:
+            job.user_ids = [Command.link(self.env.uid)]
+        else:
+            job = Job.create({
+                'name': _('EWAY Report %(date_from)s to %(date_to)s', date_from=date_from, date_to=date_to),
+                'user_ids': [Command.link(self.env.uid)],
+                'company_id': company.id,
+                'date_from': date_from,
+                'date_to': date_to,
+                'file_format': file_format,
+            })
+            self.env.ref('po_so_report.ir_cron_process_eway_export_jobs')._trigger()
+        return job.id
+
+    def action_download(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_url',
+            'url': '/web/content/%s?download=true' % self.attachment_id.id,
+            'target': 'self',
+        }
+
+    # ---------------------------------------------------------
+    # PROCESSING
+    # ---------------------------------------------------------
+    @api.model
+    def _claim_next(self):
+        """Lock and return the oldest queued job, skipping the ones other
+        cron workers are already claiming"""
+        self.env.cr.execute("""
+            SELECT id
+              FROM eway_export_job
+             WHERE state = 'queued'
+             ORDER BY id
+             LIMIT 1
+               FOR UPDATE SKIP LOCKED
+        """)
+        row = self.env.cr.fetchone()
+        return self.browse(row[0]) if row else self.browse()
+
+    @api.model
+    def _cron_process_jobs(self):
+        # Each export is committed on its own, so that a failure does not
+        # roll back the ones done before
+        self.search([
+            ('state', '=', 'running'),
+            ('write_date', '<', fields.Datetime.now() - JOB_STALE_AFTER),
+        ]).write({'state': 'queued'})
+        self.env.cr.commit()
+        while True:
+            job = self._claim_next()
+            if not job:
+                break
+            job.write({'state': 'running', 'error_message': False})
+            self.env.cr.commit()
+            try:
+                job._run()
+            except Exception as e:
+                self.env.cr.rollback()
+                _logger.exception("EWAY export job %s failed", job.id)
+                job.write({'state': 'failed', 'error_message': str(e)})
+            self.env.cr.commit()
+            # notified from a new transaction, whose snapshot includes the
+            # users who joined the job while it was running
+            job._notify_users()
+            self.env.cr.commit()
+
+    def _run(self):
+        self.ensure_one()
+        company = self.company_id
+        EwayReport = self.env['eway.report'].sudo().with_company(company)
+        days, error = EwayReport._get_export_days(company, self.date_from, self.date_to)
+        if error:
+            raise UserError(error)
+        extension, mimetype = EXPORT_FORMATS[self.file_format]
+        with EwayReport._spool_export(company, days, self.file_format) as spool:
+            attachment = self.env['ir.attachment'].create({
+                'name': 'EWAY_Report_%s_to_%s.%s' % (self.date_from, self.date_to, extension),
+                'raw': spool.read(),
+                'mimetype': mimetype,
+                'res_model': self._name,
+                'res_id': self.id,
+            })
+        self.write({
+            'state': 'done',
+            'attachment_id': attachment.id,
+            'date_done': fields.Datetime.now(),
+        })
+
+    def _notify_users(self):
+        self.ensure_one()
+        if self.state == 'done':
+            payload = {
+                'type': 'success',
+                'title': _('Export ready'),
+                'message': _('%(export)s is ready to download from the EWAY export jobs.', export=self.name),
+            }
+        else:
+            payload = {
+                'type': 'danger',
+                'title': _('Export failed'),
+                'message': _('%(export)s could not be generated: %(error)s',
+                             export=self.name, error=self.error_message),
+                'sticky': True,
+            }
+        # users may have joined the job since it was read
+        self.invalidate_recordset(['user_ids'])
+        self.user_ids.partner_id._bus_send('simple_notification', payload)
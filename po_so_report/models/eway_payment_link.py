@@ -0,0 +1,97 @@
+from odoo import api, fields, models
+
+# One link per partial reconciliation between the receivable line of an
+# invoice (debit) and a payment line (credit). The sale order is the one
+# named by the invoice origin, the lowest id winning on duplicate names.
+LINK_QUERY = """
+    INSERT INTO eway_payment_link (
+        partial_id, payment_id, invoice_id, sale_order_id, company_id, payment_date, amount,
+        create_uid, create_date, write_uid, write_date
+    )
+    SELECT apr.id, ap.id, inv.id, so.id, ap.company_id, ap.date, apr.amount,
+           %%(uid)s, now() at time zone 'UTC', %%(uid)s, now() at time zone 'UTC'
+      FROM account_partial_reconcile apr
+      JOIN account_move_line dl ON dl.id = apr.debit_move_id
+      JOIN account_move inv ON inv.id = dl.move_id
+      JOIN account_move_line cl ON cl.id = apr.credit_move_id
+      JOIN account_payment ap ON ap.id = cl.payment_id
+      LEFT JOIN LATERAL (
+            SELECT id FROM sale_order WHERE name = inv.invoice_origin ORDER BY id LIMIT 1
+      ) so ON TRUE
+     WHERE inv.move_type IN ('out_invoice', 'out_refund', 'out_receipt', 'in_invoice', 'in_refund', 'in_receipt')
+       AND %(where)s
+"""
+
+# Link column -> source column it is refreshed by
+LINK_KEYS = {
+    'partial_id': 'apr.id',
+    'payment_id': 'ap.id',
+    'invoice_id': 'inv.id',
+}
+
+
+class EwayPaymentLink(models.Model):
+    """Payment allocation -> invoice -> sale order of the EWAY export.
+
+    Maintained from reconciliations, invoice origins, payment dates and
+    sale order names, so that the payments of a company and period and the
+    allocations of their invoices are read with indexed scans of this table
+    instead of walking payments, move lines and partials.
+    """
+    _name = 'eway.payment.link'
+    _description = 'EWAY Payment Allocation Link'
+    _order = 'payment_date desc, payment_id desc, invoice_id'
+
+    partial_id = fields.Many2one('account.partial.reconcile', string='Reconciliation', required=True,
+                                 ondelete='cascade')
+    payment_id = fields.Many2one('account.payment', string='Payment', required=True, index=True,
+                                 ondelete='cascade')
+    invoice_id = fields.Many2one('account.move', string='Invoice', required=True, index=True,
+                                 ondelete='cascade')
+    sale_order_id = fields.Many2one('sale.order', string='Sale Order', index='btree_not_null',
+                                    ondelete='set null')
+    company_id = fields.Many2one('res.company', string='Company', required=True, ondelete='cascade')
+    payment_date = fields.Date(string='Payment Date', required=True)
+    amount = fields.Monetary(string='Allocated Amount', currency_field='currency_id')
+    currency_id = fields.Many2one(related='company_id.currency_id')
+
+    _partial_uniq = models.Constraint(
+        'UNIQUE(partial_id)',
+        'Only one link per reconciliation is allowed.',
+    )
+    _company_date_idx = models.Index('(company_id, payment_date)')
+
+    def init(self):
+        # links of the reconciliations made before the module was installed
+        self.env.cr.execute(LINK_QUERY % {
+            'where': "NOT EXISTS (SELECT 1 FROM eway_payment_link l WHERE l.partial_id = apr.id)",
+        }, {'uid': self.env.uid})
+
+    @api.model
+    def _refresh_links(self, key, ids):
+        """Rebuild the links of the given reconciliations, payments or
+        invoices (``key`` being the link column) from the accounting data"""
+        if not ids:
+            return
+        for model in ('account.partial.reconcile', 'account.move.line', 'account.move',
+                      'account.payment', 'sale.order'):
+            self.env[model].flush_model()
+        self.flush_model()
+        Days = self.env['eway.report.day']
+        Days._invalidate_links(key, ids)
+        self.env.cr.execute(
+            "DELETE FROM eway_payment_link WHERE %s = ANY(%%s)" % key, [list(ids)])
+        self.env.cr.execute(LINK_QUERY % {'where': "%s = ANY(%%(ids)s)" % LINK_KEYS[key]}, {
+            'uid': self.env.uid,
+            'ids': list(ids),
+        })
+        self.invalidate_model()
+        Days._invalidate_links(key, ids)
+
+    @api.model
+    def _refresh_links_for_sale_names(self, names):
+        names = [name for name in names if name]
+        if names:
+            self._refresh_links('invoice_id', self.env['account.move'].sudo().search([
+                ('invoice_origin', 'in', names),
+            ]).ids)
@@ -0,0 +1,342 @@
+import logging
+from collections import defaultdict
+from concurrent.futures.process import BrokenProcessPool
+
+from odoo import api, models
+
+from ..tools import parallel, table_stream, xlsx_stream
+from ..wizard.eway_report_wizard import read_names
+
+_logger = logging.getLogger(__name__)
+
+EWAY_HEADERS = [
+    "Customer Name", "Salesperson", "EWAY Number", "Trip Start", "Trip End", "EWAY Amount",
+    "Invoice Number", "Invoice Date", "Invoice Amount Untaxed",
+    "Partial Payment (Actual)", "Balance Amount (Untaxed)", "Actual Amount Due",
+    "Payment Date", "Payment Amount"
+]
+# Typed columns of the Parquet export, see table_stream.COLUMN_TYPES
+EWAY_COLUMN_TYPES = [
+    'string', 'string', 'string', 'date', 'date', 'float',
+    'string', 'date', 'float',
+    'float', 'float', 'float',
+    'date', 'float',
+]
+
+# States of the customer payments the export shows: validated, whether
+# their outstanding line is matched with the bank (paid) or not yet
+PAYMENT_STATES = ('in_process', 'paid')
+
+# Sheet of the multi-company export gathering the rows of every company
+CONSOLIDATED_TITLE = "All Companies"
+
+# Export format -> (file extension, mimetype)
+EXPORT_FORMATS = {
+    'xlsx': ('xlsx', xlsx_stream.XLSX_MIMETYPE),
+    'csv': ('csv', table_stream.CSV_MIMETYPE),
+    'parquet': ('parquet', table_stream.PARQUET_MIMETYPE),
+}
+
+
+def m2o_id(value):
+    return value[0] if value else False
+
+
+class EwayReport(models.AbstractModel):
+    """Data layer of the EWAY payment export.
+
+    The payments and their allocations come from ``eway.payment.link``;
+    everything else the export needs is fetched in a fixed number of
+    ``read`` calls and indexed in dicts. The rows are then built from
+    memory only.
+    """
+    _name = 'eway.report'
+    _description = 'EWAY Payment Export'
+
+    @api.model
+    def _get_export_days(self, company, date_from, date_to):
+        """Return (days, error message) of the export of the period: the
+        days with linked customer payments, or why there is nothing to export"""
+        days = self.env['eway.report.day']._get_payment_days(company, date_from, date_to)
+        if days:
+            return days, None
+        if self._has_payments(company, date_from, date_to):
+            return days, "No linked invoices found for the given payments."
+        return days, "No customer payments found for the given period."
+
+    @api.model
+    def _spool_export(self, company, days, file_format='xlsx'):
+        """Stream the rows of ``days``, assembled from the cached days, into
+        a file of ``file_format`` (an ``EXPORT_FORMATS`` key); return the
+        spooled file"""
+        rows = self.env['eway.report.day']._iter_rows(company, days)
+        if file_format == 'csv':
+            return table_stream.spool_csv(EWAY_HEADERS, rows)
+        if file_format == 'parquet':
+            return table_stream.spool_parquet(EWAY_HEADERS, EWAY_COLUMN_TYPES, rows)
+        return xlsx_stream.spool_workbook(
+            [("EWAY Report", EWAY_HEADERS, rows, None)],
+            cell_style=xlsx_stream.left_aligned_style,
+        )
+
+    @api.model
+    def _spool_export_multi(self, companies, days_by_company, file_format='xlsx'):
+        """Like _spool_export, for several companies: one sheet per company
+        and a consolidated one with a company column (the consolidated rows
+        only in csv and parquet). The uncached days are computed first, one
+        company per worker process."""
+        self._prepare_companies(companies, days_by_company)
+        Days = self.env['eway.report.day']
+
+        def consolidated_rows():
+            for company in companies:
+                for row in Days._iter_rows(company, days_by_company[company]):
+                    yield [company.name] + row
+
+        header = ["Company"] + EWAY_HEADERS
+        if file_format == 'csv':
+            return table_stream.spool_csv(header, consolidated_rows())
+        if file_format == 'parquet':
+            return table_stream.spool_parquet(header, ['string'] + EWAY_COLUMN_TYPES, consolidated_rows())
+        sheets = [
+            (company.name, EWAY_HEADERS, Days._iter_rows(company, days_by_company[company]), None)
+            for company in companies
+        ]
+        sheets.append((CONSOLIDATED_TITLE, header, consolidated_rows(), None))
+        return xlsx_stream.spool_workbook(sheets, cell_style=xlsx_stream.left_aligned_style)
+
+    @api.model
+    def _prepare_companies(self, companies, days_by_company):
+        """Compute and store the days of ``companies`` missing from the cache"""
+        Days = self.env['eway.report.day']
+        missing = {}
+        for company in companies:
+            days = Days._get_missing_days(company, days_by_company[company])
+            if days:
+                missing[company] = days
+        workers = self._get_company_workers(len(missing))
+        if workers > 1:
+            try:
+                computed = self._compute_companies_parallel(missing, workers)
+            except BrokenProcessPool:
+                _logger.warning("EWAY export worker pool broke, computing serially", exc_info=True)
+                parallel.discard_pool()
+            else:
+                for company, rows_by_day in computed.items():
+                    Days._store_days(company, rows_by_day)
+                return
+        for company, days in missing.items():
+            Days.with_company(company)._compute_days(company, days)
+
+    @api.model
+    def _get_company_workers(self, company_count):
+        """Worker processes computing the companies of a multi-company
+        export, 0 to compute them here; see ``parallel.configured_workers``"""
+        if self.env.registry.in_test_mode() or company_count < 2:
+            return 0
+        workers = min(parallel.configured_workers(self.env), company_count)
+        return workers if workers > 1 else 0
+
+    @api.model
+    def _compute_companies_parallel(self, missing, workers):
+        """Return {company: {day: rows}} of ``missing`` ({company: days}),
+        each company computed by a worker process importing the snapshot of
+        the current transaction"""
+        self.env.cr.execute("SELECT pg_export_snapshot()")
+        snapshot = self.env.cr.fetchone()[0]
+        with parallel.use_pool(workers) as pool:
+            futures = {
+                company: pool.submit(
+                    parallel.compute_eway_days, self.env.cr.dbname, snapshot, self.env.uid,
+                    {'lang': self.env.lang}, company.id, days,
+                )
+                for company, days in missing.items()
+            }
+            return {company: future.result() for company, future in futures.items()}
+
+    @api.model
+    def _get_payments(self, company, date_from, date_to, days=None):
+        """Validated customer payments of ``company`` dated in the period (or
+        on ``days`` of it) that are reconciled with invoices, newest first,
+        read from the payment links with one range scan of their
+        (company, date) index"""
+        self.env['eway.payment.link'].flush_model()
+        self.env['account.payment'].flush_model(['amount', 'name', 'partner_type', 'state'])
+        day_filter = "AND l.payment_date = ANY(%(days)s)" if days else ""
+        self.env.cr.execute("""
+            SELECT l.payment_id, l.payment_date, ap.amount, l.invoice_id, l.sale_order_id
+              FROM eway_payment_link l
+              JOIN account_payment ap ON ap.id = l.payment_id
+             WHERE l.company_id = %%(company_id)s
+               AND l.payment_date BETWEEN %%(date_from)s::date AND %%(date_to)s::date
+               AND ap.partner_type = 'customer'
+               AND ap.state = ANY(%%(states)s)
+               %(day_filter)s
+             ORDER BY l.payment_date DESC, ap.name DESC, l.payment_id DESC, l.invoice_id
+        """ % {'day_filter': day_filter}, {
+            'company_id': company.id,
+            'date_from': date_from,
+            'date_to': date_to,
+            'states': list(PAYMENT_STATES),
+            'days': list(days or []),
+        })
+        payments = []
+        for payment_id, payment_date, amount, invoice_id, sale_order_id in self.env.cr.fetchall():
+            if not payments or payments[-1]['id'] != payment_id:
+                payments.append({
+                    'id': payment_id,
+                    'date': payment_date,
+                    'amount': amount,
+                    'reconciled_invoice_ids': [],
+                    'sale_order_ids': {},
+                })
+            pay = payments[-1]
+            if invoice_id not in pay['sale_order_ids']:
+                pay['reconciled_invoice_ids'].append(invoice_id)
+                pay['sale_order_ids'][invoice_id] = sale_order_id
+        return payments
+
+    @api.model
+    def _has_payments(self, company, date_from, date_to):
+        """Whether the period has validated customer payments at all, linked to
+        invoices or not"""
+        return bool(self.env['account.payment'].search_count([
+            ('company_id', '=', company.id),
+            ('date', '>=', date_from),
+            ('date', '<=', date_to),
+            ('partner_type', '=', 'customer'),
+            ('state', 'in', PAYMENT_STATES),
+        ], limit=1))
+
+    @api.model
+    def _prefetch(self, payments):
+        """Return the export data of ``payments`` (as read by _get_payments)"""
+        invoice_ids = {invoice_id for pay in payments for invoice_id in pay['reconciled_invoice_ids']}
+        invoices = {
+            invoice['id']: invoice for invoice in self.env['account.move'].browse(list(invoice_ids)).read([
+                'name', 'partner_id', 'invoice_date',
+                'amount_untaxed', 'amount_total', 'amount_residual',
+            ])
+        } if invoice_ids else {}
+
+        sale_by_invoice = {}
+        for pay in payments:
+            sale_by_invoice.update(pay['sale_order_ids'])
+        sale_order_ids = set(sale_by_invoice.values()) - {None}
+        sale_orders = {
+            so['id']: so for so in self.env['sale.order'].browse(list(sale_order_ids)).read(['user_id'])
+        } if sale_order_ids else {}
+        # EWAY operations are not linked: they come from another module and
+        # are looked up by sale order, so their edits need no maintenance
+        eway_by_sale = {
+            eway['sale_id'][0]: eway for eway in self.env['eway.operation'].search_read(
+                [('sale_id', 'in', list(sale_orders))],
+                ['name', 'trip_start_date', 'trip_end_date', 'invoice_amount', 'sale_id'])
+        } if sale_orders else {}
+
+        allocations, counterpart_payments = self._get_allocations(list(invoices))
+
+        invoice_lines = defaultdict(list)
+        for line in self.env['account.move.line'].search_read([
+            ('move_id', 'in', list(invoices)),
+            ('display_type', 'in', ('product', 'line_section', 'line_note')),
+        ], ['move_id', 'eway_operation', 'price_unit'], order='id') if invoices else []:
+            invoice_lines[line['move_id'][0]].append(line)
+
+        return {
+            'payments': payments,
+            'invoices': invoices,
+            'sale_by_invoice': sale_by_invoice,
+            'sale_orders': sale_orders,
+            'eway_by_sale': eway_by_sale,
+            'allocations': allocations,
+            'counterpart_payments': counterpart_payments,
+            'invoice_lines': invoice_lines,
+            'eway_names': read_names(self.env, 'eway.operation', {
+                m2o_id(line['eway_operation']) for lines in invoice_lines.values() for line in lines
+            } - {False}),
+            'partner_names': read_names(self.env, 'res.partner', {
+                m2o_id(inv['partner_id']) for inv in invoices.values()
+            } - {False}),
+            'user_names': read_names(self.env, 'res.users', {
+                m2o_id(so['user_id']) for so in sale_orders.values()
+            } - {False}),
+        }
+
+    @api.model
+    def _get_allocations(self, invoice_ids):
+        """Return ({invoice_id: [(payment_id, amount)]}, {payment_id: payment})
+        of the payments reconciled with the receivable lines of the invoices,
+        in the order of the invoice lines and of the reconciliations"""
+        if not invoice_ids:
+            return {}, {}
+        self.env['eway.payment.link'].flush_model()
+        self.env.cr.execute("""
+            SELECT l.invoice_id, l.payment_id, l.amount
+              FROM eway_payment_link l
+              JOIN account_partial_reconcile apr ON apr.id = l.partial_id
+             WHERE l.invoice_id = ANY(%s)
+             ORDER BY apr.debit_move_id, apr.id
+        """, [list(invoice_ids)])
+        allocations = defaultdict(list)
+        for invoice_id, payment_id, amount in self.env.cr.fetchall():
+            allocations[invoice_id].append((payment_id, amount))
+
+        payment_ids = {payment_id for allocs in allocations.values() for payment_id, __ in allocs}
+        counterpart_payments = {
+            pay['id']: pay for pay in self.env['account.payment'].browse(list(payment_ids)).read(['date', 'amount'])
+        } if payment_ids else {}
+        return allocations, counterpart_payments
+
+    @api.model
+    def _iter_rows(self, data):
+        """Yield the export rows, one per invoice line and payment allocation
+        of each invoice reconciled with each payment"""
+        invoices = data['invoices']
+        for pay in data['payments']:
+            for invoice_id in pay['reconciled_invoice_ids']:
+                invoice = invoices[invoice_id]
+
+                sale = data['sale_orders'].get(data['sale_by_invoice'].get(invoice_id))
+                eway = data['eway_by_sale'].get(sale['id']) if sale else None
+
+                customer_name = data['partner_names'].get(m2o_id(invoice['partner_id']), '')
+                salesperson = data['user_names'].get(m2o_id(sale['user_id']), '') if sale else ''
+                trip_start = eway['trip_start_date'].strftime("%m/%d/%Y") if eway and eway['trip_start_date'] else ''
+                trip_end = eway['trip_end_date'].strftime("%m/%d/%Y") if eway and eway['trip_end_date'] else ''
+
+                invoice_number = invoice['name'] or ''
+                invoice_date = invoice['invoice_date'].strftime("%m/%d/%Y") if invoice['invoice_date'] else ''
+
+                invoice_untaxed = invoice['amount_untaxed']
+                ratio = invoice['amount_untaxed'] / invoice['amount_total'] if invoice['amount_total'] else 1
+
+                # running balance untaxed
+                balance_untaxed = invoice_untaxed
+
+                for payment_id, amount_paid_total in data['allocations'].get(invoice_id, []):
+                    alloc_pay = data['counterpart_payments'][payment_id]
+
+                    payment_untaxed = round(amount_paid_total * ratio, 2)
+
+                    balance_untaxed = round(balance_untaxed - payment_untaxed, 2)
+                    if balance_untaxed < 0:
+                        balance_untaxed = 0
+
+                    payment_date = alloc_pay['date'].strftime("%m/%d/%Y") if alloc_pay['date'] else ''
+
+                    # Partial Payment column → 0 if fully paid, else actual allocation
+                    partial_payment_actual = 0 if abs(invoice['amount_residual']) < 0.01 else amount_paid_total
+
+                    for line in data['invoice_lines'].get(invoice_id, []):
+                        eway_number = data['eway_names'].get(m2o_id(line['eway_operation']), '')
+                        eway_amount = line['price_unit'] or 0.0
+
+                        yield [
+                            customer_name, salesperson, eway_number, trip_start, trip_end, eway_amount,
+                            invoice_number, invoice_date, invoice_untaxed,
+                            partial_payment_actual,  # 0 if fully paid
+                            balance_untaxed,
+                            invoice['amount_residual'],  # actual amount due
+                            payment_date, alloc_pay['amount']  # Always take from payment record
+                        ]
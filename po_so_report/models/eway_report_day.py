@@ -0,0 +1,192 @@
+import json
+
+from odoo import api, fields, models
+
+from .eway_report import PAYMENT_STATES
+
+# Cached days read back per query while streaming a range
+DAY_READ_BATCH = 31
+
+# Link column -> how it selects links, for the invalidation of whole invoices
+INVALIDATION_KEYS = ('partial_id', 'payment_id', 'invoice_id', 'sale_order_id')
+
+
+class EwayReportDay(models.Model):
+    """EWAY export rows of the payments of one company dated one day.
+
+    A range is assembled from these day blocks, newest day first, and only
+    the days missing from the cache are computed. A row shows the payments
+    and residual of a whole invoice, so any change to a reconciliation,
+    payment, invoice or sale order drops the cached days of every payment
+    linked to the same invoices. Partners and EWAY operations (another
+    module's model) are not hooked: days older than their last write are
+    recomputed when read.
+    """
+    _name = 'eway.report.day'
+    _description = 'EWAY Export Rows of a Day'
+    _order = 'company_id, day desc'
+
+    company_id = fields.Many2one('res.company', string='Company', required=True, ondelete='cascade')
+    day = fields.Date(string='Payment Date', required=True)
+    rows = fields.Json(string='Rows')
+
+    _company_day_uniq = models.Constraint(
+        'UNIQUE(company_id, day)',
+        'Only one cached day per company is allowed.',
+    )
+
+    # ---------------------------------------------------------
+    # READING
+    # ---------------------------------------------------------
+    @api.model
+    def _iter_rows(self, company, days):
+        """Yield the export rows of ``days`` (see _get_payment_days), newest
+        day first, computing and storing the days that are not cached"""
+        missing = self._get_missing_days(company, days)
+        computed = self._compute_days(company, missing) if missing else {}
+
+        for index in range(0, len(days), DAY_READ_BATCH):
+            batch = days[index:index + DAY_READ_BATCH]
+            to_read = [day for day in batch if day not in computed]
+            stored = {
+                record['day']: record['rows'] for record in self.sudo().search_read([
+                    ('company_id', '=', company.id),
+                    ('day', 'in', to_read),
+                ], ['day', 'rows'])
+            } if to_read else {}
+            for day in batch:
+                yield from computed.get(day) or stored.get(day) or []
+
+    @api.model
+    def _get_missing_days(self, company, days):
+        """Days among ``days`` to compute: not cached or outdated"""
+        cached = self._get_valid_days(company, days)
+        return [day for day in days if day not in cached]
+
+    @api.model
+    def _get_payment_days(self, company, date_from, date_to):
+        """Days of the period with linked customer payments, newest first"""
+        self.env['eway.payment.link'].flush_model()
+        self.env['account.payment'].flush_model(['partner_type', 'state'])
+        self.env.cr.execute("""
+            SELECT DISTINCT l.payment_date
+              FROM eway_payment_link l
+              JOIN account_payment ap ON ap.id = l.payment_id
+             WHERE l.company_id = %s
+               AND l.payment_date BETWEEN %s::date AND %s::date
+               AND ap.partner_type = 'customer'
+               AND ap.state = ANY(%s)
+             ORDER BY l.payment_date DESC
+        """, [company.id, date_from, date_to, list(PAYMENT_STATES)])
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _get_valid_days(self, company, days):
+        """Cached days among ``days`` not older than the partners and EWAY
+        operations their rows show"""
+        if not days:
+            return set()
+        self.env.cr.execute("""
+            SELECT d.day
+              FROM eway_report_day d
+             WHERE d.company_id = %(company_id)s
+               AND d.day = ANY(%(days)s)
+               AND NOT EXISTS (
+                    SELECT 1
+                      FROM eway_payment_link l
+                      JOIN account_move inv ON inv.id = l.invoice_id
+                      JOIN res_partner rp ON rp.id = inv.partner_id
+                     WHERE l.company_id = d.company_id
+                       AND l.payment_date = d.day
+                       AND rp.write_date > d.write_date
+               )
+               AND NOT EXISTS (
+                    SELECT 1
+                      FROM eway_payment_link l
+                      JOIN eway_operation eo ON eo.sale_id = l.sale_order_id
+                     WHERE l.company_id = d.company_id
+                       AND l.payment_date = d.day
+                       AND eo.write_date > d.write_date
+               )
+               AND NOT EXISTS (
+                    SELECT 1
+                      FROM eway_payment_link l
+                      JOIN account_move_line aml ON aml.move_id = l.invoice_id
+                      JOIN eway_operation eo ON eo.id = aml.eway_operation
+                     WHERE l.company_id = d.company_id
+                       AND l.payment_date = d.day
+                       AND eo.write_date > d.write_date
+               )
+        """, {'company_id': company.id, 'days': list(days)})
+        return {row[0] for row in self.env.cr.fetchall()}
+
+    # ---------------------------------------------------------
+    # COMPUTATION
+    # ---------------------------------------------------------
+    @api.model
+    def _compute_days(self, company, days, store=True):
+        """Compute, store (unless ``store`` is false, e.g. in a read-only
+        transaction) and return {day: rows} of ``days``"""
+        EwayReport = self.env['eway.report']
+        payments = EwayReport._get_payments(company, min(days), max(days), days=days)
+        data = EwayReport._prefetch(payments)
+        computed = {day: [] for day in days}
+        for day, day_payments in self._group_by_day(payments):
+            computed[day] = list(EwayReport._iter_rows(dict(data, payments=day_payments)))
+        if store:
+            self._store_days(company, computed)
+        return computed
+
+    @api.model
+    def _group_by_day(self, payments):
+        groups = []
+        for pay in payments:
+            if not groups or groups[-1][0] != pay['date']:
+                groups.append((pay['date'], []))
+            groups[-1][1].append(pay)
+        return groups
+
+    @api.model
+    def _store_days(self, company, rows_by_day):
+        # upsert: concurrent exports of overlapping ranges compute the same days
+        for day, rows in rows_by_day.items():
+            self.env.cr.execute("""
+                INSERT INTO eway_report_day (company_id, day, rows, create_uid, create_date, write_uid, write_date)
+                VALUES (%(company_id)s, %(day)s, %(rows)s::jsonb,
+                        %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC')
+                ON CONFLICT (company_id, day) DO UPDATE
+                   SET rows = EXCLUDED.rows,
+                       write_uid = EXCLUDED.write_uid,
+                       write_date = EXCLUDED.write_date
+            """, {
+                'company_id': company.id,
+                'day': day,
+                'rows': json.dumps(rows),
+                'uid': self.env.uid,
+            })
+        self.invalidate_model()
+
+    # ---------------------------------------------------------
+    # INVALIDATION
+    # ---------------------------------------------------------
+    @api.model
+    def _invalidate_links(self, key, ids):
+        """Drop the cached days of the payments linked to the invoices of
+        the links whose ``key`` column is in ``ids`` (to ``ids`` themselves
+        for ``invoice_id``, which may be any move ids)"""
+        assert key in INVALIDATION_KEYS
+        if not ids:
+            return
+        self.env['eway.payment.link'].flush_model()
+        if key == 'invoice_id':
+            invoices = "%s"
+        else:
+            invoices = "SELECT invoice_id FROM eway_payment_link WHERE %s = ANY(%%s)" % key
+        self.env.cr.execute("""
+            DELETE FROM eway_report_day d
+             USING eway_payment_link l
+             WHERE d.company_id = l.company_id
+               AND d.day = l.payment_date
+               AND l.invoice_id = ANY(%s)
+        """ % invoices, [list(ids)])
+        self.invalidate_model()
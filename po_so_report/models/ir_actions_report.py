@@ -0,0 +1,75 @@
+from collections import Counter
+
+from odoo import models
+from odoo.tools.pdf import merge_pdf
+
+# PO/SO reports rendered in chunks, with their summary report type
+CHUNKED_REPORTS = {
+    'po_so_report.report_sale_order_template': 'sale',
+    'po_so_report.report_purchase_order_template': 'purchase',
+}
+
+# Default number of report rows rendered per chunk
+PDF_CHUNK_ROWS = 1500
+
+
+class IrActionsReport(models.Model):
+    _inherit = 'ir.actions.report'
+
+    def _render_qweb_pdf(self, report_ref, res_ids=None, data=None):
+        """Render large PO/SO reports chunk by chunk.
+
+        The projects are split into groups of about ``PDF_CHUNK_ROWS`` rows,
+        never splitting a project so that its totals stay whole. Each group
+        is rendered and converted on its own, with the column counts of the
+        whole selection, and the PDFs are merged; only the first one has the
+        report title.
+
+        The chunks are converted one after the other, so this only bounds
+        the memory wkhtmltopdf needs for a large report: it does not make
+        the rendering any faster.
+        """
+        report = self._get_report(report_ref)
+        report_type = CHUNKED_REPORTS.get(report.report_name)
+        if report_type:
+            chunks, columns = self._get_po_so_report_chunks(report_type, res_ids, data)
+            if len(chunks) > 1:
+                return self._render_po_so_report_chunks(report_ref, chunks, columns, data), 'pdf'
+        return super()._render_qweb_pdf(report_ref, res_ids=res_ids, data=data)
+
+    def _get_po_so_report_chunks(self, report_type, res_ids, data):
+        """Return ([project_ids], {max_invoices, max_payments}) of the report"""
+        if data and data.get('project_ids'):
+            projects = self.env['project.project'].browse(data['project_ids'])
+        else:
+            projects = self.env['po.so.wizard'].browse(res_ids).project_ids
+        rows = self.env['po.so.report.summary']._get_report_rows(report_type, projects)
+        row_counts = Counter(row['project_id'] for row in rows)
+        chunk_rows = int(self.env['ir.config_parameter'].sudo().get_param(
+            'po_so_report.pdf_chunk_rows', PDF_CHUNK_ROWS))
+
+        chunks, chunk, size = [], [], 0
+        for project in projects:
+            if chunk and size + row_counts[project.id] > chunk_rows:
+                chunks.append(chunk)
+                chunk, size = [], 0
+            chunk.append(project.id)
+            size += row_counts[project.id]
+        if chunk:
+            chunks.append(chunk)
+
+        columns = {
+            'max_invoices': max((len(row['invoices']) for row in rows), default=0),
+            'max_payments': max((len(row['payments']) for row in rows), default=0),
+        }
+        return chunks, columns
+
+    def _render_po_so_report_chunks(self, report_ref, chunks, columns, data):
+        # Chunks are rendered one after the other: the environment and its
+        # cursor cannot be shared between threads
+        pdfs = []
+        for index, project_ids in enumerate(chunks):
+            chunk_data = dict(data or {}, project_ids=project_ids, chunk_index=index, **columns)
+            content, _extension = super()._render_qweb_pdf(report_ref, data=chunk_data)
+            pdfs.append(content)
+        return merge_pdf(pdfs)
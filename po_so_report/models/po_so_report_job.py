@@ -0,0 +1,193 @@
+import logging
+from datetime import timedelta
+
+from odoo import _, api, fields, models
+
+from .po_so_report_summary import REPORT_MODELS, REPORT_TYPES
+
+_logger = logging.getLogger(__name__)
+
+REPORT_ACTIONS = {
+    'sale': 'po_so_report.action_report_sale_order',
+    'purchase': 'po_so_report.action_report_purchase_order',
+    'bill': 'po_so_report.action_report_purchase_bill',
+}
+
+# Projects whose summaries are refreshed between two progress commits
+JOB_PROGRESS_BATCH = 10
+# Running jobs without progress for this long are considered lost (dead
+# worker) and queued again
+JOB_STALE_AFTER = timedelta(hours=1)
+
+
+class PoSoReportJob(models.Model):
+    """Report generation queued from the wizard and run by cron.
+
+    The project summaries are refreshed in batches, committing the progress
+    after each batch, then the report is rendered as the requesting user
+    and stored as an attachment of the job.
+    """
+    _name = 'po.so.report.job'
+    _description = 'PO/SO Report Generation Job'
+    _order = 'id desc'
+
+    name = fields.Char(string='Report', required=True)
+    user_id = fields.Many2one('res.users', string='Requested By', required=True, index=True,
+                              default=lambda self: self.env.user, ondelete='cascade')
+    report_type = fields.Selection(REPORT_TYPES, string='Report Type', required=True)
+    project_ids = fields.Many2many('project.project', string='Projects', required=True)
+    company_id = fields.Many2one('res.company', string='Company',
+                                 help="Current company of the requesting user when the report was queued")
+    company_ids = fields.Many2many('res.company', string='Companies',
+                                   help="Companies selected by the requesting user when the report was queued")
+    file_format = fields.Selection([
+        ('pdf', 'PDF'),
+        ('xlsx', 'Excel (XLSX)'),
+    ], string='Format', default='pdf', required=True)
+    state = fields.Selection([
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Status', default='queued', required=True, index=True)
+    progress_done = fields.Integer(string='Projects Done')
+    progress_total = fields.Integer(string='Projects')
+    progress = fields.Float(string='Progress', compute='_compute_progress')
+    attachment_id = fields.Many2one('ir.attachment', string='Report File', readonly=True)
+    error_message = fields.Text(string='Error', readonly=True)
+    date_done = fields.Datetime(string='Finished On', readonly=True)
+
+    @api.depends('progress_done', 'progress_total')
+    def _compute_progress(self):
+        for job in self:
+            job.progress = 100.0 * job.progress_done / job.progress_total if job.progress_total else 0.0
+
+    # ---------------------------------------------------------
+    # QUEUE
+    # ---------------------------------------------------------
+    @api.model
+    def _enqueue(self, report_type, projects, file_format='pdf'):
+        job = self.sudo().create({
+            'name': self.env.ref(REPORT_ACTIONS[report_type]).name,
+            'user_id': self.env.uid,
+            'report_type': report_type,
+            'file_format': file_format,
+            'project_ids': [(6, 0, projects.ids)],
+            'company_id': self.env.company.id,
+            'company_ids': [(6, 0, self.env.companies.ids)],
+            'progress_total': len(projects),
+        })
+        self.env.ref('po_so_report.ir_cron_process_po_so_report_jobs')._trigger()
+        return job
+
+    def action_download(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_url',
+            'url': '/web/content/%s?download=true' % self.attachment_id.id,
+            'target': 'self',
+        }
+
+    # ---------------------------------------------------------
+    # PROCESSING
+    # ---------------------------------------------------------
+    @api.model
+    def _claim_next(self):
+        """Lock and return the oldest queued job, skipping the ones other
+        cron workers are already claiming"""
+        self.env.cr.execute("""
+            SELECT id
+              FROM po_so_report_job
+             WHERE state = 'queued'
+             ORDER BY id
+             LIMIT 1
+               FOR UPDATE SKIP LOCKED
+        """)
+        row = self.env.cr.fetchone()
+        return self.browse(row[0]) if row else self.browse()
+
+    @api.model
+    def _cron_process_jobs(self):
+        # Jobs commit their progress, so the cron transaction is committed
+        # as we go rather than once at the end
+        self.search([
+            ('state', '=', 'running'),
+            ('write_date', '<', fields.Datetime.now() - JOB_STALE_AFTER),
+        ]).write({'state': 'queued', 'progress_done': 0})
+        self.env.cr.commit()
+        while True:
+            job = self._claim_next()
+            if not job:
+                break
+            job.write({'state': 'running', 'progress_done': 0, 'error_message': False})
+            self.env.cr.commit()
+            try:
+                job._run()
+            except Exception as e:
+                self.env.cr.rollback()
+                _logger.exception("PO/SO report job %s failed", job.id)
+                job.write({'state': 'failed', 'error_message': str(e)})
+                job._notify_user()
+            self.env.cr.commit()
+
+    def _run(self):
+        self.ensure_one()
+        # summaries are refreshed for the user and companies the report is
+        # rendered with, so that rendering finds them fresh
+        Summary = self._get_user_env()['po.so.report.summary']
+        projects = self.project_ids
+        for index in range(0, len(projects), JOB_PROGRESS_BATCH):
+            Summary._get_fresh_summaries(self.report_type, projects[index:index + JOB_PROGRESS_BATCH])
+            self.progress_done = min(index + JOB_PROGRESS_BATCH, len(projects))
+            self.env.cr.commit()
+
+        content, extension = self._render()
+        attachment = self.env['ir.attachment'].create({
+            'name': '%s.%s' % (self.name.replace(' ', '_'), extension),
+            'raw': content,
+            'res_model': self._name,
+            'res_id': self.id,
+        })
+        self.write({
+            'state': 'done',
+            'attachment_id': attachment.id,
+            'date_done': fields.Datetime.now(),
+        })
+        self._notify_user()
+
+    def _get_user_env(self):
+        """Environment of the requesting user with the companies they had
+        selected when queuing the report (still allowed to them), the
+        current one first"""
+        user = self.user_id
+        companies = (self.company_id | self.company_ids) & user.company_ids
+        company_ids = companies.ids or user.company_id.ids
+        return self.with_user(user).with_context(allowed_company_ids=company_ids, lang=user.lang).env
+
+    def _render(self):
+        """Render the report as the requesting user; return (content, extension)"""
+        env = self._get_user_env()
+        data = {'project_ids': self.project_ids.ids}
+        if self.file_format == 'xlsx':
+            spool, extension = env[REPORT_MODELS[self.report_type]]._render_xlsx(None, data)
+            with spool:
+                return spool.read(), extension
+        return env['ir.actions.report']._render_qweb_pdf(REPORT_ACTIONS[self.report_type], data=data)
+
+    def _notify_user(self):
+        self.ensure_one()
+        if self.state == 'done':
+            payload = {
+                'type': 'success',
+                'title': _('Report ready'),
+                'message': _('%(report)s is ready to download from the report jobs.', report=self.name),
+            }
+        else:
+            payload = {
+                'type': 'danger',
+                'title': _('Report failed'),
+                'message': _('%(report)s could not be generated: %(error)s',
+                             report=self.name, error=self.error_message),
+                'sticky': True,
+            }
+        self.user_id.partner_id._bus_send('simple_notification', payload)
@@ -0,0 +1,454 @@
+import logging
+import math
+from concurrent.futures.process import BrokenProcessPool
+
+from odoo import api, fields, models
+from odoo.tools.lru import LRU
+
+from ..tools import parallel
+
+_logger = logging.getLogger(__name__)
+
+REPORT_TYPES = [
+    ('sale', 'Sale Order'),
+    ('purchase', 'Purchase Order'),
+    ('bill', 'Purchase Bill'),
+]
+
+REPORT_MODELS = {
+    'sale': 'report.po_so_report.report_sale_order_template',
+    'purchase': 'report.po_so_report.report_purchase_order_template',
+    'bill': 'report.po_so_report.report_purchase_bill_template',
+}
+
+# Report row key -> summary line field, per report type
+ROW_FIELDS = {
+    'sale': {
+        'vendor_name': 'vendor_name',
+        'so_po_number': 'document_name',
+        'so_po_total': 'amount',
+        'invoices': 'invoices',
+        'invoice_total': 'invoice_total',
+        'invoice_items': 'invoice_items',
+        'diff_so_invoice': 'diff_so_invoice',
+        'payments': 'payments',
+        'payment_total': 'payment_total',
+        'diff_invoice_payment': 'diff_invoice_payment',
+    },
+    'purchase': {
+        'vendor_name': 'vendor_name',
+        'so_po_number': 'document_name',
+        'quote': 'amount',
+        'invoices': 'invoices',
+        'total_invoice': 'invoice_total',
+        'payments': 'payments',
+        'total_payment': 'payment_total',
+    },
+    'bill': {
+        'bill_number': 'document_name',
+        'bill_date': 'document_date',
+        'vendor_name': 'vendor_name',
+        'bill_amount': 'amount',
+        'payments': 'payments',
+        'payment_total': 'payment_total',
+    },
+}
+
+CRON_BATCH_SIZE = 100
+
+# Default minimum number of projects before the computation is spread over
+# worker processes; smaller selections do not pay for the round trip
+PARALLEL_MIN_PROJECTS = 50
+
+# Report rows by (dbname, uid, company scope, report_type, project ids) ->
+# (fingerprint, rows), shared by all requests of the worker process
+REPORT_CACHE_SIZE = 128
+REPORT_CACHE = LRU(REPORT_CACHE_SIZE)
+
+def dump_entries(entries):
+    """Make invoice/payment entries JSON friendly (dates as ISO strings)"""
+    return [
+        dict(entry, date=fields.Date.to_string(entry['date']) if entry.get('date') else False)
+        for entry in entries or []
+    ]
+
+
+def load_entries(entries):
+    return [
+        dict(entry, date=fields.Date.to_date(entry['date']) if entry.get('date') else False)
+        for entry in entries or []
+    ]
+
+
+class PoSoReportSummary(models.Model):
+    """Materialized report data of one project for one report type.
+
+    The rows are computed by the report models' ``_process_*`` methods and
+    stored as summary lines. Changes to orders, invoices, bills, payments
+    and reconciliations flag the affected summaries dirty; dirty summaries
+    are recomputed by cron or, at the latest, when a report needs them.
+
+    The data is computed as the user printing the report with the companies
+    they selected, so that record rules apply as they would on the live
+    documents: each summary belongs to one user and company scope.
+    """
+    _name = 'po.so.report.summary'
+    _description = 'PO/SO Report Project Summary'
+    _order = 'project_id, report_type'
+
+    project_id = fields.Many2one('project.project', string='Project', required=True,
+                                 index=True, ondelete='cascade')
+    report_type = fields.Selection(REPORT_TYPES, string='Report Type', required=True)
+    user_id = fields.Many2one('res.users', string='Computed For', required=True,
+                              index=True, ondelete='cascade')
+    company_scope = fields.Char(string='Companies', required=True,
+                                help="Ids of the companies the rows were computed with")
+    is_dirty = fields.Boolean(string='Needs Refresh', default=True, index=True)
+    refreshed_at = fields.Datetime(string='Refreshed On')
+    line_ids = fields.One2many('po.so.report.summary.line', 'summary_id', string='Lines')
+
+    _project_report_type_uniq = models.Constraint(
+        'UNIQUE(project_id, report_type, user_id, company_scope)',
+        'Only one summary per project, report type, user and companies is allowed.',
+    )
+
+    @api.model
+    def _get_company_scope(self):
+        """Companies the rows of the current environment are computed with"""
+        return ','.join(str(company_id) for company_id in sorted(self.env.companies.ids))
+
+    def _get_scope_env(self):
+        """Environment of the user and companies the summary is computed for"""
+        self.ensure_one()
+        company_ids = [int(company_id) for company_id in self.company_scope.split(',')]
+        return self.with_user(self.user_id).with_context(allowed_company_ids=company_ids).env
+
+    # ---------------------------------------------------------
+    # READING
+    # ---------------------------------------------------------
+    @api.model
+    def _get_report_rows(self, report_type, projects):
+        """Report rows of ``projects`` in project order.
+
+        Rows are served from the process cache while the data fingerprint
+        of the selection is unchanged; otherwise missing or dirty summaries
+        are refreshed and the rows read from them.
+        """
+        key = (self.env.cr.dbname, self.env.uid, self._get_company_scope(), report_type, tuple(projects.ids))
+        fingerprint = self._get_data_fingerprint(report_type, projects)
+        if fingerprint is not None:
+            cached = REPORT_CACHE.get(key)
+            if cached and cached[0] == fingerprint:
+                return [dict(row) for row in cached[1]]
+
+        summaries = self._get_fresh_summaries(report_type, projects)
+        by_project = {summary.project_id.id: summary for summary in summaries}
+        rows = []
+        for project in projects:
+            rows.extend(by_project[project.id]._to_rows())
+
+        if fingerprint is None:
+            self.env.flush_all()
+            fingerprint = self._get_data_fingerprint(report_type, projects)
+        if fingerprint is not None:
+            REPORT_CACHE[key] = (fingerprint, rows)
+        return [dict(row) for row in rows]
+
+    @api.model
+    def _get_data_fingerprint(self, report_type, projects):
+        """Freshness fingerprint of the report data of ``projects``: row count,
+        dirty flag and latest write date of the summaries, and latest write
+        date of the projects. ``None`` when a summary is missing or dirty,
+        i.e. when the stored rows cannot be trusted.
+
+        Every change of the source documents flags the summaries it affects
+        dirty, which writes them, so the summaries alone tell whether the
+        cached rows are current. The lookup only uses the summaries' unique
+        index.
+        """
+        self.flush_model()
+        projects.flush_model()
+        self.env.cr.execute("""
+            SELECT count(*), bool_or(is_dirty), max(write_date),
+                   (SELECT max(write_date) FROM project_project WHERE id = ANY(%(project_ids)s))
+              FROM po_so_report_summary
+             WHERE project_id = ANY(%(project_ids)s)
+               AND report_type = %(report_type)s
+               AND user_id = %(uid)s
+               AND company_scope = %(company_scope)s
+        """, {
+            'report_type': report_type,
+            'uid': self.env.uid,
+            'company_scope': self._get_company_scope(),
+            'project_ids': projects.ids,
+        })
+        fingerprint = self.env.cr.fetchone()
+        summary_count, any_dirty = fingerprint[0], fingerprint[1]
+        if summary_count != len(projects) or any_dirty:
+            return None
+        return fingerprint
+
+    @api.model
+    def _get_report_row_stream(self, report_type, projects):
+        """Return ``(max_invoices, max_payments, rows)`` of ``projects`` for
+        exports: ``rows`` yields the rows of the summary lines one by one, in
+        project order, rather than building the list ``_get_report_rows``
+        returns; the maximum entry counts, which size the columns, are
+        computed in SQL"""
+        summaries = self._get_fresh_summaries(report_type, projects)
+        by_project = {summary.project_id.id: summary for summary in summaries}
+        summaries = self.sudo().browse([by_project[project.id].id for project in projects])
+        self.env['po.so.report.summary.line'].flush_model(['summary_id', 'invoices', 'payments'])
+        self.env.cr.execute("""
+            SELECT COALESCE(max(jsonb_array_length(invoices)), 0),
+                   COALESCE(max(jsonb_array_length(payments)), 0)
+              FROM po_so_report_summary_line
+             WHERE summary_id = ANY(%s)
+        """, [summaries.ids])
+        max_invoices, max_payments = self.env.cr.fetchone()
+        return max_invoices, max_payments, summaries._iter_rows()
+
+    def _to_rows(self):
+        self.ensure_one()
+        return list(self._iter_rows())
+
+    def _iter_rows(self):
+        """Yield the rows of the summaries in the order of ``self``"""
+        for summary in self:
+            mapping = ROW_FIELDS[summary.report_type]
+            for line in summary.line_ids:
+                row = {'project_id': summary.project_id.id, 'project_name': summary.project_id.name}
+                for key, fname in mapping.items():
+                    value = line[fname]
+                    if fname in ('invoices', 'payments'):
+                        value = load_entries(value)
+                    elif fname in ('vendor_name', 'document_name', 'invoice_items'):
+                        value = value or ''
+                    row[key] = value
+                yield row
+            # long exports only keep the lines of one summary in cache
+            summary.line_ids.invalidate_recordset()
+
+    # ---------------------------------------------------------
+    # REFRESH
+    # ---------------------------------------------------------
+    @api.model
+    def _get_fresh_summaries(self, report_type, projects):
+        """Summaries of ``projects`` for the current user and companies,
+        created or refreshed when missing or dirty"""
+        company_scope = self._get_company_scope()
+        summaries = self.sudo().search([
+            ('report_type', '=', report_type),
+            ('user_id', '=', self.env.uid),
+            ('company_scope', '=', company_scope),
+            ('project_id', 'in', projects.ids),
+        ])
+        missing = set(projects.ids) - set(summaries.project_id.ids)
+        if missing:
+            summaries |= self.sudo().create([{
+                'project_id': project_id,
+                'report_type': report_type,
+                'user_id': self.env.uid,
+                'company_scope': company_scope,
+            } for project_id in missing])
+        summaries.filtered('is_dirty')._refresh()
+        return summaries
+
+    def _refresh(self):
+        """Recompute the lines of the summaries, batched per report type,
+        user and companies"""
+        groups = {}
+        for summary in self:
+            key = (summary.report_type, summary.user_id.id, summary.company_scope)
+            groups[key] = groups.get(key, self.browse()) | summary
+        for (report_type, __, __), summaries in groups.items():
+            env = summaries[0]._get_scope_env()
+            rows_by_project = self.with_env(env)._compute_rows(
+                report_type, summaries.project_id.with_env(env))
+            summaries._store_rows(rows_by_project)
+
+    @api.model
+    def _compute_rows(self, report_type, projects):
+        """Return {project_id: [row]} computed from the live data, spread
+        over worker processes for large project selections"""
+        workers = self._get_parallel_workers(len(projects))
+        if workers > 1:
+            try:
+                return self._compute_rows_parallel(report_type, projects, workers)
+            except BrokenProcessPool:
+                _logger.warning("PO/SO report worker pool broke, computing serially", exc_info=True)
+                parallel.discard_pool()
+        return self._compute_rows_serial(report_type, projects)
+
+    @api.model
+    def _get_parallel_workers(self, project_count):
+        """Worker processes to use for ``project_count`` projects, 0 for a
+        serial computation.
+
+        Configured with the ``po_so_report.parallel_workers`` (default: 0,
+        serial; capped to ``parallel.MAX_WORKERS``) and
+        ``po_so_report.parallel_min_projects`` system parameters.
+        """
+        if self.env.registry.in_test_mode():
+            # workers cannot see the data of the test cursor
+            return 0
+        ICP = self.env['ir.config_parameter'].sudo()
+        workers = parallel.configured_workers(self.env)
+        min_projects = int(ICP.get_param('po_so_report.parallel_min_projects', PARALLEL_MIN_PROJECTS))
+        if workers <= 1 or project_count < max(min_projects, 2):
+            return 0
+        return min(workers, project_count)
+
+    @api.model
+    def _compute_rows_parallel(self, report_type, projects, workers):
+        """Compute contiguous project chunks in worker processes importing
+        the snapshot of the current transaction, merged back in project order.
+
+        The snapshot does not carry this transaction's own uncommitted
+        writes: the source documents are expected to be committed, as they
+        are when a report is printed or refreshed by cron.
+        """
+        self.env.cr.execute("SELECT pg_export_snapshot()")
+        snapshot = self.env.cr.fetchone()[0]
+        chunk_size = math.ceil(len(projects) / workers)
+        computed = {}
+        with parallel.use_pool(workers) as pool:
+            futures = [
+                pool.submit(
+                    parallel.compute_rows_chunk, self.env.cr.dbname, snapshot, self.env.uid,
+                    {'lang': self.env.lang, 'allowed_company_ids': self.env.companies.ids},
+                    report_type, projects[index:index + chunk_size].ids,
+                )
+                for index in range(0, len(projects), chunk_size)
+            ]
+            for future in futures:
+                computed.update(future.result())
+        return {project.id: computed.get(project.id, []) for project in projects}
+
+    @api.model
+    def _compute_rows_serial(self, report_type, projects):
+        """Return {project_id: [row]} computed in this process, as the
+        current user"""
+        report = self.env[REPORT_MODELS[report_type]]
+        rows_by_project = {project.id: [] for project in projects}
+        if report_type == 'sale':
+            rows = report._process_sale_orders_batch(projects)
+        elif report_type == 'purchase':
+            rows = report._process_purchase_orders_batch(projects)
+        else:
+            rows = []
+            for project in projects:
+                rows.extend(dict(row, project_id=project.id) for row in report._process_purchase_bills(project))
+        for row in rows:
+            rows_by_project[row['project_id']].append(row)
+        return rows_by_project
+
+    def _store_rows(self, rows_by_project):
+        line_vals = []
+        for summary in self:
+            mapping = ROW_FIELDS[summary.report_type]
+            for sequence, row in enumerate(rows_by_project.get(summary.project_id.id, [])):
+                vals = {'summary_id': summary.id, 'sequence': sequence}
+                for key, fname in mapping.items():
+                    value = row.get(key)
+                    vals[fname] = dump_entries(value) if fname in ('invoices', 'payments') else value
+                line_vals.append(vals)
+        self.line_ids.unlink()
+        self.env['po.so.report.summary.line'].sudo().create(line_vals)
+        self.write({'is_dirty': False, 'refreshed_at': fields.Datetime.now()})
+
+    @api.model
+    def _cron_refresh_dirty(self, batch_size=CRON_BATCH_SIZE):
+        summaries = self.sudo().search([('is_dirty', '=', True)], limit=batch_size)
+        summaries._refresh()
+        _logger.info("Refreshed %s PO/SO report summaries", len(summaries))
+
+    # ---------------------------------------------------------
+    # INVALIDATION
+    # ---------------------------------------------------------
+    @api.model
+    def _mark_dirty(self, report_types, project_ids):
+        if not project_ids:
+            return
+        self.sudo().search([
+            ('project_id', 'in', list(project_ids)),
+            ('report_type', 'in', list(report_types)),
+            ('is_dirty', '=', False),
+        ]).write({'is_dirty': True})
+
+    @api.model
+    def _projects_for_analytic_distributions(self, distributions):
+        """Projects whose analytic account appears in the distribution keys"""
+        account_ids = {
+            int(account_id)
+            for distribution in distributions if distribution
+            for key in distribution
+            for account_id in key.split(',')
+        }
+        if not account_ids:
+            return set()
+        return set(self.env['project.project'].sudo().with_context(active_test=False).search([
+            ('account_id', 'in', list(account_ids)),
+        ]).ids)
+
+    @api.model
+    def _mark_dirty_for_purchase_orders(self, orders):
+        self._mark_dirty(['purchase'], self._projects_for_analytic_distributions(
+            orders.sudo().order_line.mapped('analytic_distribution')))
+
+    @api.model
+    def _mark_dirty_for_renames(self, fname, names):
+        """Flag the summaries whose lines show one of ``names`` in ``fname``:
+        partner names (``vendor_name``) and product names (``invoice_items``,
+        a comma-separated list) are stored on the lines"""
+        names = [name for name in names if name]
+        if not names:
+            return
+        if fname == 'invoice_items':
+            domain = ['|'] * (len(names) - 1) + [(fname, 'ilike', name) for name in names]
+        else:
+            domain = [(fname, 'in', names)]
+        summaries = self.env['po.so.report.summary.line'].sudo().search(domain).summary_id
+        summaries.filtered(lambda summary: not summary.is_dirty).write({'is_dirty': True})
+
+    @api.model
+    def _mark_dirty_for_moves(self, moves):
+        """Flag the summaries depending on customer invoices or vendor bills"""
+        moves = moves.sudo()
+        invoice_origins = [m.invoice_origin for m in moves if m.move_type == 'out_invoice' and m.invoice_origin]
+        if invoice_origins:
+            sale_orders = self.env['sale.order'].sudo().search([('name', 'in', invoice_origins)])
+            self._mark_dirty(['sale'], set(sale_orders.project_id.ids))
+
+        bills = moves.filtered(lambda m: m.move_type == 'in_invoice')
+        if bills:
+            bill_origins = [origin for origin in bills.mapped('invoice_origin') if origin]
+            if bill_origins:
+                self._mark_dirty_for_purchase_orders(
+                    self.env['purchase.order'].sudo().search([('name', 'in', bill_origins)]))
+            self._mark_dirty(['bill'], self._projects_for_analytic_distributions(
+                bills.invoice_line_ids.mapped('analytic_distribution')))
+
+
+class PoSoReportSummaryLine(models.Model):
+    """One document (sale order, purchase order or vendor bill) of a
+    project summary, holding the values shown on its report row"""
+    _name = 'po.so.report.summary.line'
+    _description = 'PO/SO Report Summary Line'
+    _order = 'summary_id, sequence, id'
+
+    summary_id = fields.Many2one('po.so.report.summary', required=True, index=True, ondelete='cascade')
+    project_id = fields.Many2one(related='summary_id.project_id', store=True, index=True)
+    report_type = fields.Selection(related='summary_id.report_type', store=True)
+    sequence = fields.Integer()
+    document_name = fields.Char(string='Document')
+    document_date = fields.Date(string='Document Date')
+    vendor_name = fields.Char(string='Customer / Vendor')
+    amount = fields.Float(string='SO/PO/Bill Amount')
+    invoices = fields.Json(string='Invoices')
+    invoice_total = fields.Float(string='Invoice Total')
+    invoice_items = fields.Char(string='Invoice Items')
+    diff_so_invoice = fields.Float(string='Diff (SO - Invoice)')
+    payments = fields.Json(string='Payments')
+    payment_total = fields.Float(string='Payment Total')
+    diff_invoice_payment = fields.Float(string='Diff (Invoice - Payment)')
@@ -0,0 +1,15 @@
+from odoo import models
+
+
+class ProductTemplate(models.Model):
+    _inherit = 'product.template'
+
+    def write(self, vals):
+        if 'name' not in vals:
+            return super().write(vals)
+        # the summary lines store the names of the invoiced products;
+        # variants are renamed through their template
+        names = set(self.mapped('name'))
+        res = super().write(vals)
+        self.env['po.so.report.summary']._mark_dirty_for_renames('invoice_items', names)
+        return res
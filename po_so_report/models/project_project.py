@@ -0,0 +1,11 @@
+from odoo import models
+
+
+class ProjectProject(models.Model):
+    _inherit = 'project.project'
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'account_id' in vals:
+            self.env['po.so.report.summary']._mark_dirty(['sale', 'purchase', 'bill'], set(self.ids))
+        return res
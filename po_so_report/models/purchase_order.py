@@ -0,0 +1,51 @@
+from odoo import api, models
+
+
+class PurchaseOrder(models.Model):
+    _inherit = 'purchase.order'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        orders = super().create(vals_list)
+        self.env['po.so.report.summary']._mark_dirty_for_purchase_orders(orders)
+        return orders
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env['po.so.report.summary']._mark_dirty_for_purchase_orders(self)
+        return res
+
+    def unlink(self):
+        Summary = self.env['po.so.report.summary']
+        # the lines are deleted by the SQL cascade, without their unlink()
+        project_ids = Summary._projects_for_analytic_distributions(
+            self.sudo().order_line.mapped('analytic_distribution'))
+        res = super().unlink()
+        Summary._mark_dirty(['purchase'], project_ids)
+        return res
+
+
+class PurchaseOrderLine(models.Model):
+    _inherit = 'purchase.order.line'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        self.env['po.so.report.summary']._mark_dirty_for_purchase_orders(lines.order_id)
+        return lines
+
+    def write(self, vals):
+        Summary = self.env['po.so.report.summary']
+        # the analytic distribution may move the order to another project
+        project_ids = Summary._projects_for_analytic_distributions(self.mapped('analytic_distribution'))
+        res = super().write(vals)
+        Summary._mark_dirty(['purchase'], project_ids)
+        Summary._mark_dirty_for_purchase_orders(self.order_id)
+        return res
+
+    def unlink(self):
+        Summary = self.env['po.so.report.summary']
+        project_ids = Summary._projects_for_analytic_distributions(self.mapped('analytic_distribution'))
+        res = super().unlink()
+        Summary._mark_dirty(['purchase'], project_ids)
+        return res
@@ -0,0 +1,14 @@
+from odoo import models
+
+
+class ResPartner(models.Model):
+    _inherit = 'res.partner'
+
+    def write(self, vals):
+        if 'name' not in vals:
+            return super().write(vals)
+        # the summary lines store the name of the customer / vendor
+        names = set(self.mapped('name'))
+        res = super().write(vals)
+        self.env['po.so.report.summary']._mark_dirty_for_renames('vendor_name', names)
+        return res
@@ -0,0 +1,52 @@
+from odoo import api, models
+
+
+class SaleOrder(models.Model):
+    _inherit = 'sale.order'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        orders = super().create(vals_list)
+        self.env['po.so.report.summary']._mark_dirty(['sale'], set(orders.project_id.ids))
+        return orders
+
+    def write(self, vals):
+        project_ids = set(self.project_id.ids)
+        names = set(self.mapped('name')) if 'name' in vals else set()
+        res = super().write(vals)
+        self.env['po.so.report.summary']._mark_dirty(['sale'], project_ids | set(self.project_id.ids))
+        if names:
+            # invoices point to their order by name
+            self.env['eway.payment.link']._refresh_links_for_sale_names(names | set(self.mapped('name')))
+        elif 'user_id' in vals:
+            self.env['eway.report.day']._invalidate_links('sale_order_id', self.ids)
+        return res
+
+    def unlink(self):
+        project_ids = set(self.project_id.ids)
+        res = super().unlink()
+        self.env['po.so.report.summary']._mark_dirty(['sale'], project_ids)
+        return res
+
+
+class SaleOrderLine(models.Model):
+    _inherit = 'sale.order.line'
+
+    # Order totals are stored computes: line changes never go through
+    # sale.order.write()
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        self.env['po.so.report.summary']._mark_dirty(['sale'], set(lines.order_id.project_id.ids))
+        return lines
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env['po.so.report.summary']._mark_dirty(['sale'], set(self.order_id.project_id.ids))
+        return res
+
+    def unlink(self):
+        project_ids = set(self.order_id.project_id.ids)
+        res = super().unlink()
+        self.env['po.so.report.summary']._mark_dirty(['sale'], project_ids)
+        return res
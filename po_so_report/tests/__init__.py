@@ -0,0 +1,8 @@
+from . import test_po_so_report_batch
+from . import test_po_so_report_summary
+from . import test_po_so_report_cache
+from . import test_po_so_report_job
+from . import test_po_so_report_xlsx
+from . import test_po_so_report_chunks
+from . import test_eway_payment_link
+from . import test_eway_report_day
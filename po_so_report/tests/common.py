@@ -0,0 +1,27 @@
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+
+
+class PoSoReportTestCommon(AccountTestInvoicingCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # payments get a journal entry reconciled with their invoices, which
+        # the summaries and the EWAY links are refreshed from
+        cls.bank_journal = cls.company_data['default_journal_bank']
+        (cls.bank_journal.inbound_payment_method_line_ids
+         | cls.bank_journal.outbound_payment_method_line_ids).payment_account_id = cls.env['account.account'].create({
+            'name': 'Test Outstanding Payments',
+            'code': 'POSOOUT',
+            'account_type': 'asset_current',
+            'reconcile': True,
+        })
+
+    def _register_payment(self, invoice, amount, payment_date):
+        return self.env['account.payment.register'].with_context(
+            active_model='account.move', active_ids=invoice.ids,
+        ).create({
+            'amount': amount,
+            'payment_date': payment_date,
+            'journal_id': self.bank_journal.id,
+        })._create_payments()
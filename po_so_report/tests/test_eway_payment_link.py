@@ -0,0 +1,40 @@
+from datetime import date
+
+from odoo.tests import tagged
+
+from .common import PoSoReportTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestEwayPaymentLink(PoSoReportTestCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.invoice = cls.init_invoice('out_invoice', partner=cls.partner_a, invoice_date='2024-01-10',
+                                       amounts=[1000.0], post=True)
+        cls.company = cls.env.company
+
+    def _get_links(self):
+        return self.env['eway.payment.link'].search([('invoice_id', '=', self.invoice.id)])
+
+    def test_links_follow_reconciliation(self):
+        payment = self._register_payment(self.invoice, 400.0, '2024-02-01')
+        self.assertRecordValues(self._get_links(), [{
+            'payment_id': payment.id,
+            'company_id': self.company.id,
+            'payment_date': date(2024, 2, 1),
+            'amount': 400.0,
+        }])
+
+        self.invoice.line_ids.remove_move_reconcile()
+        self.assertFalse(self._get_links())
+
+    def test_payment_days(self):
+        EwayReport = self.env['eway.report']
+        self.assertFalse(EwayReport._has_payments(self.company, date(2024, 1, 1), date(2024, 12, 31)))
+        self._register_payment(self.invoice, 400.0, '2024-02-01')
+        self._register_payment(self.invoice, 100.0, '2024-03-01')
+        days = self.env['eway.report.day']._get_payment_days(self.company, date(2024, 1, 1), date(2024, 12, 31))
+        self.assertEqual(days, [date(2024, 3, 1), date(2024, 2, 1)])
+        self.assertTrue(EwayReport._has_payments(self.company, date(2024, 1, 1), date(2024, 12, 31)))
@@ -0,0 +1,60 @@
+from datetime import date
+
+from odoo.tests import tagged
+
+from .common import PoSoReportTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestEwayReportDay(PoSoReportTestCommon):
+    """The EWAY rows cached per payment day are dropped whenever a change
+    could alter them."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.invoice = cls.init_invoice('out_invoice', partner=cls.partner_a, invoice_date='2024-01-10',
+                                       amounts=[1000.0], post=True)
+        cls.company = cls.env.company
+
+    def setUp(self):
+        super().setUp()
+        if 'eway.operation' not in self.env:
+            self.skipTest("The module providing eway.operation is not installed")
+
+    def _get_cached_days(self):
+        return self.env['eway.report.day'].search([('company_id', '=', self.company.id)])
+
+    def _fill_day_cache(self):
+        Days = self.env['eway.report.day']
+        days = Days._get_payment_days(self.company, date(2024, 1, 1), date(2024, 12, 31))
+        list(Days._iter_rows(self.company, days))
+        return days
+
+    def test_day_cache_dropped_by_payment(self):
+        self._register_payment(self.invoice, 400.0, '2024-02-01')
+        self.assertEqual(self._fill_day_cache(), [date(2024, 2, 1)])
+        self.assertEqual(self._get_cached_days().mapped('day'), [date(2024, 2, 1)])
+
+        # the residual shown on the day of the first payment changes
+        self._register_payment(self.invoice, 100.0, '2024-03-01')
+        self.assertFalse(self._get_cached_days())
+
+    def test_day_cache_dropped_by_credit_note(self):
+        self._register_payment(self.invoice, 400.0, '2024-02-01')
+        self._fill_day_cache()
+        self.assertTrue(self._get_cached_days())
+
+        refund = self.init_invoice('out_refund', partner=self.partner_a, invoice_date='2024-02-10',
+                                   amounts=[100.0], post=True)
+        (self.invoice | refund).line_ids.filtered(
+            lambda line: line.account_id.account_type == 'asset_receivable').reconcile()
+        self.assertFalse(self._get_cached_days())
+
+    def test_day_cache_dropped_by_invoice_change(self):
+        self._register_payment(self.invoice, 400.0, '2024-02-01')
+        self._fill_day_cache()
+        self.assertTrue(self._get_cached_days())
+
+        self.invoice.invoice_origin = 'EWAY TEST ORIGIN'
+        self.assertFalse(self._get_cached_days())
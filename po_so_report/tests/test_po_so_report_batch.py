@@ -0,0 +1,156 @@
+from odoo import Command
+from odoo.tests import tagged
+
+from .common import PoSoReportTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestPoSoReportBatch(PoSoReportTestCommon):
+    """The rows of several projects computed at once are the ones of each
+    project computed on its own, with the same names and amounts."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        company_partner = cls.env['res.partner'].create({'name': 'Batch Company', 'is_company': True})
+        cls.contact = cls.env['res.partner'].create({'name': 'Batch Contact', 'parent_id': company_partner.id})
+        cls.product = cls.env['product.product'].create({
+            'name': 'Batch Product',
+            'default_code': 'BATCH',
+            'list_price': 1000.0,
+            'standard_price': 800.0,
+        })
+
+        plan = cls.env['account.analytic.plan'].create({'name': 'Batch Plan'})
+        cls.account_1, cls.account_2 = cls.env['account.analytic.account'].create([
+            {'name': 'Batch Account 1', 'plan_id': plan.id},
+            {'name': 'Batch Account 2', 'plan_id': plan.id},
+        ])
+        cls.project_1, cls.project_2, cls.project_empty = cls.env['project.project'].create([
+            {'name': 'Batch Project 1', 'account_id': cls.account_1.id},
+            {'name': 'Batch Project 2', 'account_id': cls.account_2.id},
+            {'name': 'Batch Project Empty'},
+        ])
+        cls.projects = cls.project_1 | cls.project_2 | cls.project_empty
+
+    def _create_sale_order(self, partner, project):
+        order = self.env['sale.order'].create({
+            'partner_id': partner.id,
+            'project_id': project.id,
+            'order_line': [Command.create({'product_id': self.product.id, 'product_uom_qty': 1})],
+        })
+        order.action_confirm()
+        return order
+
+    def _post_invoice(self, move_type, partner, invoice_date, origin):
+        invoice = self.init_invoice(move_type, partner=partner, invoice_date=invoice_date, products=self.product)
+        invoice.invoice_origin = origin
+        invoice.action_post()
+        return invoice
+
+    def _create_memo_payment(self, invoice, amount, date, validate=True):
+        payment = self.env['account.payment'].create({
+            'payment_type': 'inbound',
+            'partner_type': 'customer',
+            'partner_id': invoice.partner_id.id,
+            'amount': amount,
+            'date': date,
+            'memo': invoice.name,
+            'journal_id': self.bank_journal.id,
+        })
+        payment.action_post()
+        if validate:
+            payment.action_validate()
+        return payment
+
+    def _assert_batch_equivalent(self, process):
+        rows = process(self.projects)
+        per_project = [row for project in self.projects for row in process(project)]
+        self.assertEqual(rows, per_project)
+        return rows
+
+    def test_names_not_display_names(self):
+        # the fixture only tells names and display names apart if they differ
+        self.assertNotEqual(self.contact.display_name, self.contact.name)
+        self.assertNotEqual(self.product.display_name, self.product.name)
+
+    def test_sale_orders(self):
+        order_1 = self._create_sale_order(self.contact, self.project_1)
+        order_2 = self._create_sale_order(self.partner_b, self.project_2)
+        invoice_1 = self._post_invoice('out_invoice', self.contact, '2024-01-10', order_1.name)
+        invoice_2 = self._post_invoice('out_invoice', self.contact, '2024-02-10', order_1.name)
+        invoice_3 = self._post_invoice('out_invoice', self.partner_b, '2024-01-05', order_2.name)
+        # partial payments found by the invoice reference, listed by date
+        payment_late = self._create_memo_payment(invoice_1, 400.0, '2024-01-20')
+        payment_early = self._create_memo_payment(invoice_1, 100.0, '2024-01-15')
+        # not paid yet: not reported
+        self._create_memo_payment(invoice_3, 50.0, '2024-01-06', validate=False)
+
+        report = self.env['report.po_so_report.report_sale_order_template']
+        rows = self._assert_batch_equivalent(report._process_sale_orders_batch)
+
+        self.assertEqual([row['project_id'] for row in rows], self.projects.ids)
+        row_1, row_2, row_empty = rows
+        invoice_total = invoice_1.amount_total + invoice_2.amount_total
+        self.assertDictEqual(row_1, {
+            'vendor_name': 'Batch Contact',
+            'project_id': self.project_1.id,
+            'project_name': 'Batch Project 1',
+            'so_po_number': order_1.name,
+            'so_po_total': order_1.amount_total,
+            'invoices': [
+                {'name': invoice_1.name, 'amount': invoice_1.amount_total, 'date': invoice_1.invoice_date},
+                {'name': invoice_2.name, 'amount': invoice_2.amount_total, 'date': invoice_2.invoice_date},
+            ],
+            'invoice_total': invoice_total,
+            'invoice_items': 'Batch Product',
+            'diff_so_invoice': order_1.amount_total - invoice_total,
+            'payments': [
+                {'date': payment_early.date, 'amount': 100.0, 'name': payment_early.name},
+                {'date': payment_late.date, 'amount': 400.0, 'name': payment_late.name},
+            ],
+            'payment_total': 500.0,
+            'diff_invoice_payment': invoice_total - 500.0,
+        })
+        self.assertEqual(row_2['vendor_name'], self.partner_b.name)
+        self.assertEqual(row_2['payments'], [])
+        self.assertEqual(row_2['invoice_total'], invoice_3.amount_total)
+        self.assertEqual(
+            (row_empty['project_id'], row_empty['so_po_number'], row_empty['invoices']),
+            (self.project_empty.id, '', []))
+
+    def test_purchase_orders(self):
+        # one order split across two projects: its bills show in both
+        shared_order = self.env['purchase.order'].create({
+            'partner_id': self.contact.id,
+            'order_line': [
+                Command.create({
+                    'product_id': self.product.id, 'product_qty': 1, 'price_unit': 800.0,
+                    'analytic_distribution': {str(self.account_1.id): 100},
+                }),
+                Command.create({
+                    'product_id': self.product.id, 'product_qty': 1, 'price_unit': 200.0,
+                    'analytic_distribution': {str(self.account_2.id): 100},
+                }),
+            ],
+        })
+        shared_order.button_confirm()
+        bill = self._post_invoice('in_invoice', self.contact, '2024-01-10', shared_order.name)
+        payment = self._register_payment(bill, 300.0, '2024-01-20')
+
+        report = self.env['report.po_so_report.report_purchase_order_template']
+        rows = self._assert_batch_equivalent(report._process_purchase_orders_batch)
+
+        self.assertEqual([row['project_id'] for row in rows], [self.project_1.id, self.project_2.id])
+        for row, project in zip(rows, self.project_1 | self.project_2):
+            self.assertDictEqual(row, {
+                'vendor_name': 'Batch Contact',
+                'project_id': project.id,
+                'project_name': project.name,
+                'so_po_number': shared_order.name,
+                'quote': shared_order.amount_total,
+                'invoices': [{'name': bill.name, 'amount': bill.amount_total, 'date': bill.invoice_date}],
+                'total_invoice': bill.amount_total,
+                'payments': [{'name': payment.move_id.name, 'amount': 300.0, 'date': payment.move_id.date}],
+                'total_payment': 300.0,
+            })
@@ -0,0 +1,105 @@
+from unittest.mock import patch
+
+from odoo import Command
+from odoo.tests import new_test_user, tagged
+
+from ..models.po_so_report_summary import REPORT_CACHE, REPORT_CACHE_SIZE
+from .common import PoSoReportTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestPoSoReportCache(PoSoReportTestCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # shared between companies, so that every company scope can read it
+        cls.project = cls.env['project.project'].create({'name': 'Cache Project', 'company_id': False})
+        cls.order = cls.env['sale.order'].create({
+            'partner_id': cls.partner_a.id,
+            'project_id': cls.project.id,
+            'order_line': [Command.create({
+                'product_id': cls.product_a.id,
+                'product_uom_qty': 1,
+                'price_unit': 1000.0,
+            })],
+        })
+        cls.order.action_confirm()
+        cls.other_user = new_test_user(
+            cls.env, login='po_so_cache_user',
+            groups='base.group_user,sales_team.group_sale_salesman_all_leads,'
+                   'account.group_account_invoice,project.group_project_manager')
+
+    def setUp(self):
+        super().setUp()
+        # the process cache outlives the rolled back test transactions
+        REPORT_CACHE.clear()
+        Summary = self.env['po.so.report.summary']
+        self.computed = []
+        get_fresh_summaries = type(Summary)._get_fresh_summaries
+
+        def fresh_summaries(model, report_type, projects):
+            self.computed.append((model.env.uid, model._get_company_scope()))
+            return get_fresh_summaries(model, report_type, projects)
+
+        patcher = patch.object(type(Summary), '_get_fresh_summaries', autospec=True, side_effect=fresh_summaries)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _get_rows(self, Summary=None):
+        Summary = Summary or self.env['po.so.report.summary']
+        return Summary._get_report_rows('sale', self.project.with_env(Summary.env))
+
+    def _cache_key(self, Summary=None):
+        Summary = Summary or self.env['po.so.report.summary']
+        return (Summary.env.cr.dbname, Summary.env.uid, Summary._get_company_scope(), 'sale', tuple(self.project.ids))
+
+    def test_cache_hit(self):
+        rows = self._get_rows()
+        self.assertEqual(self._get_rows(), rows)
+        self.assertEqual(len(self.computed), 1, "the second read is served from the cache")
+
+        # a dirty summary is never served from the cache
+        self.order.order_line.price_unit = 2000.0
+        self.assertEqual(self._get_rows()[0]['so_po_total'], self.order.amount_total)
+        self.assertEqual(len(self.computed), 2)
+
+    def test_cache_eviction(self):
+        rows = self._get_rows()
+        key = self._cache_key()
+        self.assertIn(key, REPORT_CACHE)
+        for index in range(REPORT_CACHE_SIZE):
+            REPORT_CACHE[('other_db', index)] = (None, [])
+        self.assertEqual(len(REPORT_CACHE), REPORT_CACHE_SIZE)
+        self.assertNotIn(key, REPORT_CACHE, "the least recently used entry is evicted")
+
+        self.assertEqual(self._get_rows(), rows)
+        self.assertEqual(len(self.computed), 2)
+        self.assertIn(key, REPORT_CACHE)
+
+    def test_cache_not_shared_between_users(self):
+        admin_rows = self._get_rows()
+        Summary = self.env['po.so.report.summary'].with_user(self.other_user)
+        self.assertEqual(self._get_rows(Summary), admin_rows)
+        self.assertEqual(self.computed, [
+            (self.env.uid, self.env['po.so.report.summary']._get_company_scope()),
+            (self.other_user.id, Summary._get_company_scope()),
+        ])
+        self.assertNotEqual(self._cache_key(Summary), self._cache_key())
+        self.assertIn(self._cache_key(Summary), REPORT_CACHE)
+
+    def test_cache_not_shared_between_company_scopes(self):
+        other_company = self.env['res.company'].create({'name': 'Cache Other Company'})
+        self.env.user.company_ids |= other_company
+        Summary = self.env['po.so.report.summary']
+        scope_main = Summary.with_context(allowed_company_ids=[self.env.company.id])
+        scope_other = Summary.with_context(allowed_company_ids=[other_company.id])
+
+        self.assertEqual([row['so_po_number'] for row in self._get_rows(scope_main)], [self.order.name])
+        # the order of the main company is out of the other company's scope
+        self.assertEqual([row['so_po_number'] for row in self._get_rows(scope_other)], [''])
+        self.assertEqual([row['so_po_number'] for row in self._get_rows(scope_main)], [self.order.name])
+        self.assertEqual(self.computed, [
+            (self.env.uid, str(self.env.company.id)),
+            (self.env.uid, str(other_company.id)),
+        ])
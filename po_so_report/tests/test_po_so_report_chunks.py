@@ -0,0 +1,68 @@
+from io import BytesIO
+
+from odoo import Command
+from odoo.tests import tagged
+from odoo.tools.pdf import PdfFileReader
+
+from ..models.po_so_report_job import REPORT_ACTIONS
+from .common import PoSoReportTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestPoSoReportChunks(PoSoReportTestCommon):
+    """Large reports are rendered one group of projects at a time and the
+    PDFs merged, the title only opening the first one."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.projects = cls.env['project.project'].create([
+            {'name': 'Chunk Project %s' % index} for index in range(1, 4)
+        ])
+        cls.orders = cls.env['sale.order'].create([{
+            'partner_id': cls.partner_a.id,
+            'project_id': project.id,
+            'order_line': [Command.create({
+                'product_id': cls.product_a.id,
+                'product_uom_qty': 1,
+                'price_unit': 1000.0,
+            })],
+        } for project in cls.projects])
+        cls.orders.action_confirm()
+        # one project, and so one row, per chunk
+        cls.env['ir.config_parameter'].sudo().set_param('po_so_report.pdf_chunk_rows', 1)
+
+    def test_chunks(self):
+        chunks, columns = self.env['ir.actions.report']._get_po_so_report_chunks(
+            'sale', None, {'project_ids': self.projects.ids})
+        self.assertEqual(chunks, [[project.id] for project in self.projects])
+        self.assertEqual(columns, {'max_invoices': 0, 'max_payments': 0})
+
+    def test_title_in_first_chunk_only(self):
+        Report = self.env['ir.actions.report']
+        for index, project in enumerate(self.projects):
+            html = Report._render_qweb_html(REPORT_ACTIONS['sale'], data={
+                'project_ids': project.ids, 'chunk_index': index, 'max_invoices': 0, 'max_payments': 0,
+            })[0]
+            self.assertIn(self.orders[index].name.encode(), html)
+            self.assertEqual(b'Sale Order Report' in html, index == 0)
+
+    def test_merged_pdf(self):
+        Report = self.env['ir.actions.report']
+        if Report.get_wkhtmltopdf_state() != 'ok':
+            self.skipTest("wkhtmltopdf is not available")
+        content, extension = Report.with_context(force_report_rendering=True)._render_qweb_pdf(
+            REPORT_ACTIONS['sale'], data={'project_ids': self.projects.ids})
+        self.assertEqual(extension, 'pdf')
+
+        pages = [page.extract_text() for page in PdfFileReader(BytesIO(content)).pages]
+        self.assertGreaterEqual(len(pages), len(self.projects))
+        text = ''.join(pages)
+        self.assertEqual(text.count('Sale Order Report'), 1)
+        # every row is there, in the order of the projects
+        first_pages = [
+            next(index for index, page in enumerate(pages) if order.name in page)
+            for order in self.orders
+        ]
+        self.assertEqual(first_pages, sorted(set(first_pages)))
+        self.assertIn('Sale Order Report', pages[0])
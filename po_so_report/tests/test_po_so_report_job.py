@@ -0,0 +1,69 @@
+from unittest.mock import patch
+
+from odoo import Command
+from odoo.tests import new_test_user, tagged
+
+from ..models.po_so_report_job import REPORT_ACTIONS
+from ..models.po_so_report_summary import REPORT_CACHE
+from .common import PoSoReportTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestPoSoReportJob(PoSoReportTestCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.main_company = cls.env.company
+        cls.other_company = cls.env['res.company'].create({'name': 'Job Other Company'})
+        # the user's default company is not the one they print the report in
+        cls.user = new_test_user(
+            cls.env, login='po_so_job_user',
+            groups='base.group_user,sales_team.group_sale_salesman_all_leads,'
+                   'account.group_account_invoice,project.group_project_manager',
+            company_id=cls.other_company.id,
+            company_ids=[Command.set((cls.main_company | cls.other_company).ids)])
+        cls.project = cls.env['project.project'].create({'name': 'Job Project', 'company_id': False})
+        cls.order = cls.env['sale.order'].create({
+            'partner_id': cls.partner_a.id,
+            'project_id': cls.project.id,
+            'order_line': [Command.create({
+                'product_id': cls.product_a.id,
+                'product_uom_qty': 1,
+                'price_unit': 1000.0,
+            })],
+        })
+        cls.order.action_confirm()
+
+    def setUp(self):
+        super().setUp()
+        REPORT_CACHE.clear()
+
+    def test_job_renders_with_queued_companies(self):
+        Job = self.env['po.so.report.job'].with_user(self.user).with_context(
+            allowed_company_ids=[self.main_company.id])
+        job = Job._enqueue('sale', self.project)
+        self.assertEqual(job.company_id, self.main_company)
+        self.assertEqual(job.company_ids, self.main_company)
+
+        # the cron commits the progress of its jobs
+        with patch.object(self.env.cr, 'commit'):
+            self.assertEqual(self.env['po.so.report.job']._claim_next(), job)
+            self.env['po.so.report.job']._cron_process_jobs()
+
+        self.assertEqual(job.state, 'done', job.error_message)
+        self.assertEqual(job.progress_done, 1)
+        direct = self.env['ir.actions.report'].with_user(self.user).with_context(
+            allowed_company_ids=[self.main_company.id],
+        )._render_qweb_pdf(REPORT_ACTIONS['sale'], data={'project_ids': self.project.ids})[0]
+        self.assertEqual(job.attachment_id.raw, direct)
+        # rendered in the main company, which holds the order, not in the
+        # user's default company
+        self.assertIn(self.order.name.encode(), direct)
+
+    def test_job_falls_back_to_default_company(self):
+        job = self.env['po.so.report.job'].with_user(self.user).with_context(
+            allowed_company_ids=[self.main_company.id])._enqueue('sale', self.project)
+        # the user lost access to the company the report was queued in
+        self.user.company_ids = self.other_company
+        self.assertEqual(job._get_user_env().companies, self.other_company)
@@ -0,0 +1,150 @@
+from odoo import Command
+from odoo.tests import tagged
+
+from ..models.po_so_report_summary import REPORT_CACHE
+from .common import PoSoReportTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestPoSoReportSummary(PoSoReportTestCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        plan = cls.env['account.analytic.plan'].create({'name': 'Summary Plan'})
+        cls.analytic_account = cls.env['account.analytic.account'].create({
+            'name': 'Summary Account', 'plan_id': plan.id,
+        })
+        cls.project = cls.env['project.project'].create({
+            'name': 'Summary Project', 'account_id': cls.analytic_account.id,
+        })
+        cls.order = cls.env['sale.order'].create({
+            'partner_id': cls.partner_a.id,
+            'project_id': cls.project.id,
+            'order_line': [Command.create({
+                'product_id': cls.product_a.id,
+                'product_uom_qty': 1,
+                'price_unit': 1000.0,
+            })],
+        })
+        cls.order.action_confirm()
+
+    def setUp(self):
+        super().setUp()
+        # the process cache outlives the rolled back test transactions
+        REPORT_CACHE.clear()
+
+    def _get_rows(self, Summary=None, report_type='sale'):
+        Summary = Summary or self.env['po.so.report.summary']
+        return Summary._get_report_rows(report_type, self.project.with_env(Summary.env))
+
+    def _get_summary(self, report_type='sale'):
+        return self.env['po.so.report.summary'].search([
+            ('project_id', '=', self.project.id),
+            ('report_type', '=', report_type),
+            ('user_id', '=', self.env.uid),
+        ])
+
+    def _post_invoice(self, amount=None):
+        if amount is None:
+            invoice = self.init_invoice('out_invoice', partner=self.partner_a, invoice_date='2024-01-10',
+                                        products=self.product_a)
+        else:
+            invoice = self.init_invoice('out_invoice', partner=self.partner_a, invoice_date='2024-01-10',
+                                        amounts=[amount])
+        invoice.invoice_origin = self.order.name
+        invoice.action_post()
+        return invoice
+
+    def test_rows_stored_in_summary(self):
+        rows = self._get_rows()
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['so_po_number'], self.order.name)
+        self.assertEqual(rows[0]['so_po_total'], self.order.amount_total)
+        self.assertEqual(rows[0]['invoices'], [])
+
+        summary = self._get_summary()
+        self.assertEqual(len(summary), 1)
+        self.assertFalse(summary.is_dirty)
+        self.assertEqual(summary.company_scope, self.env['po.so.report.summary']._get_company_scope())
+        self.assertEqual(len(summary.line_ids), 1)
+
+    def test_invoice_marks_summary_dirty(self):
+        self._get_rows()
+        invoice = self._post_invoice(500.0)
+        self.assertTrue(self._get_summary().is_dirty)
+
+        rows = self._get_rows()
+        self.assertEqual([entry['name'] for entry in rows[0]['invoices']], [invoice.name])
+        self.assertEqual(rows[0]['invoice_total'], invoice.amount_total)
+        self.assertFalse(self._get_summary().is_dirty)
+
+    def test_cached_rows_follow_order_changes(self):
+        self.assertEqual(self._get_rows()[0]['so_po_total'], self.order.amount_total)
+        # served from the process cache while nothing changed
+        self.assertEqual(self._get_rows(), self._get_rows())
+
+        self.order.order_line.price_unit = 2000.0
+        self.assertTrue(self._get_summary().is_dirty)
+        self.assertEqual(self._get_rows()[0]['so_po_total'], self.order.amount_total)
+
+    def test_payment_marks_summary_dirty(self):
+        invoice = self._post_invoice(500.0)
+        self._get_rows()
+        self._register_payment(invoice, 200.0, '2024-02-01')
+        self.assertTrue(self._get_summary().is_dirty)
+
+    def test_summaries_per_company_scope(self):
+        other_company = self.env['res.company'].create({'name': 'Summary Other Company'})
+        self.env.user.company_ids |= other_company
+        company_ids = sorted([self.env.company.id, other_company.id])
+        Summary = self.env['po.so.report.summary']
+        self._get_rows(Summary.with_context(allowed_company_ids=company_ids[:1]))
+        self._get_rows(Summary.with_context(allowed_company_ids=company_ids))
+
+        summaries = self._get_summary()
+        self.assertEqual(set(summaries.mapped('company_scope')), {
+            str(company_ids[0]),
+            '%s,%s' % tuple(company_ids),
+        })
+
+        # a change flags the summaries of every scope
+        self.order.order_line.price_unit = 2000.0
+        self.assertTrue(all(summaries.mapped('is_dirty')))
+
+    def test_purchase_order_create_and_unlink(self):
+        self.assertEqual(self._get_rows(report_type='purchase'), [])
+        order = self.env['purchase.order'].create({
+            'partner_id': self.partner_a.id,
+            'order_line': [Command.create({
+                'product_id': self.product_a.id,
+                'product_qty': 1,
+                'price_unit': 500.0,
+                'analytic_distribution': {str(self.analytic_account.id): 100},
+            })],
+        })
+        self.assertTrue(self._get_summary('purchase').is_dirty)
+        self.assertEqual([row['so_po_number'] for row in self._get_rows(report_type='purchase')], [order.name])
+
+        # the lines go with the order through the SQL cascade
+        order.unlink()
+        self.assertTrue(self._get_summary('purchase').is_dirty)
+        self.assertEqual(self._get_rows(report_type='purchase'), [])
+
+    def test_partner_rename_marks_summary_dirty(self):
+        self.assertEqual(self._get_rows()[0]['vendor_name'], self.partner_a.name)
+        self.partner_b.name = 'Summary Other Partner'
+        self.assertFalse(self._get_summary().is_dirty)
+
+        self.partner_a.name = 'Summary Renamed Partner'
+        self.assertTrue(self._get_summary().is_dirty)
+        self.assertEqual(self._get_rows()[0]['vendor_name'], 'Summary Renamed Partner')
+
+    def test_product_rename_marks_summary_dirty(self):
+        self._post_invoice()
+        self.assertEqual(self._get_rows()[0]['invoice_items'], self.product_a.name)
+
+        # renaming the variant renames its template
+        self.product_a.name = 'Summary Renamed Product'
+        self.assertTrue(self._get_summary().is_dirty)
+        self.assertEqual(self._get_rows()[0]['invoice_items'], 'Summary Renamed Product')
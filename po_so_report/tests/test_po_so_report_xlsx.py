@@ -0,0 +1,134 @@
+from openpyxl import load_workbook
+
+from odoo import Command
+from odoo.tests import tagged
+
+from .common import PoSoReportTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestPoSoReportXlsx(PoSoReportTestCommon):
+    """The sale and purchase XLSX exports are streamed from the summary
+    lines to a spooled file, with one totals row closing each project."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        plan = cls.env['account.analytic.plan'].create({'name': 'XLSX Plan'})
+        cls.account_1, cls.account_2 = cls.env['account.analytic.account'].create([
+            {'name': 'XLSX Account 1', 'plan_id': plan.id},
+            {'name': 'XLSX Account 2', 'plan_id': plan.id},
+        ])
+        cls.project_1, cls.project_2 = cls.env['project.project'].create([
+            {'name': 'XLSX Project 1', 'account_id': cls.account_1.id},
+            {'name': 'XLSX Project 2', 'account_id': cls.account_2.id},
+        ])
+
+    def _export(self, report_type):
+        wizard = self.env['po.so.wizard'].create({
+            'report_type': report_type,
+            'project_ids': [Command.set((self.project_1 | self.project_2).ids)],
+        })
+        spool, filename = wizard._render_xlsx()
+        # a rewound temporary file, not the workbook content
+        self.assertFalse(isinstance(spool, bytes))
+        self.assertEqual(spool.tell(), 0)
+        with spool:
+            workbook = load_workbook(spool, read_only=True)
+            rows = [list(row) for row in workbook.active.iter_rows(values_only=True)]
+            workbook.close()
+        return filename, rows
+
+    def _create_sale_order(self, project, price_unit):
+        order = self.env['sale.order'].create({
+            'partner_id': self.partner_a.id,
+            'project_id': project.id,
+            'order_line': [Command.create({
+                'product_id': self.product_a.id,
+                'product_uom_qty': 1,
+                'price_unit': price_unit,
+            })],
+        })
+        order.action_confirm()
+        return order
+
+    def test_sale_export(self):
+        order_1 = self._create_sale_order(self.project_1, 1000.0)
+        order_2 = self._create_sale_order(self.project_1, 500.0)
+        order_3 = self._create_sale_order(self.project_2, 200.0)
+        invoice = self.init_invoice('out_invoice', partner=self.partner_a, invoice_date='2024-01-10',
+                                    amounts=[400.0])
+        invoice.invoice_origin = order_1.name
+        invoice.action_post()
+        payment = self.env['account.payment'].create({
+            'payment_type': 'inbound',
+            'partner_type': 'customer',
+            'partner_id': self.partner_a.id,
+            'amount': 100.0,
+            'date': '2024-01-15',
+            'memo': invoice.name,
+            'journal_id': self.bank_journal.id,
+        })
+        payment.action_post()
+        payment.action_validate()
+
+        filename, rows = self._export('sale')
+        self.assertEqual(filename, 'Sale_Order_Report.xlsx')
+        header, *lines = rows
+        self.assertEqual(header, [
+            'Project', 'Sr. No', 'SO', 'Customer/Vendor Name', 'SO/PO Total', 'Invoice Total',
+            'Invoice Items', 'Diff (SO/PO - Invoice)', 'Payment 1', 'Total Payment', 'Diff (Invoice - Payment)',
+        ])
+        total_1 = order_1.amount_total + order_2.amount_total
+        invoice_total = invoice.amount_total
+        self.assertEqual([line[:3] for line in lines], [
+            ['XLSX Project 1', 1, order_1.name],
+            ['XLSX Project 1', 2, order_2.name],
+            ['XLSX Project 1', 'Total', None],
+            ['XLSX Project 2', 1, order_3.name],
+            ['XLSX Project 2', 'Total', None],
+        ])
+        self.assertEqual(lines[0][4:6], [order_1.amount_total, invoice_total])
+        self.assertEqual(lines[0][8:], [100.0, 100.0, invoice_total - 100.0])
+        self.assertEqual(lines[1][8], None, "no payment: empty column")
+        self.assertEqual(lines[2][4:], [
+            total_1, invoice_total, None, total_1 - invoice_total, None, 100.0, invoice_total - 100.0,
+        ])
+        self.assertEqual(lines[4][4], order_3.amount_total)
+
+    def test_purchase_export(self):
+        order = self.env['purchase.order'].create({
+            'partner_id': self.partner_a.id,
+            'order_line': [
+                Command.create({
+                    'product_id': self.product_a.id, 'product_qty': 1, 'price_unit': 800.0,
+                    'analytic_distribution': {str(self.account_1.id): 100},
+                }),
+            ],
+        })
+        order.button_confirm()
+        bill = self.init_invoice('in_invoice', partner=self.partner_a, invoice_date='2024-01-10',
+                                 products=self.product_a)
+        bill.invoice_origin = order.name
+        bill.action_post()
+        self._register_payment(bill, 300.0, '2024-01-20')
+
+        filename, rows = self._export('purchase')
+        self.assertEqual(filename, 'Purchase_Order_Report.xlsx')
+        header, *lines = rows
+        self.assertEqual(header, [
+            'Project', 'Sr', 'PO', 'Customer / Vendor', 'Quote', 'Invoice 1', 'Invoice 1 Date',
+            'Total Invoice', 'Payment 1', 'Payment 1 Date', 'Total Payment', 'Amount',
+        ])
+        quote = order.amount_total
+        # the project without purchase orders has no rows
+        self.assertEqual(len(lines), 2)
+        row, total = lines
+        self.assertEqual(row[:6], ['XLSX Project 1', 1, order.name, self.partner_a.name, quote, bill.amount_total])
+        self.assertEqual(row[6].date(), bill.invoice_date)
+        self.assertEqual(row[7:9], [bill.amount_total, 300.0])
+        self.assertEqual(row[10:], [300.0, quote - 300.0])
+        self.assertEqual(total, [
+            'XLSX Project 1', 'Total', None, None, quote, None, None, bill.amount_total,
+            None, None, 300.0, quote - 300.0,
+        ])
@@ -0,0 +1,141 @@
+"""Process pool computing the report rows of project chunks, or the EWAY
+export rows of companies, in parallel.
+
+Workers are spawned, not forked: a forked child would share the parent's
+database connections. Each worker loads the registry once and, for every
+chunk, opens its own cursor on the snapshot exported by the requesting
+transaction, so all chunks see exactly the data the parent sees.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from odoo.tools import config
+
+_logger = logging.getLogger(__name__)
+
+# Server options a worker needs to reach the database and the addons
+CONFIG_KEYS = (
+    'addons_path', 'data_dir',
+    'db_host', 'db_port', 'db_user', 'db_password', 'db_sslmode',
+)
+
+# A spawned interpreter cannot import this module before ``odoo.addons``
+# covers the addons path, so the bootstrap is handed over as source
+WORKER_BOOTSTRAP = """
+from odoo.tools import config
+from odoo.modules.module import initialize_sys_path
+for key, value in %r.items():
+    config[key] = value
+initialize_sys_path()
+"""
+
+# Upper bound of the worker processes, whatever ``po_so_report.parallel_workers``
+# asks for: each one holds a database connection and a loaded registry
+MAX_WORKERS = 4
+
+# Seconds the pool stays up after its last use before its worker processes
+# are stopped
+POOL_IDLE_TIMEOUT = 300
+
+_pool_lock = threading.Lock()
+_pool = None
+_pool_size = 0
+# Computations using the pool, and the timer stopping it once idle
+_pool_users = 0
+_idle_timer = None
+
+
+def configured_workers(env):
+    """Worker processes allowed by the ``po_so_report.parallel_workers``
+    system parameter: none unless it is set (the pool is opt-in), at most
+    ``MAX_WORKERS``"""
+    workers = int(env['ir.config_parameter'].sudo().get_param('po_so_report.parallel_workers', 0))
+    return max(0, min(workers, MAX_WORKERS))
+
+
+@contextmanager
+def use_pool(workers):
+    """Context manager yielding the process pool of this server process,
+    (re)created with ``workers`` processes when needed; the pool is shut
+    down once unused for ``POOL_IDLE_TIMEOUT`` seconds"""
+    global _pool, _pool_size, _pool_users, _idle_timer
+    with _pool_lock:
+        if _idle_timer is not None:
+            _idle_timer.cancel()
+            _idle_timer = None
+        # a pool in use by another computation is shared rather than resized
+        if _pool is None or (_pool_size != workers and not _pool_users):
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            options = {key: config[key] for key in CONFIG_KEYS}
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=exec,
+                initargs=(WORKER_BOOTSTRAP % (options,), {}),
+            )
+            _pool_size = workers
+        _pool_users += 1
+        pool = _pool
+    try:
+        yield pool
+    finally:
+        with _pool_lock:
+            _pool_users -= 1
+            if not _pool_users and _pool is not None:
+                _idle_timer = threading.Timer(POOL_IDLE_TIMEOUT, _shutdown_idle_pool)
+                _idle_timer.daemon = True
+                _idle_timer.start()
+
+
+def _shutdown_idle_pool():
+    global _pool, _pool_size, _idle_timer
+    with _pool_lock:
+        if _pool_users or _pool is None:
+            return
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool, _pool_size, _idle_timer = None, 0, None
+        _logger.debug("Stopped the idle report worker pool")
+
+
+def discard_pool():
+    """Drop the pool, e.g. after a worker died; the next use spawns a new one"""
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool, _pool_size = None, 0
+
+
+def compute_rows_chunk(dbname, snapshot, uid, context, report_type, project_ids):
+    """Worker side: {project_id: [row]} of ``project_ids``, read in the
+    exported ``snapshot`` of the requesting transaction"""
+    from odoo import api
+    from odoo.modules.registry import Registry
+
+    registry = Registry(dbname)
+    with registry.cursor() as cr:
+        cr.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+        cr.execute("SET TRANSACTION SNAPSHOT %s", [snapshot])
+        env = api.Environment(cr, uid, context)
+        projects = env['project.project'].browse(project_ids)
+        return env['po.so.report.summary']._compute_rows_serial(report_type, projects)
+
+
+def compute_eway_days(dbname, snapshot, uid, context, company_id, days):
+    """Worker side: {day: rows} of the EWAY export of ``company_id`` on
+    ``days``, read in the exported ``snapshot``; the requesting transaction
+    stores them, this one being read only"""
+    from odoo import api
+    from odoo.modules.registry import Registry
+
+    registry = Registry(dbname)
+    with registry.cursor() as cr:
+        cr.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+        cr.execute("SET TRANSACTION SNAPSHOT %s", [snapshot])
+        env = api.Environment(cr, uid, context, su=True)
+        company = env['res.company'].browse(company_id)
+        return env['eway.report.day'].with_company(company)._compute_days(company, days, store=False)
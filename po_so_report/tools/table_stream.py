@@ -0,0 +1,92 @@
+"""CSV and Parquet files fed row by row.
+
+Like ``xlsx_stream``, the rows are written to a temporary file as they are
+produced and the file is returned rewound: memory stays bounded by one
+row (CSV) or one record batch (Parquet), whatever the number of rows.
+"""
+import csv
+import io
+import tempfile
+from datetime import datetime
+from functools import lru_cache
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+CSV_MIMETYPE = 'text/csv'
+PARQUET_MIMETYPE = 'application/vnd.apache.parquet'
+
+# Rows converted and written per Parquet record batch (and row group)
+PARQUET_BATCH_ROWS = 50000
+
+# Dates are formatted this way in the rows, empty when unset
+DATE_FORMAT = '%m/%d/%Y'
+
+
+@lru_cache(maxsize=4096)
+def parse_date(value):
+    return datetime.strptime(value, DATE_FORMAT).date() if value else None
+
+
+def parse_float(value):
+    return float(value) if value not in (None, '') else None
+
+
+def parse_string(value):
+    return '' if value is None else str(value)
+
+
+# Column type -> (pyarrow type factory, value parser)
+COLUMN_TYPES = {
+    'date': ('date32', parse_date),
+    'float': ('float64', parse_float),
+    'string': ('string', parse_string),
+}
+
+
+def spool_csv(header, rows):
+    """Write ``header`` and ``rows`` as UTF-8 CSV to a temporary file and
+    return it, rewound"""
+    spool = tempfile.TemporaryFile(suffix='.csv')
+    text = io.TextIOWrapper(spool, encoding='utf-8', newline='')
+    writer = csv.writer(text)
+    writer.writerow(header)
+    writer.writerows(rows)
+    text.flush()
+    # keep the binary file open once the wrapper is gone
+    text.detach()
+    spool.seek(0)
+    return spool
+
+
+def spool_parquet(header, column_types, rows, batch_rows=PARQUET_BATCH_ROWS):
+    """Write ``rows`` as a Parquet file with typed columns to a temporary
+    file and return it, rewound.
+
+    ``column_types`` gives the type (a ``COLUMN_TYPES`` key) of each column
+    of ``header``. Requires pyarrow.
+    """
+    if pyarrow is None:
+        raise ImportError("Parquet files require the pyarrow Python package")
+    schema = pyarrow.schema([
+        (name, getattr(pyarrow, COLUMN_TYPES[column_type][0])())
+        for name, column_type in zip(header, column_types)
+    ])
+    parsers = [COLUMN_TYPES[column_type][1] for column_type in column_types]
+
+    spool = tempfile.TemporaryFile(suffix='.parquet')
+    with pyarrow.parquet.ParquetWriter(spool, schema) as writer:
+        columns = [[] for __ in header]
+        for row in rows:
+            for column, parse, value in zip(columns, parsers, row):
+                column.append(parse(value))
+            if len(columns[0]) >= batch_rows:
+                writer.write_batch(pyarrow.record_batch(columns, schema=schema))
+                columns = [[] for __ in header]
+        if columns[0]:
+            writer.write_batch(pyarrow.record_batch(columns, schema=schema))
+    spool.seek(0)
+    return spool
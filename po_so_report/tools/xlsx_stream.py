@@ -0,0 +1,137 @@
+"""Write-only XLSX workbooks fed row by row.
+
+openpyxl's write-only mode serializes each appended row straight to a
+temporary file, so memory stays flat whatever the number of rows; the
+workbook itself is spooled to disk and only read back, or streamed, once
+complete.
+"""
+import tempfile
+import re
+from copy import copy
+from itertools import chain, islice
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, NamedStyle
+from openpyxl.utils import get_column_letter
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+HEADER_FONT = Font(bold=True)
+TOTAL_FONT = Font(bold=True)
+
+# Column widths are written before the first row: when not given, they are
+# measured on the header and this many leading rows
+WIDTH_SAMPLE_ROWS = 1000
+WIDTH_PADDING = 5
+
+# Characters Excel refuses in sheet titles
+INVALID_TITLE_CHARS = re.compile(r'[\\/*?:\[\]]')
+
+
+class TotalRow(list):
+    """A row written in bold, e.g. the totals closing a project"""
+
+
+class ColumnWidths(object):
+    """Widest value seen per column, fed row by row"""
+
+    def __init__(self, header):
+        self.widths = [len(str(value)) for value in header]
+
+    def feed(self, row):
+        widths = self.widths
+        for index, value in enumerate(row):
+            if value is None:
+                continue
+            length = len(str(value))
+            if index >= len(widths):
+                widths.append(length)
+            elif length > widths[index]:
+                widths[index] = length
+
+    def column_widths(self):
+        return [width + WIDTH_PADDING for width in self.widths]
+
+
+def left_aligned_style():
+    return NamedStyle(name='left_aligned', alignment=Alignment(horizontal='left', vertical='center'))
+
+
+def spool_workbook(sheets, cell_style=None):
+    """Write ``sheets`` to a temporary file and return it, rewound.
+
+    ``sheets`` is an iterable of ``(title, header, rows, widths)``: ``rows``
+    may be any iterable (ideally a generator) of lists, ``widths`` a list of
+    column widths or ``None`` to measure them. ``cell_style`` is a factory
+    of the ``NamedStyle`` shared by all cells, registered once per workbook.
+    """
+    workbook = Workbook(write_only=True)
+    style_name = None
+    if cell_style:
+        style = cell_style()
+        workbook.add_named_style(style)
+        style_name = style.name
+    for title, header, rows, widths in sheets:
+        write_sheet(workbook, title, header, rows, widths, style_name)
+    spool = tempfile.TemporaryFile(suffix='.xlsx')
+    workbook.save(spool)
+    spool.seek(0)
+    return spool
+
+
+def write_workbook(sheets, cell_style=None):
+    """Return the XLSX content of ``sheets``, see ``spool_workbook``"""
+    with spool_workbook(sheets, cell_style) as spool:
+        return spool.read()
+
+
+def sheet_title(title):
+    return INVALID_TITLE_CHARS.sub('-', title)[:31]
+
+
+def write_sheet(workbook, title, header, rows, widths, style_name=None):
+    sheet = workbook.create_sheet(title=sheet_title(title))
+    rows = iter(rows)
+    sample = []
+    if widths is None:
+        tracker = ColumnWidths(header)
+        for row in islice(rows, WIDTH_SAMPLE_ROWS):
+            tracker.feed(row)
+            sample.append(row)
+        widths = tracker.column_widths()
+    for index, width in enumerate(widths, start=1):
+        sheet.column_dimensions[get_column_letter(index)].width = width
+    sheet.freeze_panes = 'A2'
+
+    header_style = cell_style_array(sheet, style_name, HEADER_FONT)
+    total_style = cell_style_array(sheet, style_name, TOTAL_FONT)
+    body_style = cell_style_array(sheet, style_name) if style_name else None
+    sheet.append(styled(sheet, header, header_style))
+    for row in chain(sample, rows):
+        if isinstance(row, TotalRow):
+            sheet.append(styled(sheet, row, total_style))
+        elif body_style is not None:
+            sheet.append(styled(sheet, row, body_style))
+        else:
+            sheet.append(row)
+
+
+def cell_style_array(sheet, style_name=None, font=None):
+    """Resolve a named style and font once; the result is copied onto each
+    cell, which is much cheaper than assigning the style by name"""
+    template = WriteOnlyCell(sheet)
+    if style_name:
+        template.style = style_name
+    if font:
+        template.font = font
+    return template._style
+
+
+def styled(sheet, values, style_array):
+    cells = []
+    for value in values:
+        cell = WriteOnlyCell(sheet, value=value)
+        cell._style = copy(style_array)
+        cells.append(cell)
+    return cells
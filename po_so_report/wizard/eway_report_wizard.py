@@ -1,6 +1,89 @@
 from odoo import api, fields, models
+from odoo.fields import Command
 
 from collections import defaultdict
+from itertools import groupby
+
+from ..models.po_so_report_summary import REPORT_MODELS
+from ..tools import xlsx_stream
+from ..tools.xlsx_stream import TotalRow
+
+
+def read_names(env, model, ids):
+    """Return {id: name} for the given records in a single query.
+
+    The reports show the plain ``name``: the display name of the many2one
+    values returned by ``search_read`` differs for contacts of a company
+    (``"Company, Contact"``) and for products with an internal reference
+    (``"[REF] Product"``), so it cannot be used instead.
+    """
+    if not ids:
+        return {}
+    return {rec['id']: rec['name'] for rec in env[model].browse(list(ids)).read(['name'])}
+
+
+def report_docs(env, model, docids, data, project_field):
+    """Wizards the report is printed for: the records of ``docids`` or, when
+    rendered from ``data['project_ids']`` (background jobs), an unsaved
+    wizard holding those projects"""
+    if data and data.get('project_ids'):
+        project_ids = data['project_ids']
+        if env[model]._fields[project_field].type == 'many2many':
+            return env[model].new({project_field: [Command.set(project_ids)]})
+        return env[model].new({project_field: project_ids[0]})
+    return env[model].browse(docids)
+
+
+def xlsx_export_action(wizard):
+    """Download action of the XLSX export of ``wizard``, served by the
+    export controller"""
+    return {
+        'type': 'ir.actions.act_url',
+        'url': '/po_so_report/export_xlsx/%s/%s' % (wizard._name, wizard.id),
+        'target': 'self',
+    }
+
+
+class PoSoReportXlsxMixin(models.AbstractModel):
+    """XLSX rendering of the PO/SO and purchase bill reports.
+
+    The report values are turned into a header and a generator of rows,
+    written one by one to a write-only workbook spooled to disk. Reports
+    inheriting the mixin define ``_get_xlsx_header(values)``, returning
+    the titles and widths of the columns, and ``_get_xlsx_rows(values)``.
+    """
+    _name = 'po.so.report.xlsx.mixin'
+    _description = 'PO/SO Report XLSX Export'
+
+    _xlsx_sheet_title = 'Report'
+
+    @api.model
+    def _render_xlsx(self, docids, data=None):
+        """Return (spool, extension), ``spool`` being the rewound temporary
+        file holding the workbook, to be streamed or read by the caller"""
+        values = self._get_xlsx_values(docids, data)
+        header, widths = self._get_xlsx_header(values)
+        spool = xlsx_stream.spool_workbook([
+            (self._xlsx_sheet_title, header, self._get_xlsx_rows(values), widths),
+        ])
+        return spool, 'xlsx'
+
+    @api.model
+    def _get_xlsx_values(self, docids, data=None):
+        """Values the XLSX export is written from, the PDF ones by default"""
+        return self._get_report_values(docids, data)
+
+    @api.model
+    def _get_summary_xlsx_values(self, report_type, projects):
+        """XLSX values streaming the rows of ``projects`` from their summary
+        lines, see ``po.so.report.summary._get_report_row_stream``"""
+        max_invoices, max_payments, rows = self.env['po.so.report.summary']._get_report_row_stream(
+            report_type, projects)
+        return {
+            'report_data': rows,
+            'invoice_range': list(range(max_invoices)),
+            'payment_range': list(range(max_payments)),
+        }
 
 
 class PoSoWizard(models.TransientModel):
@@ -12,6 +95,15 @@ class PoSoWizard(models.TransientModel):
         ('sale', 'Sale Order'),
         ('purchase', 'Purchase Order')
     ], string='Report Type', default='sale', required=True)
+    file_format = fields.Selection([
+        ('pdf', 'PDF'),
+        ('xlsx', 'Excel (XLSX)'),
+    ], string='Background Format', default='pdf', required=True)
+    job_id = fields.Many2one('po.so.report.job', string='Background Job', readonly=True)
+    job_state = fields.Selection(related='job_id.state')
+    job_progress = fields.Float(related='job_id.progress')
+    job_progress_done = fields.Integer(related='job_id.progress_done')
+    job_progress_total = fields.Integer(related='job_id.progress_total')
 
     def generate_report(self):
         # Clear any context that might cause issues with account.move views
@@ -24,21 +116,55 @@ class PoSoWizard(models.TransientModel):
         else:
             return self.env.ref('po_so_report.action_report_purchase_order').with_context(ctx).report_action(self)
 
+    def action_generate_in_background(self):
+        """Queue the report for the cron workers and keep the wizard open to
+        follow its progress"""
+        self.ensure_one()
+        self.job_id = self.env['po.so.report.job']._enqueue(
+            self.report_type, self.project_ids, self.file_format)
+        return self._reopen()
+
+    def generate_xlsx(self):
+        self.ensure_one()
+        return xlsx_export_action(self)
+
+    def _render_xlsx(self):
+        """Return (spool, filename) of the XLSX export of the report"""
+        self.ensure_one()
+        spool, extension = self.env[REPORT_MODELS[self.report_type]]._render_xlsx(self.ids)
+        name = 'Sale_Order_Report' if self.report_type == 'sale' else 'Purchase_Order_Report'
+        return spool, '%s.%s' % (name, extension)
+
+    def action_refresh_job(self):
+        return self._reopen()
+
+    def action_download_job(self):
+        self.ensure_one()
+        return self.job_id.action_download()
+
+    def _reopen(self):
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
 
 class ReportSaleOrder(models.AbstractModel):
     _name = 'report.po_so_report.report_sale_order_template'
+    _inherit = ['po.so.report.xlsx.mixin']
     _description = 'Sale Order Report'
 
+    _xlsx_sheet_title = 'Sale Order Report'
+
     @api.model
     def _get_report_values(self, docids, data=None):
-        wizard = self.env['po.so.wizard'].browse(docids)
+        wizard = report_docs(self.env, 'po.so.wizard', docids, data, 'project_ids')
         projects = wizard.project_ids
 
-        report_data = []
-
-        for project in projects:
-            data = self._process_sale_orders(project)
-            report_data.extend(data)
+        report_data = self.env['po.so.report.summary']._get_report_rows('sale', projects)
 
         # Calculate max invoices and payments for dynamic columns
         max_invoices = 0
@@ -48,6 +174,12 @@ class ReportSaleOrder(models.AbstractModel):
             max_invoices = max(max_invoices, len(rec.get('invoices', [])))
             max_payments = max(max_payments, len(rec.get('payments', [])))
 
+        # Chunked rendering passes the column counts of the whole selection
+        # so that every chunk has the same columns
+        if data:
+            max_invoices = max(max_invoices, data.get('max_invoices', 0))
+            max_payments = max(max_payments, data.get('max_payments', 0))
+
         # Calculate totals grouped by project
         project_totals = {}
         for rec in report_data:
@@ -76,121 +208,197 @@ class ReportSaleOrder(models.AbstractModel):
             'invoice_range': list(range(max_invoices)) if max_invoices > 0 else [],
             'payment_range': list(range(max_payments)) if max_payments > 0 else [],
             'project_totals': project_totals,
+            # chunks following the first one continue the same report
+            'show_title': not (data and data.get('chunk_index')),
         }
 
+    @api.model
+    def _get_xlsx_values(self, docids, data=None):
+        wizard = report_docs(self.env, 'po.so.wizard', docids, data, 'project_ids')
+        return self._get_summary_xlsx_values('sale', wizard.project_ids)
+
+    def _get_xlsx_header(self, values):
+        payment_range = values['payment_range']
+        header = ['Project', 'Sr. No', 'SO', 'Customer/Vendor Name', 'SO/PO Total', 'Invoice Total',
+                  'Invoice Items', 'Diff (SO/PO - Invoice)']
+        header += ['Payment %s' % (index + 1) for index in payment_range]
+        header += ['Total Payment', 'Diff (Invoice - Payment)']
+        widths = [24, 7, 14, 28, 14, 14, 40, 14] + [12] * len(payment_range) + [14, 14]
+        return header, widths
+
+    def _get_xlsx_rows(self, values):
+        payment_range = values['payment_range']
+        total_keys = ('so_po_total', 'invoice_total', 'diff_so_invoice', 'payment_total', 'diff_invoice_payment')
+        for __, rows in groupby(values['report_data'], key=lambda rec: rec.get('project_id')):
+            # totals are summed as the rows go, which may come from a stream
+            totals = dict.fromkeys(total_keys, 0.0)
+            for sr, data in enumerate(rows, start=1):
+                project_name = data.get('project_name')
+                payments = data.get('payments', [])
+                yield [
+                    project_name, sr, data.get('so_po_number'), data.get('vendor_name'),
+                    data.get('so_po_total', 0.0), data.get('invoice_total', 0.0),
+                    data.get('invoice_items'), data.get('diff_so_invoice', 0.0),
+                ] + [
+                    payments[index].get('amount', 0.0) if index < len(payments) else None
+                    for index in payment_range
+                ] + [data.get('payment_total', 0.0), data.get('diff_invoice_payment', 0.0)]
+                for key in total_keys:
+                    totals[key] += data.get(key, 0.0)
+            yield TotalRow([
+                project_name, 'Total', None, None,
+                totals['so_po_total'], totals['invoice_total'], None, totals['diff_so_invoice'],
+            ] + [None] * len(payment_range) + [totals['payment_total'], totals['diff_invoice_payment']])
+
     def _process_sale_orders(self, project):
         """Process Sale Orders for the project"""
-        result = []
+        return self._process_sale_orders_batch(project)
 
-        # Get all sale orders linked to the project
-        sale_orders = self.env['sale.order'].search([
-            ('project_id', '=', project.id)
-        ])
+    def _process_sale_orders_batch(self, projects):
+        """Process Sale Orders of all the projects at once.
 
-        if not sale_orders:
-            # Project has no sale orders, show empty row
-            result.append({
-                'vendor_name': '',
-                'project_name': project.name,
-                'so_po_number': '',
-                'so_po_total': 0.0,
-                'invoices': [],
-                'invoice_total': 0.0,
-                'invoice_items': '',
-                'diff_so_invoice': 0.0,
-                'payments': [],
-                'payment_total': 0.0,
-                'diff_invoice_payment': 0.0
-            })
-            return result
+        Orders, invoices, invoice items and payments of every project are
+        fetched with one query each and indexed in dicts, so the number of
+        queries does not grow with the number of projects or orders.
+        """
+        result = []
 
+        # Get all sale orders linked to the projects
+        sale_orders = self.env['sale.order'].search_read(
+            [('project_id', 'in', projects.ids)],
+            ['name', 'partner_id', 'amount_total', 'project_id'])
+        orders_by_project = defaultdict(list)
         for sale_order in sale_orders:
-            # Get invoices for this sale order
-            invoices = self.env['account.move'].search([
-                ('invoice_origin', '=', sale_order.name),
-                ('move_type', '=', 'out_invoice'),
-                ('state', '=', 'posted')
-            ], order='invoice_date asc')
-
-            # Process invoices dynamically
-            invoices_list = []
-            invoice_total = 0.0
-            invoice_items = []
-
-            for invoice in invoices:
-                invoice_info = {
-                    'name': invoice.name,
-                    'amount': invoice.amount_total,
-                    'date': invoice.invoice_date
-                }
-                invoices_list.append(invoice_info)
-                invoice_total += invoice.amount_total
+            orders_by_project[sale_order['project_id'][0]].append(sale_order)
+        partner_names = read_names(
+            self.env, 'res.partner', {so['partner_id'][0] for so in sale_orders if so['partner_id']})
+
+        # Get posted invoices of these sale orders
+        invoices = self.env['account.move'].search_read([
+            ('invoice_origin', 'in', [so['name'] for so in sale_orders]),
+            ('move_type', '=', 'out_invoice'),
+            ('state', '=', 'posted')
+        ], ['name', 'amount_total', 'invoice_date', 'invoice_origin'],
+            order='invoice_date asc') if sale_orders else []
+        invoices_by_origin = defaultdict(list)
+        for invoice in invoices:
+            invoices_by_origin[invoice['invoice_origin']].append(invoice)
+
+        # Get invoice items
+        invoice_lines = self.env['account.move.line'].search_read([
+            ('move_id', 'in', [inv['id'] for inv in invoices]),
+            ('display_type', '=', 'product'),
+            ('product_id', '!=', False),
+        ], ['move_id', 'product_id']) if invoices else []
+        product_names = read_names(
+            self.env, 'product.product', {line['product_id'][0] for line in invoice_lines})
+        items_by_invoice = defaultdict(list)
+        for line in invoice_lines:
+            items_by_invoice[line['move_id'][0]].append(product_names[line['product_id'][0]])
+
+        # Get payments via invoice reference
+        payments = self.env['account.payment'].search_read([
+            ('memo', 'in', [inv['name'] for inv in invoices]),
+            ('state', '=', 'paid'),
+            ('partner_type', '=', 'customer')
+        ], ['name', 'amount', 'date', 'memo']) if invoices else []
+        payments_by_memo = defaultdict(list)
+        for payment in payments:
+            payments_by_memo[payment['memo']].append(payment)
 
-                # Get invoice items
-                for line in invoice.invoice_line_ids:
-                    if line.product_id:
-                        invoice_items.append(line.product_id.name)
+        for project in projects:
+            project_orders = orders_by_project.get(project.id)
+            if not project_orders:
+                # Project has no sale orders, show empty row
+                result.append({
+                    'vendor_name': '',
+                    'project_id': project.id,
+                    'project_name': project.name,
+                    'so_po_number': '',
+                    'so_po_total': 0.0,
+                    'invoices': [],
+                    'invoice_total': 0.0,
+                    'invoice_items': '',
+                    'diff_so_invoice': 0.0,
+                    'payments': [],
+                    'payment_total': 0.0,
+                    'diff_invoice_payment': 0.0
+                })
+                continue
 
-            # Get all payments for these invoices
-            payments_list = []
-            payment_total = 0.0
-            processed_payments = set()
-
-            for invoice in invoices:
-                # Get payments via invoice reference
-                payment_moves = self.env['account.payment'].search([
-                    ('memo', '=', invoice.name),
-                    ('state', '=', 'paid'),
-                    ('partner_type', '=', 'customer')
-                ])
-
-                for payment in payment_moves:
-                    if payment.id not in processed_payments:
-                        payment_info = {
-                            'date': payment.date,
-                            'amount': payment.amount,
-                            'name': payment.name
-                        }
-                        payments_list.append(payment_info)
-                        payment_total += payment.amount
-                        processed_payments.add(payment.id)
-
-            # Sort payments by date
-            payments_list.sort(key=lambda x: x['date'])
+            for sale_order in project_orders:
+                order_invoices = invoices_by_origin.get(sale_order['name'], [])
 
-            result.append({
-                'vendor_name': sale_order.partner_id.name,
-                'project_name': project.name,
-                'so_po_number': sale_order.name,
-                'so_po_total': sale_order.amount_total,
-                'invoices': invoices_list,
-                'invoice_total': invoice_total,
-                'invoice_items': ', '.join(set(invoice_items)),
-                'diff_so_invoice': sale_order.amount_total - invoice_total,
-                'payments': payments_list,
-                'payment_total': payment_total,
-                'diff_invoice_payment': invoice_total - payment_total
-            })
+                # Process invoices dynamically
+                invoices_list = []
+                invoice_total = 0.0
+                invoice_items = []
+
+                for invoice in order_invoices:
+                    invoices_list.append({
+                        'name': invoice['name'],
+                        'amount': invoice['amount_total'],
+                        'date': invoice['invoice_date']
+                    })
+                    invoice_total += invoice['amount_total']
+                    invoice_items.extend(items_by_invoice.get(invoice['id'], []))
+
+                # Get all payments for these invoices
+                payments_list = []
+                payment_total = 0.0
+                processed_payments = set()
+
+                for invoice in order_invoices:
+                    for payment in payments_by_memo.get(invoice['name'], []):
+                        if payment['id'] not in processed_payments:
+                            payments_list.append({
+                                'date': payment['date'],
+                                'amount': payment['amount'],
+                                'name': payment['name']
+                            })
+                            payment_total += payment['amount']
+                            processed_payments.add(payment['id'])
+
+                # Sort payments by date
+                payments_list.sort(key=lambda x: x['date'])
+
+                result.append({
+                    'vendor_name': partner_names.get(sale_order['partner_id'] and sale_order['partner_id'][0], False),
+                    'project_id': project.id,
+                    'project_name': project.name,
+                    'so_po_number': sale_order['name'],
+                    'so_po_total': sale_order['amount_total'],
+                    'invoices': invoices_list,
+                    'invoice_total': invoice_total,
+                    'invoice_items': ', '.join(set(invoice_items)),
+                    'diff_so_invoice': sale_order['amount_total'] - invoice_total,
+                    'payments': payments_list,
+                    'payment_total': payment_total,
+                    'diff_invoice_payment': invoice_total - payment_total
+                })
 
         return result
 
 
 class ReportPurchaseOrder(models.AbstractModel):
     _name = 'report.po_so_report.report_purchase_order_template'
+    _inherit = ['po.so.report.xlsx.mixin']
     _description = 'Purchase Order Report'
 
+    _xlsx_sheet_title = 'Purchase Order Report'
+
     @api.model
     def _get_report_values(self, docids, data=None):
-        wizard = self.env['po.so.wizard'].browse(docids)
+        wizard = report_docs(self.env, 'po.so.wizard', docids, data, 'project_ids')
         projects = wizard.project_ids
 
-        report_data = []
-
-        for project in projects:
-            report_data.extend(self._process_purchase_orders(project))
+        report_data = self.env['po.so.report.summary']._get_report_rows('purchase', projects)
 
         max_invoices = max((len(r['invoices']) for r in report_data), default=0)
         max_payments = max((len(r['payments']) for r in report_data), default=0)
+        if data:
+            max_invoices = max(max_invoices, data.get('max_invoices', 0))
+            max_payments = max(max_payments, data.get('max_payments', 0))
 
         # Calculate totals grouped by project
         project_totals = {}
@@ -218,88 +426,215 @@ class ReportPurchaseOrder(models.AbstractModel):
             'invoice_range': list(range(max_invoices)),
             'payment_range': list(range(max_payments)),
             'project_totals': project_totals,
+            'show_title': not (data and data.get('chunk_index')),
         }
 
     # ---------------------------------------------------------
     # MAIN LOGIC (ODOO 19 OFFICIAL)
     # ---------------------------------------------------------
-    def _process_purchase_orders(self, project):
-        result = []
-
-        po_lines = self.env['purchase.order.line'].search([
-            ('analytic_distribution', 'in', project.account_id.ids),
-        ])
-        purchase_orders = po_lines.mapped('order_id')
+    @api.model
+    def _get_xlsx_values(self, docids, data=None):
+        wizard = report_docs(self.env, 'po.so.wizard', docids, data, 'project_ids')
+        return self._get_summary_xlsx_values('purchase', wizard.project_ids)
+
+    def _get_xlsx_header(self, values):
+        # unlike the PDF, which has room for two, every invoice and payment
+        # gets its columns
+        invoice_range, payment_range = values['invoice_range'], values['payment_range']
+        header = ['Project', 'Sr', 'PO', 'Customer / Vendor', 'Quote']
+        for index in invoice_range:
+            header += ['Invoice %s' % (index + 1), 'Invoice %s Date' % (index + 1)]
+        header.append('Total Invoice')
+        for index in payment_range:
+            header += ['Payment %s' % (index + 1), 'Payment %s Date' % (index + 1)]
+        header += ['Total Payment', 'Amount']
+        widths = ([24, 7, 14, 28, 14] + [12, 12] * len(invoice_range) + [14]
+                  + [12, 12] * len(payment_range) + [14, 14])
+        return header, widths
+
+    def _get_xlsx_rows(self, values):
+        invoice_range, payment_range = values['invoice_range'], values['payment_range']
+        for __, rows in groupby(values['report_data'], key=lambda rec: rec.get('project_id')):
+            # totals are summed as the rows go, which may come from a stream
+            totals = dict.fromkeys(('quote', 'total_invoice', 'total_payment'), 0.0)
+            for sr, data in enumerate(rows, start=1):
+                project_name = data.get('project_name')
+                for key in totals:
+                    totals[key] += data.get(key, 0.0)
+                row = [project_name, sr, data.get('so_po_number'), data.get('vendor_name'), data.get('quote', 0.0)]
+                invoices = data.get('invoices', [])
+                for index in invoice_range:
+                    entry = invoices[index] if index < len(invoices) else {}
+                    row += [entry.get('amount'), entry.get('date') or None]
+                row.append(data.get('total_invoice', 0.0))
+                payments = data.get('payments', [])
+                for index in payment_range:
+                    entry = payments[index] if index < len(payments) else {}
+                    row += [entry.get('amount'), entry.get('date') or None]
+                row += [data.get('total_payment', 0.0), data.get('quote', 0.0) - data.get('total_payment', 0.0)]
+                yield row
+            yield TotalRow(
+                [project_name, 'Total', None, None, totals['quote']]
+                + [None, None] * len(invoice_range) + [totals['total_invoice']]
+                + [None, None] * len(payment_range)
+                + [totals['total_payment'], totals['quote'] - totals['total_payment']]
+            )
 
-        for po in purchase_orders:
-            bills = self.env['account.move'].search([
-                ('move_type', '=', 'in_invoice'),
-                ('state', '=', 'posted'),
-                ('invoice_origin', '=', po.name),
-            ], order='invoice_date')
+    def _process_purchase_orders(self, project):
+        return self._process_purchase_orders_batch(project)
 
-            invoices_list = []
-            payments_list = []
-            total_invoice = 0.0
-            total_payment = 0.0
-            processed_payment_moves = set()
+    def _process_purchase_orders_batch(self, projects):
+        """Process Purchase Orders of all the projects at once.
 
-            for bill in bills:
-                # -------------------------
-                # INVOICE
-                # -------------------------
-                invoices_list.append({
-                    'name': bill.name,
-                    'amount': bill.amount_total,
-                    'date': bill.invoice_date,
-                })
-                total_invoice += bill.amount_total
+        Bills, their payable lines, the partial reconciliations of those
+        lines and the counterpart payment moves are each loaded with one
+        query for the whole selection, then joined in memory.
+        """
+        result = []
 
-                # -------------------------
-                # PAYMENTS (ODOO DEFAULT WAY)
-                # -------------------------
-                payable_lines = bill.line_ids.filtered(
-                    lambda l: l.account_id.account_type == 'liability_payable'
-                )
+        # -------------------------
+        # PURCHASE ORDERS PER PROJECT
+        # -------------------------
+        projects_by_account = defaultdict(list)
+        for project in projects:
+            if project.account_id:
+                projects_by_account[project.account_id.id].append(project.id)
+
+        po_lines = self.env['purchase.order.line'].search_read([
+            ('analytic_distribution', 'in', list(projects_by_account)),
+        ], ['order_id', 'analytic_distribution']) if projects_by_account else []
+
+        order_ids_by_project = defaultdict(list)
+        for line in po_lines:
+            order_id = line['order_id'][0]
+            for key in (line['analytic_distribution'] or {}):
+                for account_id in key.split(','):
+                    for project_id in projects_by_account.get(int(account_id), []):
+                        if order_id not in order_ids_by_project[project_id]:
+                            order_ids_by_project[project_id].append(order_id)
+
+        order_ids = {order_id for ids in order_ids_by_project.values() for order_id in ids}
+        purchase_orders = {
+            po['id']: po for po in self.env['purchase.order'].browse(list(order_ids)).read(
+                ['name', 'partner_id', 'amount_total'])
+        } if order_ids else {}
+        partner_names = read_names(
+            self.env, 'res.partner', {po['partner_id'][0] for po in purchase_orders.values() if po['partner_id']})
+
+        # -------------------------
+        # BILLS
+        # -------------------------
+        bills = self.env['account.move'].search_read([
+            ('move_type', '=', 'in_invoice'),
+            ('state', '=', 'posted'),
+            ('invoice_origin', 'in', [po['name'] for po in purchase_orders.values()]),
+        ], ['name', 'amount_total', 'invoice_date', 'invoice_origin'],
+            order='invoice_date') if purchase_orders else []
+        bills_by_origin = defaultdict(list)
+        for bill in bills:
+            bills_by_origin[bill['invoice_origin']].append(bill)
 
-                for line in payable_lines:
-                    for match in line.matched_debit_ids:
-                        payment_move = match.debit_move_id.move_id
+        payments_by_bill = self._get_bill_payments([bill['id'] for bill in bills])
 
-                        if not payment_move:
-                            continue
+        for project in projects:
+            for order_id in order_ids_by_project.get(project.id, []):
+                po = purchase_orders[order_id]
+
+                invoices_list = []
+                payments_list = []
+                total_invoice = 0.0
+                total_payment = 0.0
+                processed_payment_moves = set()
+
+                for bill in bills_by_origin.get(po['name'], []):
+                    # -------------------------
+                    # INVOICE
+                    # -------------------------
+                    invoices_list.append({
+                        'name': bill['name'],
+                        'amount': bill['amount_total'],
+                        'date': bill['invoice_date'],
+                    })
+                    total_invoice += bill['amount_total']
 
-                        if payment_move.id in processed_payment_moves:
+                    # -------------------------
+                    # PAYMENTS (ODOO DEFAULT WAY)
+                    # -------------------------
+                    for payment in payments_by_bill.get(bill['id'], []):
+                        if payment['move_id'] in processed_payment_moves:
                             continue
 
                         payments_list.append({
-                            'name': payment_move.name,
-                            'amount': abs(match.amount),
-                            'date': payment_move.date,
+                            'name': payment['name'],
+                            'amount': payment['amount'],
+                            'date': payment['date'],
                         })
 
-                        total_payment += abs(match.amount)
-                        processed_payment_moves.add(payment_move.id)
+                        total_payment += payment['amount']
+                        processed_payment_moves.add(payment['move_id'])
 
-            # -------------------------
-            # DATE-WISE SORTING
-            # -------------------------
-            invoices_list.sort(key=lambda x: x['date'] or False)
-            payments_list.sort(key=lambda x: x['date'] or False)
-
-            result.append({
-                'vendor_name': po.partner_id.name,
-                'project_name': project.name,
-                'so_po_number': po.name,
-                'quote': po.amount_total,
-                'invoices': invoices_list,
-                'total_invoice': total_invoice,
-                'payments': payments_list,
-                'total_payment': total_payment,
-            })
+                # -------------------------
+                # DATE-WISE SORTING
+                # -------------------------
+                invoices_list.sort(key=lambda x: x['date'] or False)
+                payments_list.sort(key=lambda x: x['date'] or False)
+
+                result.append({
+                    'vendor_name': partner_names.get(po['partner_id'] and po['partner_id'][0], False),
+                    'project_id': project.id,
+                    'project_name': project.name,
+                    'so_po_number': po['name'],
+                    'quote': po['amount_total'],
+                    'invoices': invoices_list,
+                    'total_invoice': total_invoice,
+                    'payments': payments_list,
+                    'total_payment': total_payment,
+                })
 
         return result
 
+    def _get_bill_payments(self, bill_ids):
+        """Return {bill_id: [{'move_id', 'name', 'amount', 'date'}]} for the
+        payments reconciled with the payable lines of the bills, in the order
+        of ``line.matched_debit_ids``, using three queries in total"""
+        if not bill_ids:
+            return {}
+
+        payable_lines = self.env['account.move.line'].search_read([
+            ('move_id', 'in', bill_ids),
+            ('account_id.account_type', '=', 'liability_payable'),
+        ], ['move_id'], order='move_id, id')
+
+        partials = self.env['account.partial.reconcile'].search_read([
+            ('credit_move_id', 'in', [line['id'] for line in payable_lines]),
+        ], ['debit_move_id', 'credit_move_id', 'amount'], order='id') if payable_lines else []
+
+        counterpart_lines = self.env['account.move.line'].browse(
+            list({partial['debit_move_id'][0] for partial in partials})).read(['move_id'])
+        counterpart_move_ids = {line['id']: line['move_id'][0] for line in counterpart_lines}
+        payment_moves = {
+            move['id']: move for move in self.env['account.move'].browse(
+                list(set(counterpart_move_ids.values()))).read(['name', 'date'])
+        }
+
+        partials_by_line = defaultdict(list)
+        for partial in partials:
+            partials_by_line[partial['credit_move_id'][0]].append(partial)
+
+        payments_by_bill = defaultdict(list)
+        for line in payable_lines:
+            for partial in partials_by_line.get(line['id'], []):
+                move = payment_moves.get(counterpart_move_ids.get(partial['debit_move_id'][0]))
+                if not move:
+                    continue
+                payments_by_bill[line['move_id'][0]].append({
+                    'move_id': move['id'],
+                    'name': move['name'],
+                    'amount': abs(partial['amount']),
+                    'date': move['date'],
+                })
+        return payments_by_bill
+
 
 class ReportPoSo(models.AbstractModel):
     _name = 'report.po_so_report.report_po_so_template'
@@ -319,17 +654,30 @@ class PurchaseBillWizard(models.TransientModel):
         ctx.pop('project_id', None)
         return self.env.ref('po_so_report.action_report_purchase_bill').with_context(ctx).report_action(self)
 
+    def generate_xlsx(self):
+        self.ensure_one()
+        return xlsx_export_action(self)
+
+    def _render_xlsx(self):
+        """Return (spool, filename) of the XLSX export of the report"""
+        self.ensure_one()
+        spool, extension = self.env['report.po_so_report.report_purchase_bill_template']._render_xlsx(self.ids)
+        return spool, 'Purchase_Bill_Report.%s' % extension
+
 
 class ReportPurchaseBill(models.AbstractModel):
     _name = 'report.po_so_report.report_purchase_bill_template'
+    _inherit = ['po.so.report.xlsx.mixin']
     _description = 'Purchase Bill Report'
 
+    _xlsx_sheet_title = 'Purchase Bill Report'
+
     @api.model
     def _get_report_values(self, docids, data=None):
-        wizard = self.env['purchase.bill.wizard'].browse(docids)
+        wizard = report_docs(self.env, 'purchase.bill.wizard', docids, data, 'project_id')
         project = wizard.project_id
 
-        report_data = self._process_purchase_bills(project)
+        report_data = self.env['po.so.report.summary']._get_report_rows('bill', project)
 
         # Calculate max payments for dynamic columns
         max_payments = max((len(r.get('payments', [])) for r in report_data), default=0)
@@ -351,6 +699,32 @@ class ReportPurchaseBill(models.AbstractModel):
             'total_balance': total_balance,
         }
 
+    def _get_xlsx_header(self, values):
+        payment_range = values['payment_range']
+        header = ['Project', 'Sr. No', 'Bill Number', 'Bill Date', 'Vendor Name', 'Bill Amount']
+        header += ['Payment %s (Account)' % (index + 1) for index in payment_range]
+        header += ['Total Payment', 'Balance']
+        widths = [24, 7, 16, 12, 28, 14] + [14] * len(payment_range) + [14, 14]
+        return header, widths
+
+    def _get_xlsx_rows(self, values):
+        payment_range = values['payment_range']
+        project_name = values['docs'].project_id.name
+        for sr, data in enumerate(values['report_data'], start=1):
+            payments = data.get('payments', [])
+            yield [
+                project_name, sr, data.get('bill_number'), data.get('bill_date') or None,
+                data.get('vendor_name'), data.get('bill_amount', 0.0),
+            ] + [
+                payments[index].get('amount', 0.0) if index < len(payments) else None
+                for index in payment_range
+            ] + [data.get('payment_total', 0.0), data.get('bill_amount', 0.0) - data.get('payment_total', 0.0)]
+        yield TotalRow(
+            [project_name, 'Total', None, None, None, values['total_bill_amount']]
+            + [None] * len(payment_range)
+            + [values['total_payment'], values['total_balance']]
+        )
+
     # def _process_purchase_bills(self, project):
     #     """Process Purchase Bills for the project - date-wise with payments"""
     #     result = []
@@ -464,22 +838,16 @@ class ReportPurchaseBill(models.AbstractModel):
             return result
 
         # ---------------------------------------------------------
-        # Get posted vendor bills
+        # Get posted vendor bills of the project
         # ---------------------------------------------------------
-        bills = self.env['account.move'].search([
+        # The analytic domain of the invoice lines runs in PostgreSQL,
+        # through the analytic distribution index of account.move.line
+        project_bills = self.env['account.move'].search([
             ('move_type', '=', 'in_invoice'),
             ('state', '=', 'posted'),
+            ('invoice_line_ids', 'any', [('analytic_distribution', 'in', [project_account_id])]),
         ], order='invoice_date asc')
 
-        project_bills = []
-        for bill in bills:
-            lines = bill.invoice_line_ids.filtered(
-                lambda l: isinstance(l.analytic_distribution, dict)
-                and str(project_account_id) in l.analytic_distribution
-            )
-            if lines:
-                project_bills.append(bill)
-
         if not project_bills:
             return result
 
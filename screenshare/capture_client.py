@@ -15,30 +15,136 @@ Run:
 --server  : the dashboard server's address (see dashboard_server.py)
 --interval: seconds between screenshots (default 2)
 
+Screenshots identical to the last one sent (compared on a small grayscale
+fingerprint) are not uploaded: a tiny keep-alive tells the server this
+client is still live instead.
+
+Capture, encoding and upload run in three threads handing frames over
+through one-slot queues that drop the oldest frame: screenshots are taken
+on a fixed cadence whatever the network does, and when an upload is slow
+the newest frame is the next one sent. Uploads reuse one keep-alive
+connection to the server.
+
 Note: this captures the whole screen by default. If you only want the
 Meet window, crop the image before sending (see CROP section below).
 """
 
 import argparse
 import io
+import queue
+import threading
 import time
 
 import requests
 from mss import mss
-from PIL import Image
+from PIL import Image, ImageChops
 
+# Size of the grayscale fingerprint screenshots are compared on: one
+# fingerprint pixel averages a 30x30 pixel block of a 1080p screen
+FINGERPRINT_SIZE = (64, 36)
+# A screenshot changed when a fingerprint pixel moved by more than this
+# (0-255), enough to ignore compression noise but catch a line of text
+CHANGE_THRESHOLD = 6
+# Seconds between keep-alives while the screen does not change; keep it
+# under the server's STALE_AFTER_SECONDS
+KEEPALIVE_SECONDS = 5
+
+# Frames waiting between two stages; older ones are dropped for newer ones
+QUEUE_SIZE = 1
+# (connect, read) timeouts of an upload, in seconds
+UPLOAD_TIMEOUT = (3, 5)
+
+
+def fingerprint(img):
+    """Small grayscale version of a screenshot to compare it cheaply"""
+    return img.resize(FINGERPRINT_SIZE, Image.BOX).convert("L")
+
+
+def has_changed(current, previous):
+    if previous is None:
+        return True
+    return ImageChops.difference(current, previous).getextrema()[1] > CHANGE_THRESHOLD
 
-def capture_and_send(name: str, server_url: str, interval: float):
-    with mss() as sct:
-        monitor = sct.monitors[1]  # primary monitor; use [0] for all monitors combined
 
-        print(f"Capturing screen for '{name}', sending to {server_url} every {interval}s")
-        print("Press Ctrl+C to stop.")
+class DropOldestQueue(queue.Queue):
+    """Bounded queue whose producer never waits: a full queue drops its
+    oldest item to make room for the new one"""
 
+    def put_latest(self, item):
         while True:
             try:
-                shot = sct.grab(monitor)
-                img = Image.frombytes("RGB", shot.size, shot.bgra, "raw", "BGRX")
+                self.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+class CaptureClient:
+
+    def __init__(self, name: str, server_url: str, interval: float):
+        self.name = name
+        self.server_url = server_url
+        self.interval = interval
+        self.stop = threading.Event()
+        self.to_encode = DropOldestQueue(QUEUE_SIZE)
+        self.to_upload = DropOldestQueue(QUEUE_SIZE)
+        # fingerprint of the last frame handed to the upload stage, reset
+        # when an upload fails or the server asks for a full frame
+        self.last_queued = None
+        self.lock = threading.Lock()
+        # one keep-alive connection for all uploads and keep-alives
+        self.session = requests.Session()
+
+    def run(self):
+        threads = [
+            threading.Thread(target=self.capture_loop, name="capture", daemon=True),
+            threading.Thread(target=self.encode_loop, name="encode", daemon=True),
+            threading.Thread(target=self.upload_loop, name="upload", daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while not self.stop.wait(1):
+                pass
+        except KeyboardInterrupt:
+            self.stop.set()
+        for thread in threads:
+            thread.join(timeout=UPLOAD_TIMEOUT[0] + UPLOAD_TIMEOUT[1])
+        self.session.close()
+
+    def capture_loop(self):
+        # mss handles must be used by the thread that created them
+        with mss() as sct:
+            monitor = sct.monitors[1]  # primary monitor; use [0] for all monitors combined
+            next_tick = time.monotonic()
+            while not self.stop.is_set():
+                try:
+                    shot = sct.grab(monitor)
+                    img = Image.frombytes("RGB", shot.size, shot.bgra, "raw", "BGRX")
+                    self.to_encode.put_latest(img)
+                except Exception as e:
+                    print(f"capture error: {e}")
+
+                # fixed cadence: ticks missed by a slow grab are skipped,
+                # not made up for
+                next_tick = max(next_tick + self.interval, time.monotonic())
+                self.stop.wait(next_tick - time.monotonic())
+
+    def encode_loop(self):
+        while not self.stop.is_set():
+            try:
+                img = self.to_encode.get(timeout=1)
+            except queue.Empty:
+                continue
+            try:
+                current = fingerprint(img)
+                with self.lock:
+                    if not has_changed(current, self.last_queued):
+                        continue
+                    self.last_queued = current
 
                 # --- OPTIONAL CROP: uncomment and adjust to capture only a
                 # specific region (e.g. just the Meet window area) instead
@@ -49,18 +155,57 @@ def capture_and_send(name: str, server_url: str, interval: float):
 
                 buf = io.BytesIO()
                 img.save(buf, format="JPEG", quality=60)
-                buf.seek(0)
-
-                requests.post(
-                    f"{server_url}/upload",
-                    files={"image": (f"{name}.jpg", buf, "image/jpeg")},
-                    data={"name": name},
-                    timeout=5,
-                )
+                self.to_upload.put_latest(buf.getvalue())
+            except Exception as e:
+                print(f"encode error: {e}")
+
+    def upload_loop(self):
+        last_contact = time.monotonic()
+        while not self.stop.is_set():
+            wait = max(0, last_contact + KEEPALIVE_SECONDS - time.monotonic())
+            try:
+                jpeg = self.to_upload.get(timeout=min(wait, 1))
+            except queue.Empty:
+                jpeg = None
+                if time.monotonic() - last_contact < KEEPALIVE_SECONDS:
+                    continue
+            try:
+                if jpeg is None:
+                    self.send_keepalive()
+                else:
+                    self.send_frame(jpeg)
+                last_contact = time.monotonic()
             except Exception as e:
-                print(f"capture/upload error: {e}")
+                print(f"upload error: {e}")
+                # send the next screenshot even if it looks the same
+                with self.lock:
+                    self.last_queued = None
+                last_contact = time.monotonic()
+
+    def send_frame(self, jpeg: bytes):
+        self.session.post(
+            f"{self.server_url}/upload",
+            files={"image": (f"{self.name}.jpg", jpeg, "image/jpeg")},
+            data={"name": self.name},
+            timeout=UPLOAD_TIMEOUT,
+        ).raise_for_status()
+
+    def send_keepalive(self):
+        """Tell the server this client is live; when it answers that it
+        needs a full frame again (e.g. it restarted and lost the last one),
+        the next screenshot is sent"""
+        response = self.session.post(
+            f"{self.server_url}/heartbeat", data={"name": self.name}, timeout=UPLOAD_TIMEOUT)
+        response.raise_for_status()
+        if response.text == "resend":
+            with self.lock:
+                self.last_queued = None
 
-            time.sleep(interval)
+
+def capture_and_send(name: str, server_url: str, interval: float):
+    print(f"Capturing screen for '{name}', sending to {server_url} every {interval}s")
+    print("Press Ctrl+C to stop.")
+    CaptureClient(name, server_url, interval).run()
 
 
 if __name__ == "__main__":
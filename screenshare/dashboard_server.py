@@ -27,19 +27,35 @@ app = Flask(__name__)
 UPLOAD_DIR = "screens"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-last_seen = {}  # name -> timestamp of last received screenshot
+last_seen = {}  # name -> timestamp of last screenshot or keep-alive
+last_frame = {}  # name -> timestamp of last received screenshot
 
 STALE_AFTER_SECONDS = 10  # mark a tile "stale" if no update in this long
 
 
+def safe_client_name(name):
+    return "".join(c for c in name if c.isalnum() or c in ("-", "_")) or "unknown"
+
+
 @app.route("/upload", methods=["POST"])
 def upload():
     name = request.form.get("name", "unknown")
     file = request.files.get("image")
     if file:
-        safe_name = "".join(c for c in name if c.isalnum() or c in ("-", "_")) or "unknown"
+        safe_name = safe_client_name(name)
         file.save(os.path.join(UPLOAD_DIR, f"{safe_name}.jpg"))
-        last_seen[safe_name] = time.time()
+        last_seen[safe_name] = last_frame[safe_name] = time.time()
+    return "ok"
+
+
+@app.route("/heartbeat", methods=["POST"])
+def heartbeat():
+    """Keep-alive of a client whose screen did not change since its last
+    upload; asks for a full frame when there is none to show"""
+    safe_name = safe_client_name(request.form.get("name", "unknown"))
+    if safe_name not in last_frame:
+        return "resend"
+    last_seen[safe_name] = time.time()
     return "ok"
 
 
@@ -61,7 +77,7 @@ def dashboard():
         tiles_html += f"""
         <div class="tile">
             <h3>{name} <span class="status" style="color:{color}">{status}</span></h3>
-            <img src="/screens/{name}.jpg?t={int(time.time())}">
+            <img src="/screens/{name}.jpg?t={int(last_frame[name])}">
         </div>
         """
 